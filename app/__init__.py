@@ -1,12 +1,11 @@
 from flask import Flask
-from . import models
+from . import db, migrations
 
 def create_app():
     app = Flask(__name__)
-    
-    models.init_db()
-    models.migrate_add_tvc_id_to_wave_items()  # Add tvc_id column to wave_items
-    models.migrate_add_indices_tables()  # Add indices management tables
+    db.init_app(app)
+
+    migrations.run_migrations()  # Applies pending schema steps only
 
     # Import blueprints from each package
     from app.about import bp as about_bp
@@ -16,6 +15,7 @@ def create_app():
     from app.campaigns import bp as campaigns_bp
     from app.calendar import bp as calendar_bp
     from app.indices import bp as indices_bp
+    from app.exports import bp as exports_bp
 
     # Register blueprints
     app.register_blueprint(about_bp, url_prefix="/about")
@@ -25,6 +25,13 @@ def create_app():
     app.register_blueprint(campaigns_bp, url_prefix="/tv-planner")
     app.register_blueprint(calendar_bp, url_prefix="/tv-planner")
     app.register_blueprint(indices_bp, url_prefix="/tv-planner")
+    app.register_blueprint(exports_bp, url_prefix="/tv-planner")
+
+    from app import export_jobs
+    export_jobs.init_app(app)  # Resume export jobs abandoned by a dead worker
+
+    from app import crm_outbox
+    crm_outbox.init_app(app)  # Background delivery of Projects-CRM plan writes
     
     
 
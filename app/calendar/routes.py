@@ -17,47 +17,60 @@ def calendar_page():
     """Calendar view page"""
     return render_template("calendar.html")
 
+# Per-(year, month) event lists, valid while the calendar revision matches
+_events_cache = {}
+EVENTS_CACHE_SIZE = 120
+
 @bp.route("/calendar/events", methods=["GET"])
 def calendar_events():
     """Get calendar events (campaigns and waves) for a specific month/year"""
-    year = int(request.args.get('year', datetime.now().year))
-    month = int(request.args.get('month', datetime.now().month))
-    
-    # Get all campaigns with their waves
-    campaigns = models.list_campaigns()
-    events = []
-    
-    for campaign in campaigns:
-        # Add campaign as event if it has dates
-        if campaign.get('start_date') or campaign.get('end_date'):
-            events.append({
-                'id': f"campaign_{campaign['id']}",
-                'title': f"📺 {campaign['name']}",
-                'type': 'campaign',
-                'campaign_id': campaign['id'],
-                'start': campaign.get('start_date'),
-                'end': campaign.get('end_date'),
-                'status': campaign.get('status', 'draft'),
-                'url': f"/trp-admin/campaigns-admin?campaign={campaign['id']}"
-            })
-            
-        # Get waves for this campaign
-        waves = models.list_waves(campaign['id'])
-        for wave in waves:
-            if wave.get('start_date') or wave.get('end_date'):
+    try:
+        year = int(request.args.get('year', datetime.now().year))
+        month = int(request.args.get('month', datetime.now().month))
+        last_day = calendar.monthrange(year, month)[1]
+    except (ValueError, calendar.IllegalMonthError):
+        return jsonify({"status": "error", "message": "Invalid year or month"}), 400
+
+    revision = models.get_data_revision('calendar')
+    cached = _events_cache.get((year, month))
+    if cached and cached[0] == revision:
+        events = cached[1]
+    else:
+        events = []
+        rows = models.list_calendar_events(f"{year:04d}-{month:02d}-01",
+                                           f"{year:04d}-{month:02d}-{last_day:02d}")
+        for row in rows:
+            if row['type'] == 'campaign':
                 events.append({
-                    'id': f"wave_{wave['id']}",
-                    'title': f"🌊 {wave['name'] or 'Banga'}",
+                    'id': f"campaign_{row['campaign_id']}",
+                    'title': f"📺 {row['name']}",
+                    'type': 'campaign',
+                    'campaign_id': row['campaign_id'],
+                    'start': row['start_date'],
+                    'end': row['end_date'],
+                    'status': row['status'] or 'draft',
+                    'url': f"/trp-admin/campaigns-admin?campaign={row['campaign_id']}"
+                })
+            else:
+                events.append({
+                    'id': f"wave_{row['wave_id']}",
+                    'title': f"🌊 {row['name'] or 'Banga'}",
                     'type': 'wave',
-                    'campaign_id': campaign['id'],
-                    'campaign_name': campaign['name'],
-                    'wave_id': wave['id'],
-                    'start': wave.get('start_date'),
-                    'end': wave.get('end_date'),
-                    'url': f"/trp-admin/campaigns-admin?campaign={campaign['id']}&wave={wave['id']}"
+                    'campaign_id': row['campaign_id'],
+                    'campaign_name': row['campaign_name'],
+                    'wave_id': row['wave_id'],
+                    'start': row['start_date'],
+                    'end': row['end_date'],
+                    'url': f"/trp-admin/campaigns-admin?campaign={row['campaign_id']}&wave={row['wave_id']}"
                 })
-    
-    return jsonify(events)
+        if len(_events_cache) >= EVENTS_CACHE_SIZE:
+            _events_cache.clear()
+        _events_cache[(year, month)] = (revision, events)
+
+    response = jsonify(events)
+    response.set_etag(f"calendar-{revision}-{year}-{month}")
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
 
 @bp.route("/calendar/month/<int:year>/<int:month>", methods=["GET"])
 def calendar_month_data(year, month):
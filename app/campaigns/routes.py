@@ -1,15 +1,17 @@
 # app/campaigns/routes.py
 from . import bp
-from flask import render_template, request, jsonify, send_file
-from app import models
+from flask import render_template, request, jsonify, send_file, Response, stream_with_context
+from app import crm_outbox, export_cache, models, projects_crm_service, trp_distribution
+from app.csv_export import zip_chunks
+from app.export_jobs import safe_filename
 from app.projects_crm_service import (
-    get_tv_planner_campaigns, 
-    get_local_campaign_id, 
-    sync_wave_to_projects_crm_plan,
-    sync_wave_deletion_to_projects_crm,
-    get_projects_crm_campaign_id_from_local
+    list_campaigns_with_crm,
+    get_local_campaign_id
 )
 from datetime import datetime
+from io import BytesIO
+from urllib.parse import quote
+import unicodedata
 
 # ---------- Page ----------
 @bp.route("/campaigns", methods=["GET"])
@@ -31,67 +33,37 @@ def pl_targets(pl_id):
     return jsonify(models.list_pricing_targets(pl_id, owner))
 
 # ---------- Campaigns API ----------
+# Query parameters that switch /campaigns-api to the paginated form
+_LIST_PARAMS = ("q", "status", "agency", "client", "date_range", "from", "to", "sort", "cursor", "limit")
+
+
 @bp.route("/campaigns-api", methods=["GET"])
 def campaigns_list():
-    # Get local TV-Planner campaigns
-    local_campaigns = models.list_campaigns()
-    print(f"Found {len(local_campaigns)} local campaigns")
-    
-    # Get campaigns from Projects-CRM
-    try:
-        projects_crm_campaigns = get_tv_planner_campaigns()
-        print(f"Found {len(projects_crm_campaigns)} Projects-CRM campaigns")
-    except Exception as e:
-        print(f"Error fetching Projects-CRM campaigns: {e}")
-        projects_crm_campaigns = []
-    
-    # Deduplicate campaigns by detecting potential matches
-    # Projects-CRM campaigns have names like "Campaign Name (CODE)" 
-    # Local campaigns that were synced might have the same name
-    deduplicated_campaigns = []
-    local_campaign_names = {c['name'] for c in local_campaigns}
-    
-    # Add all local campaigns first
-    deduplicated_campaigns.extend(local_campaigns)
-    
-    # Add Projects-CRM campaigns only if they don't match existing local campaigns
-    for crm_campaign in projects_crm_campaigns:
-        crm_name = crm_campaign['name']
-        
-        # Check if this CRM campaign matches any local campaign
-        is_duplicate = False
-        
-        # Direct name match
-        if crm_name in local_campaign_names:
-            is_duplicate = True
-        
-        # Check for potential sync matches - local campaign might be named the same
-        # as the CRM campaign without the (CODE) suffix
-        base_crm_name = crm_name
-        if ' (' in crm_name and crm_name.endswith(')'):
-            base_crm_name = crm_name.split(' (')[0]
-            if base_crm_name in local_campaign_names:
-                is_duplicate = True
-        
-        # Also check the reverse - if any local campaign contains the CRM name
-        for local_name in local_campaign_names:
-            if base_crm_name.lower() in local_name.lower() or local_name.lower() in base_crm_name.lower():
-                # Additional check: both should have similar dates to be considered duplicates
-                for local_campaign in local_campaigns:
-                    if (local_campaign['name'] == local_name and 
-                        local_campaign.get('start_date') == crm_campaign.get('start_date')):
-                        is_duplicate = True
-                        break
-        
-        if not is_duplicate:
-            deduplicated_campaigns.append(crm_campaign)
-        else:
-            print(f"Skipping duplicate campaign: {crm_name}")
-    
-    crm_added = len(deduplicated_campaigns) - len(local_campaigns)
-    crm_skipped = len(projects_crm_campaigns) - crm_added
-    print(f"Final result: {len(deduplicated_campaigns)} total campaigns ({len(local_campaigns)} local + {crm_added} CRM, {crm_skipped} CRM duplicates skipped)")
-    return jsonify(deduplicated_campaigns)
+    # Local TV-Planner campaigns plus the Projects-CRM campaigns not yet synced.
+    # Projects-CRM campaigns have names like "Campaign Name (CODE)"; see
+    # merge_campaign_lists for how duplicates are detected.
+    if any(name in request.args for name in _LIST_PARAMS):
+        # ?q=&status=&agency=&client=&date_range=&from=&to=&sort=-id&cursor=&limit=50
+        try:
+            filters = {
+                "search": request.args.get("q"),
+                "status": request.args.get("status"),
+                "agency": request.args.get("agency"),
+                "client": request.args.get("client"),
+                "date_range": request.args.get("date_range"),
+                "date_from": request.args.get("from"),
+                "date_to": request.args.get("to"),
+            }
+            return jsonify(projects_crm_service.list_campaigns_page(
+                filters, sort=request.args.get("sort") or "-id", cursor=request.args.get("cursor"),
+                limit=request.args.get("limit", projects_crm_service.PAGE_SIZE, type=int)))
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+
+    campaigns, local_count, crm_count = list_campaigns_with_crm()
+    crm_added = len(campaigns) - local_count
+    print(f"Final result: {len(campaigns)} total campaigns ({local_count} local + {crm_added} CRM, {crm_count - crm_added} CRM duplicates skipped)")
+    return jsonify(campaigns)
 
 
 @bp.route("/campaigns-api/<int:cid>", methods=["PATCH"])
@@ -105,6 +77,40 @@ def campaigns_delete(cid):
     models.delete_campaign(cid)
     return jsonify({"status":"ok"})
 
+@bp.route("/campaigns/search", methods=["GET"])
+def campaigns_search():
+    """Ranked full-text search over local campaigns: ?q=&limit=20"""
+    limit = max(1, min(request.args.get("limit", 20, type=int), 100))
+    return jsonify(models.search_campaigns(request.args.get("q", ""), limit))
+
+@bp.route("/campaigns/<cid>/workspace", methods=["GET"])
+def campaign_workspace(cid):
+    """Campaign, waves, items, TVCs, discounts, totals, TRP and reference data in one response
+
+    The ETag is the campaign and refdata revision; a matching If-None-Match
+    gets 304 before anything is read.
+    """
+    try:
+        local_cid = get_local_campaign_id(cid)
+        current = models.get_campaign_revision(local_cid)
+        if not current:
+            return jsonify({"status": "error", "message": "Campaign not found"}), 404
+        tag = f"workspace-{local_cid}-{current[0]}-{models.get_data_revision('refdata')}"
+        if request.if_none_match.contains(tag):
+            response = Response(status=304)
+        else:
+            workspace = models.get_campaign_workspace(local_cid)
+            if workspace is None:
+                return jsonify({"status": "error", "message": "Campaign not found"}), 404
+            revisions = workspace['revisions']
+            tag = f"workspace-{local_cid}-{revisions['campaign']}-{revisions['refdata']}"
+            response = jsonify(workspace)
+        response.set_etag(tag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
 # ---------- Waves ----------
 @bp.route("/campaigns/<cid>/waves", methods=["GET"])
 def waves_list(cid):
@@ -130,24 +136,15 @@ def waves_create(cid):
         wid = models.create_wave(local_cid, wave_name, wave_start_date, wave_end_date)
         print(f"Created wave with ID: {wid}")
         
-        # Sync to Projects-CRM if this is a Projects-CRM campaign
-        original_cid = cid if str(cid).startswith('crm_') else get_projects_crm_campaign_id_from_local(local_cid)
-        
-        if original_cid:
-            try:
-                plan_data = sync_wave_to_projects_crm_plan(
-                    campaign_id=original_cid,
-                    wave_name=wave_name,
-                    wave_start_date=wave_start_date,
-                    wave_end_date=wave_end_date
-                )
-                if plan_data:
-                    print(f"Successfully synced wave '{wave_name}' to Projects-CRM as plan '{plan_data['name']}'")
-                else:
-                    print(f"Failed to sync wave '{wave_name}' to Projects-CRM")
-            except Exception as sync_error:
-                print(f"Error syncing wave to Projects-CRM: {sync_error}")
-                # Don't fail the wave creation if sync fails
+        # Mirror it as a plan in Projects-CRM if this is a Projects-CRM campaign;
+        # queued in this transaction and sent by the outbox worker
+        if wave_name and models.get_crm_link(local_id=local_cid):
+            description = f"TV-Planner wave: {wave_name}"
+            if wave_start_date and wave_end_date:
+                description += f" ({wave_start_date} to {wave_end_date})"
+            models.enqueue_crm_plan_sync(local_cid, 'create_plan', wave_name,
+                                         {"description": description, "budget": 0.0}, wave_id=wid)
+            crm_outbox.notify_after_request()
         
         return jsonify({"status":"ok","id":wid}), 201
         
@@ -179,19 +176,10 @@ def waves_delete(wid):
             models.delete_wave(wid)
             print("Wave deleted from database")
             
-            # Sync deletion to Projects-CRM if this is a Projects-CRM campaign
-            if campaign_id and wave_name:
-                original_cid = get_projects_crm_campaign_id_from_local(campaign_id)
-                if original_cid:
-                    try:
-                        result = sync_wave_deletion_to_projects_crm(original_cid, wave_name)
-                        if result:
-                            print(f"Successfully deleted plan '{wave_name}' from Projects-CRM")
-                        else:
-                            print(f"Plan '{wave_name}' not found in Projects-CRM (may have been already deleted)")
-                    except Exception as sync_error:
-                        print(f"Error syncing wave deletion to Projects-CRM: {sync_error}")
-                        # Don't fail the wave deletion if sync fails
+            # Queue the plan deletion in Projects-CRM if this is a Projects-CRM campaign
+            if campaign_id and wave_name and models.get_crm_link(local_id=campaign_id):
+                models.enqueue_crm_plan_sync(campaign_id, 'delete_plan', wave_name, wave_id=wid)
+                crm_outbox.notify_after_request()
         else:
             # Wave not found, just try to delete it anyway
             models.delete_wave(wid)
@@ -206,9 +194,10 @@ def waves_delete(wid):
 def wave_items_list(wid):
     return jsonify(models.list_wave_items(wid))
 
-@bp.route("/waves/<int:wid>/items", methods=["POST"])
-def wave_items_create(wid):
-    data = request.get_json(force=True)
+def _wave_item_payload(data):
+    """Excel-style wave item fields from a request payload (ValueError if invalid)"""
+    if not isinstance(data, dict):
+        raise ValueError("item must be an object")
     
     # Get required fields
     channel_group = data.get("channel_group")
@@ -216,53 +205,101 @@ def wave_items_create(wid):
     trps = data.get("trps")
     
     if not channel_group or not target_group or trps in (None, ""):
-        return jsonify({"status":"error","message":"channel_group, target_group, trps required"}), 400
+        raise ValueError("channel_group, target_group, trps required")
     
     # Get all Excel fields with defaults
-    excel_data = {
-        "channel_group": channel_group,
-        "target_group": target_group,
-        "trps": float(trps),
-        "channel_share": float(data.get("channel_share", 0.75)),
-        "pt_zone_share": float(data.get("pt_zone_share", 0.55)),
-        "clip_duration": int(data.get("clip_duration", 10)),
-        "tvc_id": data.get("tvc_id"),  # TVC ID from database
-        "affinity1": data.get("affinity1"),
-        "affinity2": data.get("affinity2"),
-        "affinity3": data.get("affinity3"),
-        "duration_index": float(data.get("duration_index", 1.25)),
-        "seasonal_index": float(data.get("seasonal_index", 0.9)),
-        "trp_purchase_index": float(data.get("trp_purchase_index", 0.95)),
-        "advance_purchase_index": float(data.get("advance_purchase_index", 0.95)),
-        "position_index": float(data.get("position_index", 1.0)),
-        "client_discount": float(data.get("client_discount", 0)),
-        "agency_discount": float(data.get("agency_discount", 0)),
-        # TG demographic data from Excel/form
-        "tg_size_thousands": float(data.get("tg_size_thousands", 0)),
-        "tg_share_percent": float(data.get("tg_share_percent", 0)),
-        "tg_sample_size": int(data.get("tg_sample_size", 0))
-    }
+    try:
+        return {
+            "channel_group": channel_group,
+            "target_group": target_group,
+            "trps": float(trps),
+            "channel_share": float(data.get("channel_share", 0.75)),
+            "pt_zone_share": float(data.get("pt_zone_share", 0.55)),
+            "clip_duration": int(data.get("clip_duration", 10)),
+            "tvc_id": data.get("tvc_id"),  # TVC ID from database
+            "affinity1": data.get("affinity1"),
+            "affinity2": data.get("affinity2"),
+            "affinity3": data.get("affinity3"),
+            "duration_index": float(data.get("duration_index", 1.25)),
+            "seasonal_index": float(data.get("seasonal_index", 0.9)),
+            "trp_purchase_index": float(data.get("trp_purchase_index", 0.95)),
+            "advance_purchase_index": float(data.get("advance_purchase_index", 0.95)),
+            "position_index": float(data.get("position_index", 1.0)),
+            "client_discount": float(data.get("client_discount", 0)),
+            "agency_discount": float(data.get("agency_discount", 0)),
+            # TG demographic data from Excel/form
+            "tg_size_thousands": float(data.get("tg_size_thousands", 0)),
+            "tg_share_percent": float(data.get("tg_share_percent", 0)),
+            "tg_sample_size": int(data.get("tg_sample_size", 0))
+        }
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"invalid number: {e}")
+
+@bp.route("/waves/<int:wid>/items", methods=["POST"])
+def wave_items_create(wid):
+    data = request.get_json(force=True)
     
     try:
+        excel_data = _wave_item_payload(data)
         iid = models.create_wave_item_excel(wid, excel_data)
         return jsonify({"status":"ok","id":iid}), 201
     except ValueError as e:
         return jsonify({"status":"error","message":str(e)}), 400
 
+@bp.route("/waves/<int:wid>/items/bulk", methods=["POST"])
+def wave_items_create_bulk(wid):
+    """Create many wave items at once; nothing is inserted if any row is invalid"""
+    data = request.get_json(force=True)
+    rows = data.get("items") if isinstance(data, dict) else data
+    if not isinstance(rows, list) or not rows:
+        return jsonify({"status":"error","message":"items list required"}), 400
+    
+    items, errors = [], []
+    for row, payload in enumerate(rows):
+        try:
+            items.append(_wave_item_payload(payload))
+        except ValueError as e:
+            errors.append({"row": row, "message": str(e)})
+    if errors:
+        return jsonify({"status":"error","message":"Invalid rows","errors":errors}), 400
+    
+    try:
+        ids = models.create_wave_items_excel(wid, items)
+        return jsonify({"status":"ok","ids":ids}), 201
+    except ValueError as e:
+        return jsonify({"status":"error","message":str(e)}), 400
+
 @bp.route("/wave-items/<int:iid>", methods=["PATCH"])
 def wave_items_update(iid):
     try:
         data = request.get_json(force=True)
-        print(f"DEBUG: wave_items_update route called with iid={iid}, data={data}")
         models.update_wave_item(iid, data)
-        print(f"DEBUG: update_wave_item completed successfully")
         return jsonify({"status":"ok"})
+    except ValueError as e:
+        return jsonify({"status":"error", "message": str(e)}), 400
     except Exception as e:
         print(f"ERROR in wave_items_update: {e}")
         import traceback
         traceback.print_exc()
         return jsonify({"status":"error", "message": str(e)}), 500
 
+@bp.route("/wave-items/batch", methods=["PATCH"])
+def wave_items_update_batch():
+    """Apply several grid edits at once; returns the recomputed rows"""
+    data = request.get_json(force=True)
+    edits = data.get("items") if isinstance(data, dict) else data
+    if not isinstance(edits, list) or not edits:
+        return jsonify({"status":"error","message":"items list required"}), 400
+    for edit in edits:
+        if not isinstance(edit, dict) or "id" not in edit or not isinstance(edit.get("changes", {}), dict):
+            return jsonify({"status":"error","message":"each item needs id and changes"}), 400
+    
+    try:
+        items = models.update_wave_items(edits)
+        return jsonify({"status":"ok","items":items})
+    except ValueError as e:
+        return jsonify({"status":"error","message":str(e)}), 400
+
 @bp.route("/wave-items/<int:iid>", methods=["DELETE"])
 def wave_items_delete(iid):
     models.delete_wave_item(iid)
@@ -349,6 +386,15 @@ def recalculate_wave_discounts(wid):
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
+@bp.route("/campaigns/<int:cid>/recalculate-discounts", methods=["POST"])
+def recalculate_campaign_discounts(cid):
+    """Recalculate item prices of all campaign waves with their discounts"""
+    try:
+        waves = models.recalculate_campaign_prices_with_discounts(cid)
+        return jsonify({"status": "ok", "waves": waves})
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
 # Campaign Status
 @bp.route("/campaigns/<int:cid>/status", methods=["PATCH"])
 def update_campaign_status(cid):
@@ -363,6 +409,72 @@ def update_campaign_status(cid):
         return jsonify({"status": "error", "message": str(e)}), 400
 
 # Reports
+def _cached_export(campaign_id, kind, build, filename, mimetype):
+    """Serve a campaign export through the revision-keyed export cache
+
+    ``build()`` renders the export bytes, or an iterator of byte chunks that
+    is streamed to the client (None when the campaign is gone);
+    ``filename(campaign_name)`` names the download. A request whose
+    If-None-Match carries the current ETag gets 304 without rendering.
+    """
+    current = models.get_campaign_revision(campaign_id)
+    if not current:
+        return jsonify({"status": "error", "message": "Campaign not found"}), 404
+    revision, campaign_name = current
+    tag = export_cache.etag(campaign_id, revision, kind)
+
+    if request.if_none_match.contains(tag):
+        response = Response(status=304)
+        response.set_etag(tag)
+        return response
+
+    data = export_cache.get(campaign_id, revision, kind)
+    if data is None:
+        data = build()
+        if data is None:
+            return jsonify({"status": "error", "message": "Campaign not found"}), 404
+        if not isinstance(data, bytes):
+            response = _download_response(
+                stream_with_context(_stream_and_cache(campaign_id, current, kind, data)),
+                filename(campaign_name), mimetype)
+            response.set_etag(tag)
+            return response
+        # Only cache what was rendered from a revision that is still current
+        if models.get_campaign_revision(campaign_id) == current:
+            export_cache.put(campaign_id, revision, kind, data)
+
+    return send_file(
+        BytesIO(data),
+        as_attachment=True,
+        download_name=filename(campaign_name),
+        mimetype=mimetype,
+        etag=tag,
+        max_age=0,
+    )
+
+def _stream_and_cache(campaign_id, current, kind, chunks):
+    """Pass an export's chunks through, caching it once it is complete"""
+    parts = []
+    for chunk in chunks:
+        parts.append(chunk)
+        yield chunk
+    if models.get_campaign_revision(campaign_id) == current:
+        export_cache.put(campaign_id, current[0], kind, b"".join(parts))
+
+def _download_response(chunks, download_name, mimetype):
+    """Streamed attachment; non-ASCII names go in filename* as send_file does"""
+    response = Response(chunks, mimetype=mimetype)
+    try:
+        download_name.encode("ascii")
+        names = {"filename": download_name}
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize("NFKD", download_name).encode("ascii", "ignore").decode("ascii")
+        names = {"filename": simple, "filename*": f"UTF-8''{quote(download_name, safe='!#$&+-.^_`|~')}"}
+    response.headers.set("Content-Disposition", "attachment", **names)
+    response.cache_control.no_cache = True
+    response.cache_control.max_age = 0
+    return response
+
 @bp.route("/campaigns/<cid>/export/client-excel", methods=["GET"])
 def export_client_excel(cid):
     """Export client Excel report"""
@@ -373,34 +485,26 @@ def export_client_excel(cid):
         local_cid = get_local_campaign_id(cid)
         print(f"DEBUG: Local cid={local_cid}", file=sys.stderr, flush=True)
 
-        excel_file = models.generate_client_excel_report(local_cid)
-        print(f"DEBUG: Excel file generated: {excel_file}", file=sys.stderr, flush=True)
-        if not excel_file:
-            return jsonify({"status": "error", "message": "Campaign not found"}), 404
-        
-        # Get campaign name for filename
-        campaign_data = models.get_campaign_report_data(local_cid)
-        campaign_name = campaign_data['campaign']['name'] if campaign_data else f"Campaign_{local_cid}"
-
-        # Replace Lithuanian characters with ASCII equivalents
-        char_replacements = {
-            'ą': 'a', 'č': 'c', 'ę': 'e', 'ė': 'e', 'į': 'i', 'š': 's', 'ų': 'u', 'ū': 'u', 'ž': 'z',
-            'Ą': 'A', 'Č': 'C', 'Ę': 'E', 'Ė': 'E', 'Į': 'I', 'Š': 'S', 'Ų': 'U', 'Ū': 'U', 'Ž': 'Z'
-        }
-        safe_name = campaign_name
-        for lithuanian_char, ascii_char in char_replacements.items():
-            safe_name = safe_name.replace(lithuanian_char, ascii_char)
-
-        # Clean filename - keep only alphanumeric, spaces, hyphens, underscores
-        safe_name = "".join(c for c in safe_name if c.isalnum() or c in (' ', '-', '_')).rstrip()
-        filename = f"TV_Plan_{safe_name}_{datetime.now().strftime('%Y%m%d')}.xlsx"
-        
-        return send_file(
-            excel_file,
-            as_attachment=True,
-            download_name=filename,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
+        def build():
+            excel_file = models.generate_client_excel_report(local_cid)
+            return excel_file.getvalue() if excel_file else None
+
+        def filename(campaign_name):
+            # Replace Lithuanian characters with ASCII equivalents
+            char_replacements = {
+                'ą': 'a', 'č': 'c', 'ę': 'e', 'ė': 'e', 'į': 'i', 'š': 's', 'ų': 'u', 'ū': 'u', 'ž': 'z',
+                'Ą': 'A', 'Č': 'C', 'Ę': 'E', 'Ė': 'E', 'Į': 'I', 'Š': 'S', 'Ų': 'U', 'Ū': 'U', 'Ž': 'Z'
+            }
+            safe_name = campaign_name
+            for lithuanian_char, ascii_char in char_replacements.items():
+                safe_name = safe_name.replace(lithuanian_char, ascii_char)
+
+            # Clean filename - keep only alphanumeric, spaces, hyphens, underscores
+            safe_name = "".join(c for c in safe_name if c.isalnum() or c in (' ', '-', '_')).rstrip()
+            return f"TV_Plan_{safe_name}_{datetime.now().strftime('%Y%m%d')}.xlsx"
+
+        return _cached_export(local_cid, "client-excel", build, filename,
+                              'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
@@ -408,27 +512,58 @@ def export_client_excel(cid):
 def export_agency_csv(cid):
     """Export agency CSV order file"""
     try:
-        csv_file = models.generate_agency_csv_order(cid)
-        if not csv_file:
-            return jsonify({"status": "error", "message": "Campaign not found"}), 404
-        
-        # Get campaign name for filename
-        campaign_data = models.get_campaign_report_data(cid)
-        campaign_name = campaign_data['campaign']['name'] if campaign_data else f"Campaign_{cid}"
-        
-        # Clean filename
-        safe_name = "".join(c for c in campaign_name if c.isalnum() or c in (' ', '-', '_')).rstrip()
-        filename = f"TV_Order_{safe_name}_{datetime.now().strftime('%Y%m%d')}.csv"
-        
-        return send_file(
-            csv_file,
-            as_attachment=True,
-            download_name=filename,
-            mimetype='text/csv; charset=utf-8'
+        def build():
+            return models.agency_csv_order_chunks(cid)
+
+        def filename(campaign_name):
+            # Clean filename
+            safe_name = "".join(c for c in campaign_name if c.isalnum() or c in (' ', '-', '_')).rstrip()
+            return f"TV_Order_{safe_name}_{datetime.now().strftime('%Y%m%d')}.csv"
+
+        return _cached_export(cid, "agency-csv", build, filename, 'text/csv; charset=utf-8')
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@bp.route("/agency-orders/export", methods=["GET"])
+def export_agency_orders():
+    """Agency orders of every matching campaign, one CSV per sales house, in a ZIP
+
+    Query: ?channel_group_id=&owner=&from=YYYY-MM-DD&to=YYYY-MM-DD&status=
+    (at least one). Streamed straight from a single query.
+    """
+    try:
+        channel_group_id = request.args.get("channel_group_id", type=int)
+        files = models.agency_order_files(
+            channel_group_id=channel_group_id,
+            owner=request.args.get("owner") or None,
+            date_from=request.args.get("from") or None,
+            date_to=request.args.get("to") or None,
+            status=request.args.get("status") or None,
         )
+        today = datetime.now().strftime('%Y%m%d')
+        named = ((f"TV_Order_{safe_filename(owner)}_{today}.csv", chunks) for owner, chunks in files)
+        return _download_response(stream_with_context(zip_chunks(named)),
+                                  f"TV_Orders_{today}.zip", "application/zip")
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
+@bp.route("/export-cache/stats", methods=["GET"])
+def export_cache_stats():
+    """Hit ratio and size of the export cache"""
+    return jsonify(export_cache.stats())
+
+@bp.route("/crm/stats", methods=["GET"])
+def crm_stats():
+    """Projects-CRM client: cache ages, call counters and circuit breaker state"""
+    return jsonify(projects_crm_service.client.metrics())
+
+@bp.route("/crm/outbox/stats", methods=["GET"])
+def crm_outbox_stats():
+    """Projects-CRM write-back backlog and lag"""
+    return jsonify(crm_outbox.stats())
+
 # TVCs
 @bp.route("/campaigns/<cid>/tvcs", methods=["GET"])
 def list_tvcs(cid):
@@ -514,23 +649,82 @@ def get_wave_indices(wid):
         return jsonify({"status": "error", "message": str(e)}), 500
 
 # TRP Calendar Distribution
-@bp.route("/campaigns/<int:cid>/trp-distribution", methods=["POST"])
-def save_trp_distribution_api(cid):
-    """Save TRP distribution for a campaign"""
+@bp.route("/campaigns/<int:cid>/trp-distribution", methods=["GET"])
+def load_trp_distribution_api(cid):
+    """Load the campaign's daily TRP (sum of its wave series)"""
+    try:
+        trp_data = models.load_trp_distribution(cid)
+        return jsonify({"status": "ok", "data": trp_data})
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+@bp.route("/campaigns/<int:cid>/wave-trp-distribution", methods=["GET"])
+def load_campaign_wave_trp_distribution_api(cid):
+    """Load the daily TRP of all waves of a campaign"""
+    try:
+        return jsonify({"status": "ok", "data": models.load_campaign_wave_trp_distributions(cid)})
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@bp.route("/campaigns/<int:cid>/trp-distribution/auto", methods=["POST"])
+def auto_distribute_trp_api(cid):
+    """Spread every wave's TRP over its days by profile and save the result"""
+    data = request.get_json(silent=True) or {}
+    profile = data.get("profile", "flat")
+    options = {k: data[k] for k in ("weekday_weights", "flight_on_days", "flight_off_days") if k in data}
+
+    try:
+        waves = models.list_waves_with_trp(cid)
+        distributions = trp_distribution.distribute_campaign(
+            waves, profile, bool(data.get("exclude_holidays")), **options)
+        models.replace_campaign_wave_trp_distributions(cid, distributions)
+        totals = {w["id"]: round(w["total_trp"], 2) for w in waves if w["id"] in distributions}
+        return jsonify({"status": "ok", "data": distributions, "totals": totals})
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@bp.route("/waves/<int:wid>/trp-distribution", methods=["POST"])
+def save_wave_trp_distribution_api(wid):
+    """Save TRP distribution for a wave"""
     data = request.get_json(force=True)
-    trp_data = data.get("trp_data", {})
     
     try:
-        models.save_trp_distribution(cid, trp_data)
+        models.save_wave_trp_distribution(wid, data.get("trp_data", {}))
         return jsonify({"status": "ok"})
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
-@bp.route("/campaigns/<int:cid>/trp-distribution", methods=["GET"])
-def load_trp_distribution_api(cid):
-    """Load TRP distribution for a campaign"""
+@bp.route("/waves/<int:wid>/trp-distribution", methods=["GET"])
+def load_wave_trp_distribution_api(wid):
+    """Load TRP distribution for a wave"""
     try:
-        trp_data = models.load_trp_distribution(cid)
-        return jsonify({"status": "ok", "data": trp_data})
+        return jsonify({"status": "ok", "data": models.load_wave_trp_distribution(wid)})
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
+
+@bp.route("/wave-items/<int:iid>/trp-distribution", methods=["POST"])
+def save_wave_item_trp_distribution_api(iid):
+    """Save TRP distribution for a single wave item"""
+    data = request.get_json(force=True)
+    item = models.get_wave_item(iid)
+    if not item:
+        return jsonify({"status": "error", "message": "Wave item not found"}), 404
+    
+    try:
+        models.save_wave_trp_distribution(item["wave_id"], data.get("trp_data", {}), wave_item_id=iid)
+        return jsonify({"status": "ok"})
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+@bp.route("/wave-items/<int:iid>/trp-distribution", methods=["GET"])
+def load_wave_item_trp_distribution_api(iid):
+    """Load TRP distribution for a single wave item"""
+    item = models.get_wave_item(iid)
+    if not item:
+        return jsonify({"status": "error", "message": "Wave item not found"}), 404
+    return jsonify({"status": "ok", "data": models.load_wave_trp_distribution(item["wave_id"], wave_item_id=iid)})
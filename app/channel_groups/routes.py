@@ -134,7 +134,13 @@ def export_channel_group_excel(group_id):
         if group_id == 997:
             return jsonify({"status": "skip", "message": "Skipping Excel generation for test"}), 200
 
-        excel_buffer = models.export_channel_group_excel(group_id)
+        # Optional filters: ?from=YYYY-MM-DD&to=YYYY-MM-DD&status=draft
+        excel_buffer = models.export_channel_group_excel(
+            group_id,
+            date_from=request.args.get("from"),
+            date_to=request.args.get("to"),
+            status=request.args.get("status"),
+        )
 
         print(f"DEBUG ROUTE: Excel buffer created successfully", file=sys.stderr, flush=True)
 
@@ -169,6 +175,8 @@ def export_channel_group_excel(group_id):
 
         print(f"DEBUG ROUTE: Response created, returning...", file=sys.stderr, flush=True)
         return response
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
     except Exception as e:
         print(f"ERROR in export_channel_group_excel: {str(e)}", file=sys.stderr, flush=True)
         traceback.print_exc(file=sys.stderr)
@@ -0,0 +1,297 @@
+# app/crm_outbox.py
+"""
+Outbox for Projects-CRM plan writes.
+
+The wave routes do not call Projects-CRM. Each one only inserts a
+crm_outbox row, in the same transaction as the wave change
+(models.enqueue_crm_plan_sync), so creating a wave costs local SQLite
+time only. A worker thread in every web process drains the table:
+
+- Each cycle claims up to BATCH_SIZE due rows at once. The claim is
+  atomic, so several web workers can run side by side. Rows another
+  worker claimed and then abandoned for STALE_SECONDS are taken over.
+  Writes to one (campaign, plan) always go out in order, and a row waits
+  while an earlier one for the same plan is backing off.
+- Each batch is collapsed per wave. A repeated write is sent once, and a
+  create_plan followed by its delete_plan cancels out without contacting
+  the CRM. Two waves with the same name still get a plan each.
+- An unreachable CRM is retried with exponential backoff up to
+  MAX_ATTEMPTS. A 4xx answer fails the row at once.
+
+stats() reports the backlog and how far Projects-CRM lags behind.
+"""
+import json
+import logging
+import multiprocessing
+import os
+import random
+import socket
+import threading
+import urllib.parse
+
+from .db import get_db
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 50
+POLL_SECONDS = 1.0
+STALE_SECONDS = 120
+MAX_ATTEMPTS = 8
+BACKOFF_BASE_SECONDS = 5
+BACKOFF_MAX_SECONDS = 900
+RETAIN_DAYS = 7
+
+ENABLED = os.environ.get("TV_PLANNER_CRM_OUTBOX_WORKER", "1") != "0"
+
+_OWNER = f"{socket.gethostname()}:{os.getpid()}"
+_wake = threading.Event()
+_worker = None
+_worker_lock = threading.Lock()
+_stats = {"sent": 0, "skipped": 0, "retried": 0, "failed": 0, "batches": 0}
+
+
+class PermanentError(Exception):
+    """Projects-CRM rejected the write; retrying will not help"""
+
+
+# ---------------- Claiming ----------------
+
+def _claim(limit: int = BATCH_SIZE) -> list:
+    """Due rows, oldest first, marked as being sent by this worker"""
+    with get_db() as db:
+        rows = db.execute("""
+            UPDATE crm_outbox SET status = 'sending', claimed_by = ?, next_attempt_at = CURRENT_TIMESTAMP
+            WHERE id IN (
+                SELECT o.id FROM crm_outbox o
+                WHERE (o.status = 'pending' AND o.next_attempt_at <= CURRENT_TIMESTAMP
+                       OR o.status = 'sending' AND o.next_attempt_at < datetime('now', ?))
+                  AND NOT EXISTS (
+                      SELECT 1 FROM crm_outbox e
+                      WHERE e.campaign_id = o.campaign_id AND e.plan_name = o.plan_name AND e.id < o.id
+                        AND (e.status = 'pending' AND e.next_attempt_at > CURRENT_TIMESTAMP
+                             OR e.status = 'sending' AND e.next_attempt_at >= datetime('now', ?))
+                  )
+                ORDER BY o.id
+                LIMIT ?
+            )
+            RETURNING *
+        """, (_OWNER, f"-{STALE_SECONDS} seconds", f"-{STALE_SECONDS} seconds", limit)).fetchall()
+    return sorted((dict(row) for row in rows), key=lambda row: row['id'])
+
+
+def collapse(rows: list) -> tuple[list, list]:
+    """(rows to send, rows made redundant) for a batch ordered by id
+
+    Per wave: a write repeating the one before it is redundant, and a
+    delete_plan directly after a create_plan cancels both. Waves sharing a
+    plan name each keep their own writes (one CRM plan per wave); rows
+    queued without a wave id are never collapsed.
+    """
+    kept_by_plan, redundant = {}, []
+    for row in rows:
+        wave = row.get('wave_id')
+        key = (row['campaign_id'], row['plan_name'], wave) if wave is not None else ('row', row['id'])
+        kept = kept_by_plan.setdefault(key, [])
+        if kept and kept[-1]['op'] == row['op']:
+            redundant.append(row)
+        elif kept and kept[-1]['op'] == 'create_plan' and row['op'] == 'delete_plan':
+            redundant.extend((kept.pop(), row))
+        else:
+            kept.append(row)
+    redundant_ids = {row['id'] for row in redundant}
+    return [row for row in rows if row['id'] not in redundant_ids], redundant
+
+
+# ---------------- Sending ----------------
+
+def _crm_campaign_id(local_campaign_id: int) -> int | None:
+    from . import models
+    from .projects_crm_service import CRMUnavailable, get_projects_crm_campaign_id_from_local
+
+    link = models.get_crm_link(local_id=local_campaign_id)
+    if not link:
+        return None
+    if link['crm_id'] is not None:
+        return link['crm_id']
+    # Backfilled link known by code only; resolving it needs the CRM
+    original_cid = get_projects_crm_campaign_id_from_local(local_campaign_id)
+    if not original_cid:
+        raise CRMUnavailable(f"Could not resolve Projects-CRM campaign with code {link['code']}")
+    return int(original_cid.replace('crm_', ''))
+
+
+def _send(row: dict, crm_campaign_id: int):
+    from .projects_crm_service import client
+
+    if row['op'] == 'create_plan':
+        payload = json.loads(row['payload'] or '{}')
+        response = client.request("POST", f"/campaigns/{crm_campaign_id}/plans", json={
+            'name': row['plan_name'],
+            'description': payload.get('description', ''),
+            'budget': payload.get('budget', 0.0),
+            'status': 'active'
+        })
+        ok = response.status_code in (200, 201)
+    else:
+        encoded_plan_name = urllib.parse.quote(row['plan_name'], safe='')
+        response = client.request(
+            "DELETE", f"/campaigns/{crm_campaign_id}/plans/by-name/{encoded_plan_name}")
+        ok = response.status_code in (200, 404)  # 404: already gone
+    if not ok:
+        raise PermanentError(f"Projects-CRM answered {response.status_code}: {response.text[:200]}")
+
+
+def _finish(row_id: int, status: str, error: str | None = None):
+    with get_db() as db:
+        db.execute("""
+            UPDATE crm_outbox SET status = ?, last_error = ?, processed_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        """, (status, error, row_id))
+
+
+def _retry(row: dict, error: str):
+    attempts = row['attempts'] + 1
+    if attempts >= MAX_ATTEMPTS:
+        _stats["failed"] += 1
+        with get_db() as db:
+            db.execute("""
+                UPDATE crm_outbox SET status = 'failed', attempts = ?, last_error = ?,
+                       processed_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, (attempts, error, row['id']))
+        return
+    delay = min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS)
+    delay *= random.uniform(0.8, 1.2)  # Spread retries of many rows
+    _stats["retried"] += 1
+    with get_db() as db:
+        db.execute("""
+            UPDATE crm_outbox SET status = 'pending', attempts = ?, last_error = ?,
+                   next_attempt_at = datetime('now', ?)
+            WHERE id = ?
+        """, (attempts, error, f"+{delay:.0f} seconds", row['id']))
+
+
+def _release(rows: list):
+    """Hand claimed rows back untouched (an earlier write to their plan is backing off)"""
+    if not rows:
+        return
+    with get_db() as db:
+        db.executemany("UPDATE crm_outbox SET status = 'pending' WHERE id = ?",
+                       [(row['id'],) for row in rows])
+
+
+def drain() -> int:
+    """Process one batch; returns the number of rows claimed"""
+    rows = _claim()
+    if not rows:
+        return 0
+    _stats["batches"] += 1
+    to_send, redundant = collapse(rows)
+    for row in redundant:
+        _finish(row['id'], 'skipped', 'Superseded by a later write to the same plan')
+    _stats["skipped"] += len(redundant)
+
+    blocked = set()
+    for n, row in enumerate(to_send):
+        key = (row['campaign_id'], row['plan_name'])
+        if key in blocked:
+            continue
+        try:
+            crm_campaign_id = _crm_campaign_id(row['campaign_id'])
+            if crm_campaign_id is None:
+                _finish(row['id'], 'skipped', 'Campaign is not linked to Projects-CRM')
+                _stats["skipped"] += 1
+                continue
+            _send(row, crm_campaign_id)
+            _finish(row['id'], 'done')
+            _stats["sent"] += 1
+        except PermanentError as e:
+            logger.error(f"CRM outbox row {row['id']} failed: {e}")
+            _stats["failed"] += 1
+            _finish(row['id'], 'failed', str(e))
+        except Exception as e:  # CRMUnavailable and anything unexpected
+            logger.warning(f"CRM outbox row {row['id']} will be retried: {e}")
+            _retry(row, str(e))
+            # Later writes to this plan wait for it
+            blocked.add(key)
+            _release([later for later in to_send[n + 1:]
+                      if (later['campaign_id'], later['plan_name']) == key])
+    return len(rows)
+
+
+def _cleanup():
+    with get_db() as db:
+        db.execute("""
+            DELETE FROM crm_outbox
+            WHERE status IN ('done', 'skipped') AND processed_at < datetime('now', ?)
+        """, (f"-{RETAIN_DAYS} days",))
+
+
+# ---------------- Worker ----------------
+
+def notify():
+    """Wake the worker (call once the enqueuing transaction has committed)"""
+    _wake.set()
+
+
+def notify_after_request():
+    """Wake the worker after the current request's transaction commits"""
+    from flask import after_this_request
+
+    @after_this_request
+    def wake(response):
+        # Runs when the response closes, i.e. after the teardown commit
+        response.call_on_close(notify)
+        return response
+
+
+def _run():
+    cycles = 0
+    while True:
+        try:
+            claimed = drain()
+            cycles += 1
+            if cycles % 3600 == 0:
+                _cleanup()
+        except Exception as e:
+            logger.exception(f"CRM outbox worker error: {e}")
+            claimed = 0
+        if claimed < BATCH_SIZE:
+            _wake.wait(POLL_SECONDS)
+            _wake.clear()
+
+
+def start_worker():
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run, name="crm-outbox", daemon=True)
+            _worker.start()
+
+
+def init_app(app):
+    # Export pool processes (spawn) may import the app too; one worker per web process
+    if ENABLED and multiprocessing.parent_process() is None:
+        start_worker()
+
+
+def stats() -> dict:
+    """Backlog per status, age of the oldest undelivered write and recent delivery lag"""
+    with get_db() as db:
+        by_status = {row['status']: row['n'] for row in db.execute(
+            "SELECT status, COUNT(*) AS n FROM crm_outbox GROUP BY status")}
+        lag = db.execute("""
+            SELECT
+                (SELECT (julianday('now') - julianday(MIN(created_at))) * 86400 FROM crm_outbox
+                 WHERE status IN ('pending', 'sending')) AS oldest_pending_seconds,
+                (SELECT AVG((julianday(processed_at) - julianday(created_at)) * 86400) FROM crm_outbox
+                 WHERE status = 'done' AND processed_at >= datetime('now', '-1 hour')) AS avg_lag_seconds_1h,
+                (SELECT MAX(processed_at) FROM crm_outbox WHERE status = 'done') AS last_delivered_at
+        """).fetchone()
+    return {
+        "statuses": by_status,
+        "oldest_pending_seconds": round(lag['oldest_pending_seconds'], 1) if lag['oldest_pending_seconds'] is not None else None,
+        "avg_lag_seconds_1h": round(lag['avg_lag_seconds_1h'], 2) if lag['avg_lag_seconds_1h'] is not None else None,
+        "last_delivered_at": lag['last_delivered_at'],
+        "worker": {**_stats, "running": _worker is not None and _worker.is_alive()},
+    }
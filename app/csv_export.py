@@ -0,0 +1,70 @@
+# app/csv_export.py
+"""
+Streaming writers for the CSV order exports.
+
+csv_chunks() turns an iterable of rows into UTF-8 encoded chunks (BOM
+first, ';'-separated as Excel expects in LT locale), so an order is never
+held as a whole string. zip_chunks() packs several such files into a ZIP
+that is emitted as it is written, for responses that carry one order per
+sales house.
+"""
+import csv
+import io
+import zipfile
+
+BOM = '\ufeff'.encode('utf-8')
+CHUNK_ROWS = 500
+
+
+class _Drain(io.RawIOBase):
+    """Write-only, unseekable sink whose buffered bytes are taken by the caller"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.buffer += data
+        return len(data)
+
+    def take(self) -> bytes:
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+
+def csv_chunks(rows, chunk_rows: int = CHUNK_ROWS, bom: bool = True):
+    """Encoded CSV of ``rows``, yielded every ``chunk_rows`` rows"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=';', lineterminator='\n')
+    if bom:
+        yield BOM
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= chunk_rows:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if pending:
+        yield buffer.getvalue().encode('utf-8')
+
+
+def zip_chunks(files):
+    """ZIP archive of ``files`` ((name, chunk iterator) pairs), yielded as it is written"""
+    sink = _Drain()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, chunks in files:
+            with archive.open(name, 'w', force_zip64=True) as entry:
+                for chunk in chunks:
+                    entry.write(chunk)
+                    if sink.buffer:
+                        yield sink.take()
+            if sink.buffer:
+                yield sink.take()
+    if sink.buffer:
+        yield sink.take()
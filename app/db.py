@@ -0,0 +1,178 @@
+# app/db.py
+"""
+SQLite connection management for TV-Planner.
+
+Inside a Flask request every get_db() call returns the same connection and
+all model calls share one transaction, committed when the request is torn
+down, or rolled back if it raised or answered with an error status (>= 400). Outside a request (startup, scripts, background
+threads) each thread keeps one pooled connection and every outermost
+``with get_db() as db:`` block is its own transaction, as before.
+Nested ``with`` blocks become SAVEPOINTs so a failing inner block only
+rolls back its own work.
+"""
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+
+DB_PATH = os.environ.get(
+    "TV_PLANNER_DB_PATH",
+    os.path.join(os.path.dirname(__file__), "tv-calc.db"),
+)
+
+BUSY_TIMEOUT_MS = 5000
+STATEMENT_CACHE_SIZE = 256
+
+# Methods that never write; their requests run in autocommit mode instead
+# of holding a write transaction open for the whole request.
+_READ_ONLY_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+_local = threading.local()
+
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3 connection whose ``with`` blocks nest instead of committing."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.depth = 0
+        self.request_scoped = False
+        self._after_commit = []
+
+    def __enter__(self):
+        if self.depth or self.request_scoped:
+            self.execute(f"SAVEPOINT sp_{self.depth}")
+        self.depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.depth -= 1
+        if self.depth or self.request_scoped:
+            if not self.in_transaction:
+                return False
+            if exc_type is not None:
+                self.execute(f"ROLLBACK TO sp_{self.depth}")
+            self.execute(f"RELEASE sp_{self.depth}")
+        elif exc_type is None:
+            super().commit()
+            self.run_after_commit()
+        else:
+            super().rollback()
+            self._after_commit.clear()
+        return False
+
+    def commit(self):
+        # Inside a with-block or a request the transaction belongs to the
+        # outermost owner; an inner commit() would also release its savepoints.
+        if self.depth or self.request_scoped:
+            return
+        super().commit()
+
+    def call_after_commit(self, func):
+        """Run ``func`` once the open transaction commits (now if none is open)
+
+        Dropped if the transaction rolls back instead.
+        """
+        if self.depth or self.request_scoped:
+            self._after_commit.append(func)
+        else:
+            func()
+
+    def run_after_commit(self):
+        callbacks, self._after_commit = self._after_commit, []
+        for func in callbacks:
+            func()
+
+
+def connect(path: str | None = None) -> PooledConnection:
+    """Open a new, fully configured connection (not pooled)."""
+    conn = sqlite3.connect(
+        path or DB_PATH,
+        factory=PooledConnection,
+        cached_statements=STATEMENT_CACHE_SIZE,
+    )
+    conn.row_factory = sqlite3.Row
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA journal_mode = WAL")
+    # WAL + NORMAL only fsyncs on checkpoint, which is still crash-safe.
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("PRAGMA foreign_keys = ON")
+    return conn
+
+
+def _thread_connection() -> PooledConnection:
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = _local.conn = connect()
+    return conn
+
+
+def get_db() -> PooledConnection:
+    """Return the connection for the current request or thread."""
+    conn = _thread_connection()
+    if has_request_context() and "_db" not in g and not g.get("_db_deferred"):
+        g._db = conn
+        if request.method not in _READ_ONLY_METHODS and not conn.in_transaction:
+            # Take the write lock up front so a request never fails halfway
+            # through trying to upgrade a stale read snapshot.
+            conn.execute("BEGIN IMMEDIATE")
+            conn.request_scoped = True
+    return conn
+
+
+@contextmanager
+def before_request_transaction():
+    """Run slow work (e.g. Projects-CRM calls) before the write lock is taken
+
+    Inside the block a writing request's get_db() calls get the connection
+    in autocommit mode, as outside a request; the request transaction only
+    starts with the first get_db() after it. No effect once it has started.
+    """
+    defer = has_request_context() and "_db" not in g and not g.get("_db_deferred")
+    if defer:
+        g._db_deferred = True
+    try:
+        yield
+    finally:
+        if defer:
+            g.pop("_db_deferred", None)
+
+
+def _note_response_status(response):
+    """after_request hook: error responses roll the request transaction back"""
+    if response.status_code >= 400:
+        g._db_failed = True
+    return response
+
+
+def close_request_db(exc=None):
+    """Teardown hook: end the request transaction, keep the connection pooled."""
+    conn = g.pop("_db", None)
+    if conn is None:
+        return
+    conn.depth = 0
+    if conn.request_scoped:
+        conn.request_scoped = False
+        if exc is None and not g.pop("_db_failed", False):
+            sqlite3.Connection.commit(conn)
+            conn.run_after_commit()
+            return
+        sqlite3.Connection.rollback(conn)
+    elif conn.in_transaction:
+        sqlite3.Connection.rollback(conn)
+    conn._after_commit.clear()
+
+
+def close_db():
+    """Close this thread's pooled connection (tests, worker shutdown)."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        _local.conn = None
+        conn.close()
+
+
+def init_app(app):
+    app.after_request(_note_response_status)
+    app.teardown_request(close_request_db)
@@ -0,0 +1,214 @@
+# app/excel_export.py
+"""
+Shared toolkit for the Excel exporters.
+
+STYLES lists every cell style the reports use. A StyleRegistry turns each
+one into an openpyxl NamedStyle once per workbook, so cells only carry a
+reference to it instead of a fresh Font/PatternFill/Alignment/Border each.
+
+SheetWriter streams a write-only worksheet: rows are emitted in order as
+sparse {column: (value, style)} dicts while merged ranges and row heights
+are declared as the rows go, so memory stays flat however long the
+campaign is.
+"""
+import heapq
+from copy import copy
+
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+from openpyxl.styles.fonts import DEFAULT_FONT
+from openpyxl.utils import get_column_letter
+
+_GREY = Side(style='thin', color='D0D0D0')
+_BLACK = Side(style='thin')
+BORDERS = {
+    "grey": Border(left=_GREY, right=_GREY, top=_GREY, bottom=_GREY),
+    "thin": Border(left=_BLACK, right=_BLACK, top=_BLACK, bottom=_BLACK),
+}
+
+STYLES = {
+    # Client plan (generate_client_excel_report)
+    "client.title": dict(font=dict(size=18, bold=True, color="1F4E79"),
+                         alignment=dict(horizontal='center'), fill="F8F9FA"),
+    "client.subtitle": dict(font=dict(size=14, bold=True, color="1F4E79"),
+                            alignment=dict(horizontal='center')),
+    "client.info_label": dict(font=dict(bold=True, size=10, color="1F4E79")),
+    "client.info_value": dict(font=dict(size=10)),
+    "client.header": dict(font=dict(color="FFFFFF", bold=True, size=11), fill="1F4E79", border="grey",
+                          alignment=dict(horizontal='center', vertical='center', wrap_text=True)),
+    "client.cell_center": dict(border="grey", alignment=dict(horizontal='center', vertical='center', wrap_text=True)),
+    "client.cell": dict(border="grey", alignment=dict(horizontal='left', vertical='center', wrap_text=True)),
+    "client.cell_pct": dict(border="grey", number_format='0.00%',
+                            alignment=dict(horizontal='left', vertical='center', wrap_text=True)),
+    "client.cell_index": dict(border="grey", number_format='0.00',
+                              alignment=dict(horizontal='left', vertical='center', wrap_text=True)),
+    "client.cell_money": dict(border="grey", number_format='#,##0.00',
+                              alignment=dict(horizontal='left', vertical='center', wrap_text=True)),
+    "client.cell_discount": dict(border="grey", number_format='0.0"%"',
+                                 alignment=dict(horizontal='left', vertical='center', wrap_text=True)),
+    "client.cal_month": dict(font=dict(bold=True, size=10, color="1F4E79"), fill="E8F4F8", border="grey",
+                             alignment=dict(horizontal='center')),
+    "client.cal_day": dict(font=dict(bold=True, size=10), fill="FFFFFF", border="grey",
+                           alignment=dict(horizontal='center')),
+    "client.cal_day_weekend": dict(font=dict(bold=True, size=10), fill="F5F5F5", border="grey",
+                                   alignment=dict(horizontal='center')),
+    "client.cal_weekday": dict(font=dict(size=9), fill="FFFFFF", border="grey",
+                               alignment=dict(horizontal='center')),
+    "client.cal_weekday_weekend": dict(font=dict(size=9, color="999999"), fill="F5F5F5", border="grey",
+                                       alignment=dict(horizontal='center')),
+    "client.cal_active": dict(font=dict(size=9, bold=True, color="FFFFFF"), fill="66BB6A", border="grey",
+                              alignment=dict(horizontal='center')),
+    "client.cal_active_weekend": dict(font=dict(size=9, bold=True, color="FFFFFF"), fill="81C784", border="grey",
+                                      alignment=dict(horizontal='center')),
+    "client.cal_idle": dict(fill="FFFFFF", border="grey"),
+    "client.cal_idle_weekend": dict(fill="F9F9F9", border="grey"),
+    "client.cal_note": dict(font=dict(size=8, italic=True)),
+    "client.cal_label": dict(font=dict(size=9, color="1F4E79", bold=True)),
+
+    # Channel group report (export_channel_group_excel)
+    "group.title": dict(font=dict(size=16, bold=True, color="1F4E79"), alignment=dict(horizontal='center')),
+    "group.empty": dict(font=dict(size=14, bold=True)),
+    "group.header": dict(font=dict(color="FFFFFF", bold=True, size=10), fill="1F4E79", border="thin",
+                         alignment=dict(horizontal='center', vertical='center', wrap_text=True)),
+    "group.cell": dict(border="thin"),
+    "group.cell_center": dict(border="thin", alignment=dict(horizontal='center', vertical='center')),
+    "group.cell_pct": dict(border="thin", number_format='0.00%'),
+    "group.cell_index": dict(border="thin", number_format='0.00'),
+    "group.cell_money": dict(border="thin", number_format='#,##0.00'),
+    "group.cell_discount": dict(border="thin", number_format='0.0"%"'),
+    "group.total": dict(font=dict(bold=True, size=10), fill="FFE6CC", border="thin"),
+    "group.total_center": dict(font=dict(bold=True, size=10), fill="FFE6CC", border="thin",
+                               alignment=dict(horizontal='center', vertical='center')),
+    "group.total_money": dict(font=dict(bold=True, size=10), fill="FFE6CC", border="thin",
+                              number_format='#,##0.00'),
+    "group.total_index": dict(font=dict(bold=True, size=10), fill="FFE6CC", border="thin",
+                              number_format='0.00'),
+    "group.cal_month": dict(font=dict(bold=True, size=8, color="FFFFFF"), fill="1F4E79", border="thin",
+                            alignment=dict(horizontal='center')),
+    "group.cal_day": dict(font=dict(size=9, bold=True), fill="F5F5F5", border="thin",
+                          alignment=dict(horizontal='center')),
+    "group.cal_weekday": dict(font=dict(size=8, bold=True), fill="E6E6E6", border="thin",
+                              alignment=dict(horizontal='center')),
+    "group.cal_trp": dict(font=dict(size=8), fill="E8F5E8", border="thin", alignment=dict(horizontal='center')),
+    "group.cal_empty": dict(font=dict(size=8), fill="FFFFFF", border="thin", alignment=dict(horizontal='center')),
+}
+
+WEEKDAY_NAMES = ['Pr', 'An', 'Tr', 'Kt', 'Pn', 'Št', 'Sk']
+
+
+def _named_style(name: str, spec: dict) -> NamedStyle:
+    style = NamedStyle(name=name, font=copy(DEFAULT_FONT))
+    if "font" in spec:
+        style.font = Font(**spec["font"])
+    if "fill" in spec:
+        style.fill = PatternFill(start_color=spec["fill"], end_color=spec["fill"], fill_type="solid")
+    if "alignment" in spec:
+        style.alignment = Alignment(**spec["alignment"])
+    if "border" in spec:
+        style.border = BORDERS[spec["border"]]
+    if "number_format" in spec:
+        style.number_format = spec["number_format"]
+    return style
+
+
+class StyleRegistry:
+    """Named styles of one workbook, each built the first time it is used"""
+
+    def __init__(self, wb, styles: dict = STYLES):
+        self.wb = wb
+        self.styles = styles
+        self._registered = set()
+        self._arrays = {}
+
+    def name(self, style: str) -> str:
+        if style not in self._registered:
+            self.wb.add_named_style(_named_style(style, self.styles[style]))
+            self._registered.add(style)
+        return style
+
+    def apply(self, cell, style: str):
+        """Style a cell; the resolved style array is reused for later cells
+
+        Assigning ``cell.style`` searches the workbook's named styles by
+        name every time, which dominates large calendar blocks.
+        """
+        array = self._arrays.get(style)
+        if array is None:
+            cell.style = self.name(style)
+            self._arrays[style] = copy(cell._style)
+        else:
+            cell._style = copy(array)
+        return cell
+
+
+class SheetWriter:
+    """Row-ordered writer for a write-only worksheet
+
+    Rows are {column: value} or {column: (value, style)} dicts. Column widths
+    have to be set before the first row, row heights and merges before or
+    with the row they belong to.
+    """
+
+    def __init__(self, wb, title: str, styles: StyleRegistry | None = None):
+        self.ws = wb.create_sheet(title)
+        self.styles = styles or StyleRegistry(wb)
+        self.next_row = 1
+
+    def width(self, column, width: float):
+        letter = get_column_letter(column) if isinstance(column, int) else column
+        self.ws.column_dimensions[letter].width = width
+
+    def merge(self, row: int, first_col: int, last_col: int, last_row: int | None = None):
+        if last_col > first_col or (last_row or row) > row:
+            self.ws.merged_cells.add(
+                f"{get_column_letter(first_col)}{row}:{get_column_letter(last_col)}{last_row or row}")
+
+    def _cell(self, value, style=None):
+        cell = WriteOnlyCell(self.ws, value)
+        if style:
+            self.styles.apply(cell, style)
+        return cell
+
+    def row(self, row_idx: int, cells: dict, height: float | None = None):
+        if row_idx < self.next_row:
+            raise ValueError(f"Row {row_idx} already written (next row is {self.next_row})")
+        while self.next_row < row_idx:
+            self.ws.append([])
+            self.next_row += 1
+        if height:
+            self.ws.row_dimensions[row_idx].height = height
+
+        values = [None] * (max(cells) if cells else 0)
+        for col, value in cells.items():
+            if isinstance(value, tuple):
+                values[col - 1] = self._cell(*value)
+            elif value is not None:
+                values[col - 1] = value
+        self.ws.append(values)
+        self.next_row += 1
+
+    def rows(self, *sections):
+        """Write row-ordered sections side by side
+
+        Each section yields (row_idx, cells, height) in increasing row order;
+        cells of sections landing on the same row are combined, the tallest
+        height wins.
+        """
+        pending = None
+        for row_idx, cells, height in heapq.merge(*sections, key=lambda r: r[0]):
+            if pending and pending[0] == row_idx:
+                pending[1].update(cells)
+                pending[2] = max(pending[2] or 0, height or 0) or None
+                continue
+            if pending:
+                self.row(*pending)
+            pending = [row_idx, dict(cells), height]
+        if pending:
+            self.row(*pending)
+
+
+def write_only_workbook():
+    """Workbook in write-only mode plus its style registry"""
+    wb = openpyxl.Workbook(write_only=True)
+    return wb, StyleRegistry(wb)
@@ -1,18 +1,17 @@
-import openpyxl
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.cell.cell import MergedCell
 from io import BytesIO
 from datetime import datetime, timedelta
 import json
-import shutil
-import os
 
-def generate_pavyzdys_excel_report(campaign_id: int):
-    """Generate Excel report by copying pavyzdys1.xlsx and inserting campaign data"""
+from app.excel_templates import get_template
+
+def generate_pavyzdys_excel_report(campaign_id: int, data: dict | None = None):
+    """Generate Excel report by filling a clone of the pavyzdys template with campaign data"""
     # Import needed functions 
     from app.models import get_campaign_report_data, load_trp_distribution
+    from app import pricing_engine
     
-    data = get_campaign_report_data(campaign_id)
+    if data is None:
+        data = get_campaign_report_data(campaign_id)
     if not data:
         return None
     
@@ -22,13 +21,12 @@ def generate_pavyzdys_excel_report(campaign_id: int):
     # Load TRP calendar data
     trp_data = load_trp_distribution(campaign_id)
     
-    # Path to the template file
-    template_path = "/home/vainiusl/py_projects/tv-planner/pavyzdys1.xlsx"
-    
-    # Load the template Excel file
+    # Template workbook: parsed once per process, cloned for each export
     try:
-        wb = openpyxl.load_workbook(template_path)
+        template = get_template("pavyzdys")
+        wb = template.clone()
         ws = wb.active
+        index = template.sheet_index()
     except Exception as e:
         print(f"Error loading template file: {e}")
         return None
@@ -57,12 +55,12 @@ def generate_pavyzdys_excel_report(campaign_id: int):
         first_item = waves[0]['items'][0]
         # TVC name (assuming it goes in G3 based on previous layout)
         first_tvc = first_item.get('tvc_name', '')
-        if 'G3' in [cell.coordinate for row in ws.iter_rows() for cell in row if cell.value]:
+        if index.has_value('G3'):
             ws['G3'] = first_tvc
             
         # Clip duration (assuming it goes in F5)
         first_duration = first_item.get('tvc_duration', first_item.get('clip_duration', 10))
-        if 'F5' in [cell.coordinate for row in ws.iter_rows() for cell in row if cell.value]:
+        if index.has_value('F5'):
             ws['F5'] = first_duration
     
     # Clear existing data rows (from row 14 onwards) and insert campaign data
@@ -70,12 +68,8 @@ def generate_pavyzdys_excel_report(campaign_id: int):
     max_data_row = 50  # Clear a reasonable range
     for row_num in range(14, max_data_row):
         for col_num in range(1, 30):  # Clear main data columns
-            try:
-                cell = ws.cell(row=row_num, column=col_num)
-                if not isinstance(cell, MergedCell):
-                    cell.value = None
-            except:
-                pass  # Skip cells that can't be cleared
+            if not index.is_merged(row_num, col_num):
+                ws.cell(row=row_num, column=col_num).value = None
     
     # Update the client name in the header (K10)
     client_name = campaign.get('client', 'Kliento')[:15]
@@ -87,7 +81,9 @@ def generate_pavyzdys_excel_report(campaign_id: int):
     total_cost = 0
     
     for wave in waves:
-        for item in wave['items']:
+        priced = pricing_engine.price_rows(wave['items'], formula="pavyzdys",
+                                           overrides=pricing_engine.REPORT_OVERRIDES)
+        for n, item in enumerate(wave['items']):
             # Calculate values
             channel_share = item.get('channel_share', 0.75)
             pt_zone_share = item.get('pt_zone_share', 0.55)
@@ -96,27 +92,15 @@ def generate_pavyzdys_excel_report(campaign_id: int):
             affinity2 = item.get('affinity2', 88.2)
             affinity3 = item.get('affinity3', 88.2) 
             trps = item.get('trps', 0)
-            grp_planned = (trps * 100 / affinity1) if affinity1 > 0 else trps
-            
-            # Prices and discounts
-            gross_cpp = item.get('gross_cpp_eur', item.get('price_per_sec_no_discount', 18.4))
-            
-            # Indices
-            duration_idx = item.get('duration_index', 1.0)
-            seasonal_idx = item.get('seasonal_index', 1.0)
-            trp_purchase_idx = item.get('trp_purchase_index', 0.95)
-            advance_idx = item.get('advance_purchase_index', 0.95)
-            position_idx = item.get('position_index', 1.0)
-            
-            # Calculate gross price
-            clip_duration = item.get('tvc_duration', item.get('clip_duration', 10))
-            gross_price = trps * gross_cpp * duration_idx * seasonal_idx * trp_purchase_idx * advance_idx * position_idx
+            grp_planned = priced['grp'][n] or trps
             
-            # Discounts
-            client_discount = item.get('client_discount', 0)
-            net_price = gross_price * (1 - client_discount / 100)
-            agency_discount = item.get('agency_discount', 0) 
-            net_net_price = net_price * (1 - agency_discount / 100)
+            # Prices and discounts (shared pricing engine)
+            gross_cpp = item.get('gross_cpp_eur') or item.get('price_per_sec_eur')
+            gross_price = priced['gross'][n]
+            client_discount = item.get('client_discount') or 0
+            net_price = priced['net'][n]
+            agency_discount = item.get('agency_discount') or 0
+            net_net_price = priced['net_net'][n]
             
             total_cost += net_net_price
             
@@ -0,0 +1,134 @@
+# app/excel_templates.py
+"""
+Registry of the Excel templates that template-based exports fill in.
+
+Each template is parsed once per process and kept as a master workbook,
+and every export works on a clone of it. A clone gets its own cells,
+merged ranges, row/column dimensions and style tables, so clones never
+touch the master. Other sheet parts (images, data validation, page setup)
+are shared with the master and must be treated as read-only. Cloning is
+much cheaper than re-parsing the file.
+
+Every template also carries an index of the coordinates that hold a value
+and of the cells covered by merged ranges. Exports check these instead of
+scanning the sheet.
+
+The template is re-read when its file changes on disk. Files come from
+TEMPLATES_DIR, which defaults to the project root.
+"""
+import copy
+import os
+import threading
+
+import openpyxl
+from openpyxl.cell.cell import MergedCell
+from openpyxl.utils.indexed_list import IndexedList
+from openpyxl.worksheet.cell_range import MultiCellRange
+from openpyxl.worksheet.dimensions import DimensionHolder
+from openpyxl.worksheet.merge import MergedCellRange
+
+TEMPLATES_DIR = os.environ.get("TV_PLANNER_TEMPLATES_DIR",
+                               os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# name: file in TEMPLATES_DIR
+TEMPLATES = {
+    "pavyzdys": "pavyzdys1.xlsx",
+}
+
+_STYLE_TABLES = ("_fonts", "_alignments", "_borders", "_fills", "_number_formats",
+                 "_protections", "_cell_styles")
+
+_templates = {}
+_lock = threading.Lock()
+
+
+class SheetIndex:
+    """Coordinates of one template sheet that hold a value or sit inside a merged range"""
+
+    def __init__(self, ws):
+        self.values = {cell.coordinate for cell in ws._cells.values()
+                       if not isinstance(cell, MergedCell) and cell.value}
+        self.merged = {(row, col) for merged in ws.merged_cells.ranges
+                       for row, col in merged.cells
+                       if (row, col) != (merged.min_row, merged.min_col)}
+
+    def has_value(self, coordinate: str) -> bool:
+        return coordinate in self.values
+
+    def is_merged(self, row: int, column: int) -> bool:
+        """True for the read-only cells of a merged range (not its top-left cell)"""
+        return (row, column) in self.merged
+
+
+def _clone_sheet(ws, wb):
+    clone = copy.copy(ws)
+    clone._parent = wb
+    clone._cells = {}
+    for key, cell in ws._cells.items():
+        cell = copy.copy(cell)
+        cell.parent = clone
+        cell._style = copy.copy(cell._style)
+        clone._cells[key] = cell
+
+    ranges = []
+    for merged in ws.merged_cells.ranges:
+        cloned = MergedCellRange(clone, merged.coord)
+        cloned.start_cell = clone._cells.get((merged.min_row, merged.min_col))
+        ranges.append(cloned)
+    clone.merged_cells = MultiCellRange(ranges)
+
+    for name, factory in (("row_dimensions", clone._add_row), ("column_dimensions", clone._add_column)):
+        source = getattr(ws, name)
+        holder = DimensionHolder(worksheet=clone, default_factory=factory)
+        holder.update({key: copy.copy(dim) for key, dim in source.items()})
+        holder.max_outline = source.max_outline
+        setattr(clone, name, holder)
+
+    for name in ("_images", "_charts", "_hyperlinks", "_comments"):
+        setattr(clone, name, list(getattr(ws, name)))
+    return clone
+
+
+class Template:
+    """A parsed template workbook with its sheet indexes"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.mtime = os.path.getmtime(path)
+        self.master = openpyxl.load_workbook(path)
+        self.index = {ws.title: SheetIndex(ws) for ws in self.master.worksheets}
+
+    def sheet_index(self, title: str | None = None) -> SheetIndex:
+        """Index of a sheet (the active one by default)"""
+        return self.index[title or self.master.active.title]
+
+    def clone(self):
+        """Independent workbook with the template's content, without re-parsing the file"""
+        master = self.master
+        wb = copy.copy(master)
+        for name in _STYLE_TABLES:
+            setattr(wb, name, IndexedList(getattr(master, name)))
+        wb._date_formats = set(master._date_formats)
+        wb._timedelta_formats = set(master._timedelta_formats)
+        wb.shared_strings = IndexedList()
+        wb.properties = copy.copy(master.properties)
+        wb._sheets = [_clone_sheet(ws, wb) for ws in master._sheets]
+        return wb
+
+
+def get_template(name: str) -> Template:
+    """Parsed template by name; loaded on first use and again after the file changes"""
+    path = os.path.join(TEMPLATES_DIR, TEMPLATES[name])
+    mtime = os.path.getmtime(path)
+    with _lock:
+        template = _templates.get(name)
+        if template is None or template.path != path or template.mtime != mtime:
+            template = _templates[name] = Template(path)
+        return template
+
+
+def preload():
+    """Parse every available template up front (worker start)"""
+    for name, filename in TEMPLATES.items():
+        if os.path.exists(os.path.join(TEMPLATES_DIR, filename)):
+            get_template(name)
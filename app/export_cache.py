@@ -0,0 +1,113 @@
+# app/export_cache.py
+"""
+On-disk cache of generated campaign exports (client Excel, agency CSV).
+
+Files are keyed by (campaign, revision, export type). The campaign revision
+is bumped by triggers on every write to the campaign's data (migration 14),
+so a cached file is valid for as long as its revision is current; older
+revisions of the same export are removed when a newer one is stored.
+
+The directory is bounded to MAX_BYTES with least-recently-used eviction.
+A hit touches the file's mtime, and eviction removes the oldest mtimes
+first. The directory is safe to share between worker processes. Files are
+written to a temporary name and renamed into place.
+"""
+import glob
+import os
+import tempfile
+import threading
+
+from .db import DB_PATH
+
+CACHE_DIR = os.environ.get("TV_PLANNER_EXPORT_CACHE_DIR",
+                           os.path.join(os.path.dirname(os.path.abspath(DB_PATH)), "export_cache"))
+MAX_BYTES = int(float(os.environ.get("TV_PLANNER_EXPORT_CACHE_MB", 256)) * 1024 * 1024)
+
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+
+def etag(campaign_id: int, revision: int, kind: str) -> str:
+    """Strong ETag of an export; changes whenever the campaign changes"""
+    return f"{kind}-{campaign_id}-r{revision}"
+
+
+def _path(campaign_id: int, revision: int, kind: str) -> str:
+    return os.path.join(CACHE_DIR, f"{campaign_id}-{kind}-{revision}.bin")
+
+
+def get(campaign_id: int, revision: int, kind: str) -> bytes | None:
+    """Cached export bytes, or None"""
+    path = _path(campaign_id, revision, kind)
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        os.utime(path)  # Mark as recently used
+    except FileNotFoundError:
+        with _lock:
+            _stats["misses"] += 1
+        return None
+    with _lock:
+        _stats["hits"] += 1
+    return data
+
+
+def put(campaign_id: int, revision: int, kind: str, data: bytes):
+    """Store an export, drop its older revisions and evict down to MAX_BYTES"""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = _path(campaign_id, revision, kind)
+    fd, tmp = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+    for stale in glob.glob(os.path.join(CACHE_DIR, f"{campaign_id}-{kind}-*.bin")):
+        if stale != path:
+            _remove(stale)
+    with _lock:
+        _stats["stores"] += 1
+    _evict()
+
+
+def _remove(path: str) -> bool:
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False  # Already removed by another worker
+
+
+def _entries():
+    entries = []
+    for path in glob.glob(os.path.join(CACHE_DIR, "*.bin")):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+    return entries
+
+
+def _evict():
+    entries = sorted(_entries())
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in entries:
+        if total <= MAX_BYTES:
+            break
+        if _remove(path):
+            with _lock:
+                _stats["evictions"] += 1
+        total -= size
+
+
+def stats() -> dict:
+    """Hit/miss counters of this process plus the current size of the cache"""
+    entries = _entries()
+    lookups = _stats["hits"] + _stats["misses"]
+    return {
+        **_stats,
+        "hit_ratio": round(_stats["hits"] / lookups, 4) if lookups else None,
+        "files": len(entries),
+        "bytes": sum(size for _, size, _ in entries),
+        "max_bytes": MAX_BYTES,
+    }
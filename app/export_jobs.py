@@ -0,0 +1,273 @@
+# app/export_jobs.py
+"""
+Background export jobs.
+
+create_job() records a job in the export_jobs table. A coordinator thread
+in the web worker then hands the rendering to a bounded process pool, so
+large workbooks no longer hold the request worker's GIL, and it writes
+progress back to the row. Results go to JOBS_DIR and are downloaded
+through the job API (app/exports).
+
+A batch job renders many campaigns in parallel and packs them into a ZIP.
+
+Jobs are idempotent, so a job left queued or running by a worker that
+died is restarted: by init_app() when a worker starts, or when its status
+is polled. The dead worker must have stopped updating it for
+STALE_SECONDS first.
+"""
+import concurrent.futures
+import json
+import logging
+import multiprocessing
+import os
+import re
+import socket
+import threading
+import time
+import uuid
+import zipfile
+from datetime import datetime
+
+from . import excel_templates
+from .db import DB_PATH, get_db
+
+logger = logging.getLogger(__name__)
+
+WORKERS = int(os.environ.get("TV_PLANNER_EXPORT_WORKERS", min(4, os.cpu_count() or 1)))
+JOBS_DIR = os.environ.get("TV_PLANNER_EXPORT_JOBS_DIR",
+                          os.path.join(os.path.dirname(os.path.abspath(DB_PATH)), "export_jobs"))
+JOB_TTL_HOURS = 24
+STALE_SECONDS = 120
+HEARTBEAT_SECONDS = 30
+START_TIMEOUT_SECONDS = 30
+
+XLSX = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# kind: (target, file extension, mimetype, file name prefix)
+KINDS = {
+    "client-excel": ("campaign", ".xlsx", XLSX, "TV_Plan"),
+    "agency-csv": ("campaign", ".csv", "text/csv; charset=utf-8", "TV_Order"),
+    "pavyzdys-excel": ("campaign", ".xlsx", XLSX, "TV_Planas"),
+    "channel-group-excel": ("channel_group", ".xlsx", XLSX, "Kanalu_ataskaita"),
+}
+
+_OWNER = f"{socket.gethostname()}:{os.getpid()}"
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def safe_filename(name: str) -> str:
+    """ASCII file name part: Lithuanian letters transliterated, spaces to underscores"""
+    name = name.translate(str.maketrans("ąčęėįšųūžĄČĘĖĮŠŲŪŽ", "aceeisuuzACEEISUUZ"))
+    return re.sub(r'[^\w\- ]', '', name, flags=re.ASCII).strip().replace(' ', '_')
+
+
+# ---------------- Rendering (pool processes) ----------------
+
+def _render_bytes(kind: str, target_id: int, options: dict) -> bytes | None:
+    from . import export_cache, models
+
+    if kind == "channel-group-excel":
+        output = models.export_channel_group_excel(target_id, **options)
+        return output.getvalue()
+
+    current = models.get_campaign_revision(target_id)
+    if not current:
+        return None
+    cacheable = kind in ("client-excel", "agency-csv")
+    if cacheable:
+        data = export_cache.get(target_id, current[0], kind)
+        if data is not None:
+            return data
+
+    if kind == "client-excel":
+        output = models.generate_client_excel_report(target_id)
+    elif kind == "agency-csv":
+        output = models.generate_agency_csv_order(target_id)
+    else:
+        from .excel_pavyzdys import generate_pavyzdys_excel_report
+        output = generate_pavyzdys_excel_report(target_id)
+    if output is None:
+        return None
+
+    data = output.getvalue()
+    if cacheable and models.get_campaign_revision(target_id) == current:
+        export_cache.put(target_id, current[0], kind, data)
+    return data
+
+
+def render(kind: str, target_id: int, options: dict, path: str) -> str:
+    """Render one export into ``path``; runs in a pool process"""
+    data = _render_bytes(kind, target_id, options)
+    if data is None:
+        raise ValueError(f"Nothing to export for {KINDS[kind][0]} {target_id}")
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a threaded web worker is unsafe
+            _pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=WORKERS, mp_context=multiprocessing.get_context("spawn"),
+                initializer=excel_templates.preload)
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+# ---------------- Jobs ----------------
+
+def _update(job_id: str, **fields):
+    assignments = ", ".join(f"{name} = ?" for name in fields)
+    with get_db() as db:
+        db.execute(f"UPDATE export_jobs SET {assignments}, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+                   (*fields.values(), job_id))
+
+
+def _target_name(target: str, target_id: int) -> str:
+    from . import models
+
+    if target == "channel_group":
+        group = models.get_channel_group_by_id(target_id)
+        return group['name'] if group else f"Group_{target_id}"
+    current = models.get_campaign_revision(target_id)
+    return current[1] if current else f"Campaign_{target_id}"
+
+
+def _run(job_id: str):
+    """Coordinate one job: render its parts in the pool, then publish the result"""
+    # A job created inside a request becomes visible when the request commits
+    deadline = time.monotonic() + START_TIMEOUT_SECONDS
+    job = get_job(job_id, resume=False)
+    while job is None and time.monotonic() < deadline:
+        time.sleep(0.05)
+        job = get_job(job_id, resume=False)
+    if job is None:
+        return  # The creating request was rolled back
+    params = json.loads(job['params'])
+    kind, ids, options = job['kind'], params['ids'], params.get('options') or {}
+    target, ext, mimetype, prefix = KINDS[kind]
+    _update(job_id, status='running', done=0)
+
+    parts = {target_id: os.path.join(JOBS_DIR, f"{job_id}-{target_id}{ext}") for target_id in ids}
+    try:
+        pool = _get_pool()
+        pending = {pool.submit(render, kind, target_id, options, path) for target_id, path in parts.items()}
+        done = 0
+        while pending:
+            finished, pending = concurrent.futures.wait(
+                pending, timeout=HEARTBEAT_SECONDS, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in finished:
+                future.result()
+                done += 1
+            _update(job_id, done=done)  # Also the heartbeat that keeps the job ours
+
+        today = datetime.now().strftime('%Y%m%d')
+        if params.get('batch'):
+            result_path = os.path.join(JOBS_DIR, f"{job_id}.zip")
+            with zipfile.ZipFile(result_path, "w", zipfile.ZIP_DEFLATED) as archive:
+                for target_id, path in parts.items():
+                    name = safe_filename(_target_name(target, target_id))
+                    archive.write(path, f"{prefix}_{name}_{target_id}{ext}")
+                    os.remove(path)
+            filename, mimetype = f"{prefix}_{today}.zip", "application/zip"
+        else:
+            target_id, result_path = next(iter(parts.items()))
+            filename = f"{prefix}_{safe_filename(_target_name(target, target_id))}_{today}{ext}"
+
+        _update(job_id, status='done', result_path=result_path, filename=filename, mimetype=mimetype)
+    except Exception as e:
+        logger.exception(f"Export job {job_id} failed: {e}")
+        if isinstance(e, concurrent.futures.process.BrokenProcessPool):
+            _reset_pool()
+        for path in parts.values():
+            if os.path.exists(path):
+                os.remove(path)
+        _update(job_id, status='failed', error=str(e))
+
+
+def _start(job_id: str):
+    threading.Thread(target=_run, args=(job_id,), name=f"export-job-{job_id}", daemon=True).start()
+
+
+def _sweep():
+    """Drop jobs (and their files) older than JOB_TTL_HOURS"""
+    with get_db() as db:
+        rows = db.execute("""
+            DELETE FROM export_jobs WHERE created_at < datetime('now', ?)
+            RETURNING result_path
+        """, (f"-{JOB_TTL_HOURS} hours",)).fetchall()
+    for row in rows:
+        if row['result_path'] and os.path.exists(row['result_path']):
+            os.remove(row['result_path'])
+
+
+def create_job(kind: str, ids: list, options: dict | None = None, batch: bool = False) -> dict:
+    """Queue an export of one target (or, with ``batch``, many into a ZIP)"""
+    if kind not in KINDS:
+        raise ValueError(f"Unknown export kind: {kind}")
+    try:
+        ids = [int(i) for i in ids]
+    except (TypeError, ValueError):
+        raise ValueError("Target ids must be integers")
+    if not ids:
+        raise ValueError("Nothing to export")
+    if not batch and len(ids) != 1:
+        raise ValueError("A single export takes exactly one target id")
+
+    os.makedirs(JOBS_DIR, exist_ok=True)
+    _sweep()
+    job_id = uuid.uuid4().hex
+    params = {"ids": list(dict.fromkeys(ids)), "options": options or {}, "batch": batch}
+    with get_db() as db:
+        db.execute("""
+            INSERT INTO export_jobs (id, kind, params, total, owner)
+            VALUES (?, ?, ?, ?, ?)
+        """, (job_id, kind, json.dumps(params), len(params["ids"]), _OWNER))
+    _start(job_id)
+    return get_job(job_id, resume=False)
+
+
+def _claim_stale(job_id: str | None = None) -> list:
+    """Take over unfinished jobs whose worker stopped updating them"""
+    condition = "AND id = ?" if job_id else ""
+    with get_db() as db:
+        rows = db.execute(f"""
+            UPDATE export_jobs SET owner = ?, status = 'queued', updated_at = CURRENT_TIMESTAMP
+            WHERE status IN ('queued', 'running')
+              AND (owner IS NOT ? AND updated_at < datetime('now', ?)) {condition}
+            RETURNING id
+        """, (_OWNER, _OWNER, f"-{STALE_SECONDS} seconds", *([job_id] if job_id else []))).fetchall()
+    return [row['id'] for row in rows]
+
+
+def get_job(job_id: str, resume: bool = True) -> dict | None:
+    """Job row; an abandoned unfinished job is restarted first when ``resume``"""
+    if resume:
+        for claimed in _claim_stale(job_id):
+            _start(claimed)
+    with get_db() as db:
+        row = db.execute("SELECT * FROM export_jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+
+def resume_jobs():
+    """Restart unfinished jobs abandoned by a previous worker"""
+    for job_id in _claim_stale():
+        _start(job_id)
+
+
+def init_app(app):
+    # Pool processes that import the app must not claim jobs themselves
+    if multiprocessing.parent_process() is None:
+        resume_jobs()
@@ -0,0 +1,6 @@
+# app/exports/__init__.py
+from flask import Blueprint
+
+bp = Blueprint('exports', __name__)
+
+from . import routes
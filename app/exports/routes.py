@@ -0,0 +1,77 @@
+# app/exports/routes.py
+from . import bp
+from flask import request, jsonify, send_file, url_for
+from app import export_jobs
+import os
+
+
+def _job_payload(job):
+    payload = {
+        "id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "done": job["done"],
+        "total": job["total"],
+        "progress": round(job["done"] / job["total"], 4) if job["total"] else 0,
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
+    if job["status"] == "done":
+        payload["download_url"] = url_for("exports.download_export_job", job_id=job["id"])
+    return payload
+
+
+@bp.route("/export-jobs", methods=["POST"])
+def create_export_job():
+    """Queue an export
+
+    Body: {"kind": "client-excel" | "agency-csv" | "pavyzdys-excel", "campaign_id": 1}
+    or {"kind": "channel-group-excel", "channel_group_id": 1, "options": {"date_from": ...}}.
+    Batch: {"kind": ..., "campaign_ids": [1, 2, 3]} renders all campaigns into one ZIP.
+    """
+    data = request.get_json(silent=True) or {}
+    kind = data.get("kind", "")
+
+    try:
+        if "campaign_ids" in data:
+            if export_jobs.KINDS.get(kind, ("campaign",))[0] != "campaign":
+                raise ValueError("Batch export takes campaign exports only")
+            ids, batch = data["campaign_ids"], True
+        else:
+            target = export_jobs.KINDS.get(kind, ("campaign",))[0]
+            ids, batch = [data.get(f"{target}_id")], False
+        options = data.get("options") or {}
+        if set(options) - {"date_from", "date_to", "status"}:
+            raise ValueError("Unknown export options")
+
+        job = export_jobs.create_job(kind, ids, options, batch=batch)
+        return jsonify({"status": "ok", "job": _job_payload(job)}), 202
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+
+@bp.route("/export-jobs/<job_id>", methods=["GET"])
+def get_export_job(job_id):
+    """Status and progress of an export job"""
+    job = export_jobs.get_job(job_id)
+    if not job:
+        return jsonify({"status": "error", "message": "Export job not found"}), 404
+    return jsonify({"status": "ok", "job": _job_payload(job)})
+
+
+@bp.route("/export-jobs/<job_id>/download", methods=["GET"])
+def download_export_job(job_id):
+    """Stream the finished export"""
+    job = export_jobs.get_job(job_id)
+    if not job:
+        return jsonify({"status": "error", "message": "Export job not found"}), 404
+    if job["status"] != "done" or not job["result_path"] or not os.path.exists(job["result_path"]):
+        return jsonify({"status": "error", "message": f"Export job is {job['status']}"}), 409
+
+    return send_file(
+        job["result_path"],
+        as_attachment=True,
+        download_name=job["filename"],
+        mimetype=job["mimetype"],
+    )
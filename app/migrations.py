@@ -0,0 +1,846 @@
+# app/migrations.py
+"""
+Versioned schema migrations.
+
+Every schema change is a registered step with a version number. The
+database remembers the last applied version in PRAGMA user_version, so a
+normal start-up is a single read. Pending steps are applied in order,
+once, inside one exclusive transaction: when several workers boot at the
+same time only the first one migrates and the others find the work done.
+
+Steps must stay idempotent because databases created before this module
+existed are at user_version 0 with most of the early steps already applied.
+"""
+import json
+import os
+import sqlite3
+
+from .db import connect
+
+MIGRATIONS = []
+
+# Migrations can rebuild tables, so wait for other workers much longer
+# than the normal request busy timeout.
+MIGRATION_BUSY_TIMEOUT_MS = 120000
+
+AGENCY_CRM_DB_PATH = os.environ.get(
+    "AGENCY_CRM_DB_PATH",
+    "/home/vainiusl/py_projects/agency-crm/instance/agency_crm.db",
+)
+
+
+def migration(version: int):
+    """Register a migration step for the given schema version"""
+    def register(fn):
+        if any(v == version for v, _ in MIGRATIONS):
+            raise ValueError(f"Duplicate migration version {version}")
+        MIGRATIONS.append((version, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return register
+
+
+def latest_version() -> int:
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+def schema_version(db) -> int:
+    return db.execute("PRAGMA user_version").fetchone()[0]
+
+
+def run_migrations(path: str | None = None) -> int:
+    """Apply all pending migrations and return the resulting schema version"""
+    target = latest_version()
+    db = connect(path)
+    try:
+        if schema_version(db) >= target:
+            return target
+
+        db.execute(f"PRAGMA busy_timeout = {MIGRATION_BUSY_TIMEOUT_MS}")
+        # Table rebuilds must not cascade deletes; foreign keys can only be
+        # switched off outside a transaction, and are checked before commit.
+        db.execute("PRAGMA foreign_keys = OFF")
+        db.execute("BEGIN EXCLUSIVE")
+        try:
+            current = schema_version(db)
+            # Only fail on violations a step introduced, not on old data
+            violations_before = len(db.execute("PRAGMA foreign_key_check").fetchall())
+            for version, step in MIGRATIONS:
+                if version <= current:
+                    continue
+                step(db)
+                db.execute(f"PRAGMA user_version = {version}")
+                print(f"Applied migration {version}: {step.__name__}")
+                current = version
+            violations = len(db.execute("PRAGMA foreign_key_check").fetchall())
+            if violations > violations_before:
+                raise sqlite3.IntegrityError(
+                    f"Migration added {violations - violations_before} foreign key violations"
+                )
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return current
+    finally:
+        db.close()
+
+
+# ---------------- Helpers ----------------
+
+def _columns(db, table: str) -> list[str]:
+    return [row[1] for row in db.execute(f"PRAGMA table_info({table})").fetchall()]
+
+
+def _table_exists(db, table: str) -> bool:
+    row = db.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table,)
+    ).fetchone()
+    return row is not None
+
+
+def _add_columns(db, table: str, new_columns):
+    columns = _columns(db, table)
+    for col_name, col_type in new_columns:
+        if col_name not in columns:
+            db.execute(f"ALTER TABLE {table} ADD COLUMN {col_name} {col_type}")
+
+
+# ---------------- Steps ----------------
+
+@migration(1)
+def create_core_tables(db):
+    """Channel groups, TRP rates, pricing lists, campaigns, waves, items, discounts"""
+    db.execute("""
+    CREATE TABLE IF NOT EXISTS channel_groups (
+        id   INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT UNIQUE NOT NULL
+    )""")
+    db.execute("""
+    CREATE TABLE IF NOT EXISTS channels (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        channel_group_id INTEGER NOT NULL,
+        name TEXT NOT NULL,
+        size TEXT NOT NULL CHECK(size IN ('big','small')),
+        UNIQUE(channel_group_id, name),
+        FOREIGN KEY(channel_group_id) REFERENCES channel_groups(id) ON DELETE CASCADE
+    )""")
+    db.execute("""
+    CREATE TABLE IF NOT EXISTS trp_rates (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        owner TEXT NOT NULL,
+        target_group TEXT NOT NULL,
+        primary_label TEXT NOT NULL,
+        secondary_label TEXT,
+        share_primary REAL,
+        share_secondary REAL,
+        prime_share_primary REAL,
+        prime_share_secondary REAL,
+        price_per_sec_eur REAL NOT NULL,
+        UNIQUE(owner, target_group)
+    )""")
+    db.execute("""
+    CREATE TABLE IF NOT EXISTS pricing_lists (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT UNIQUE NOT NULL
+    )""")
+
+    pricing_list_items_sql = """
+    CREATE TABLE {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        pricing_list_id INTEGER NOT NULL,
+        owner TEXT NOT NULL,
+        target_group TEXT NOT NULL,
+        primary_label TEXT NOT NULL,
+        secondary_label TEXT,
+        share_primary REAL,
+        share_secondary REAL,
+        prime_share_primary REAL,
+        prime_share_secondary REAL,
+        price_per_sec_eur REAL NOT NULL,
+        FOREIGN KEY(pricing_list_id) REFERENCES pricing_lists(id) ON DELETE CASCADE
+    )"""
+    table_def = db.execute(
+        "SELECT sql FROM sqlite_master WHERE type='table' AND name='pricing_list_items'"
+    ).fetchone()
+    if table_def and 'UNIQUE(pricing_list_id, owner, target_group)' in table_def['sql']:
+        # Old rate cards allowed one row per owner/target group only
+        db.execute("ALTER TABLE pricing_list_items RENAME TO pricing_list_items_old")
+        db.execute(pricing_list_items_sql.format(name="pricing_list_items"))
+        db.execute("INSERT INTO pricing_list_items SELECT * FROM pricing_list_items_old")
+        db.execute("DROP TABLE pricing_list_items_old")
+    elif not table_def:
+        db.execute(pricing_list_items_sql.format(name="pricing_list_items"))
+
+    db.execute("""
+    CREATE TABLE IF NOT EXISTS campaigns (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        pricing_list_id INTEGER NOT NULL,
+        start_date TEXT,
+        end_date TEXT,
+        status TEXT DEFAULT 'draft',
+        FOREIGN KEY(pricing_list_id) REFERENCES pricing_lists(id) ON DELETE RESTRICT
+    )""")
+    db.execute("""
+    CREATE TABLE IF NOT EXISTS tvcs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        campaign_id INTEGER NOT NULL,
+        name TEXT NOT NULL,
+        duration INTEGER NOT NULL, -- duration in seconds
+        FOREIGN KEY(campaign_id) REFERENCES campaigns(id) ON DELETE CASCADE
+    )""")
+    db.execute("""
+    CREATE TABLE IF NOT EXISTS waves (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        campaign_id INTEGER NOT NULL,
+        name TEXT,
+        start_date TEXT,
+        end_date TEXT,
+        FOREIGN KEY(campaign_id) REFERENCES campaigns(id) ON DELETE CASCADE
+    )""")
+    db.execute("""
+    CREATE TABLE IF NOT EXISTS wave_items (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        wave_id INTEGER NOT NULL,
+        owner TEXT NOT NULL,
+        target_group TEXT NOT NULL,
+        primary_label TEXT NOT NULL,
+        secondary_label TEXT,
+        share_primary REAL,
+        share_secondary REAL,
+        prime_share_primary REAL,
+        prime_share_secondary REAL,
+        price_per_sec_eur REAL NOT NULL,
+        trps REAL NOT NULL,
+        tvc_id INTEGER,
+        FOREIGN KEY(wave_id) REFERENCES waves(id) ON DELETE CASCADE,
+        FOREIGN KEY(tvc_id) REFERENCES tvcs(id) ON DELETE SET NULL
+    )""")
+    db.execute("""
+    CREATE TABLE IF NOT EXISTS discounts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        campaign_id INTEGER,
+        wave_id INTEGER,
+        discount_type TEXT CHECK(discount_type IN ('client', 'agency')) NOT NULL,
+        discount_percentage REAL NOT NULL,
+        FOREIGN KEY(campaign_id) REFERENCES campaigns(id) ON DELETE CASCADE,
+        FOREIGN KEY(wave_id) REFERENCES waves(id) ON DELETE CASCADE
+    )""")
+
+
+@migration(2)
+def add_tvc_id_to_wave_items(db):
+    """Add tvc_id column to wave_items table"""
+    _add_columns(db, "wave_items", [("tvc_id", "INTEGER")])
+
+
+@migration(3)
+def add_campaign_fields(db):
+    """Add agency/client/product/country to campaigns"""
+    _add_columns(db, "campaigns", [
+        ("agency", "TEXT"),
+        ("client", "TEXT"),
+        ("product", "TEXT"),
+        ("country", "TEXT DEFAULT 'Lietuva'")
+    ])
+
+
+@migration(4)
+def add_wave_item_fields(db):
+    """Add all fields from the Excel plan to wave_items"""
+    _add_columns(db, "wave_items", [
+        ("channel_id", "INTEGER"),
+        ("channel_share", "REAL DEFAULT 0.75"),
+        ("pt_zone_share", "REAL DEFAULT 0.55"),
+        ("npt_zone_share", "REAL DEFAULT 0.45"),
+        ("clip_duration", "INTEGER DEFAULT 10"),
+        ("grp_planned", "REAL"),
+        ("affinity1", "REAL"),
+        ("affinity2", "REAL"),
+        ("affinity3", "REAL"),
+        ("gross_cpp_eur", "REAL"),
+        ("duration_index", "REAL DEFAULT 1.0"),
+        ("seasonal_index", "REAL DEFAULT 1.0"),
+        ("trp_purchase_index", "REAL DEFAULT 0.95"),
+        ("advance_purchase_index", "REAL DEFAULT 0.95"),
+        ("web_index", "REAL DEFAULT 1.0"),
+        ("advance_payment_index", "REAL DEFAULT 1.0"),
+        ("loyalty_discount_index", "REAL DEFAULT 1.0"),
+        ("position_index", "REAL DEFAULT 1.0"),
+        ("gross_price_eur", "REAL"),
+        ("client_discount", "REAL DEFAULT 0"),
+        ("net_price_eur", "REAL"),
+        ("agency_discount", "REAL DEFAULT 0"),
+        ("net_net_price_eur", "REAL"),
+        ("tg_size_thousands", "REAL DEFAULT 0"),
+        ("tg_share_percent", "REAL DEFAULT 0"),
+        ("tg_sample_size", "INTEGER DEFAULT 0"),
+        ("daily_trp_distribution", "TEXT")  # JSON string for daily TRP values
+    ])
+
+
+@migration(5)
+def add_pricing_indices(db):
+    """Add duration/seasonal indices and TG data to pricing_list_items"""
+    _add_columns(db, "pricing_list_items", [
+        ("duration_index", "REAL DEFAULT 1.0"),
+        ("seasonal_index", "REAL DEFAULT 1.0"),
+        ("tg_size_thousands", "REAL DEFAULT 0"),  # TG dydis tūkstančiais
+        ("tg_share_percent", "REAL DEFAULT 0"),   # TG dalis procentais
+        ("tg_sample_size", "INTEGER DEFAULT 0")   # TG imties dydis
+    ])
+
+
+def _duration_description(duration):
+    if duration <= 9:
+        return "5\"-9\""
+    elif duration <= 14:
+        return "10\"-14\""
+    elif duration <= 19:
+        return "15\"-19\""
+    elif duration <= 24:
+        return "20\"-24\""
+    elif duration <= 29:
+        return "25\"-29\""
+    elif duration <= 44:
+        return "30\"-44\""
+    return "≥45\""
+
+
+@migration(6)
+def indices_by_channel_group(db):
+    """Duration, seasonal and position indices keyed by channel group
+
+    Replaces the old migrate_indices_to_channel_groups.py script. Legacy
+    target-group tables are kept as *_old.
+    """
+    if "channel_group_id" in _columns(db, "duration_indices"):
+        return
+
+    db.execute("""
+    CREATE TABLE duration_indices_new (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        channel_group_id INTEGER NOT NULL,
+        duration_seconds INTEGER NOT NULL,
+        index_value REAL NOT NULL DEFAULT 1.0,
+        description TEXT,
+        UNIQUE(channel_group_id, duration_seconds),
+        FOREIGN KEY(channel_group_id) REFERENCES channel_groups(id) ON DELETE CASCADE
+    )""")
+    db.execute("""
+    CREATE TABLE seasonal_indices_new (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        channel_group_id INTEGER NOT NULL,
+        month INTEGER NOT NULL CHECK(month >= 1 AND month <= 12),
+        index_value REAL NOT NULL DEFAULT 1.0,
+        description TEXT,
+        UNIQUE(channel_group_id, month),
+        FOREIGN KEY(channel_group_id) REFERENCES channel_groups(id) ON DELETE CASCADE
+    )""")
+    db.execute("""
+    CREATE TABLE position_indices_new (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        channel_group_id INTEGER NOT NULL,
+        position_type TEXT NOT NULL,
+        index_value REAL NOT NULL DEFAULT 1.0,
+        description TEXT,
+        UNIQUE(channel_group_id, position_type),
+        FOREIGN KEY(channel_group_id) REFERENCES channel_groups(id) ON DELETE CASCADE
+    )""")
+
+    channel_groups = db.execute("SELECT id, name FROM channel_groups").fetchall()
+    if not channel_groups:
+        db.execute("INSERT INTO channel_groups (name) VALUES ('AMB Baltics')")
+        db.execute("INSERT INTO channel_groups (name) VALUES ('MG grupė')")
+        channel_groups = db.execute("SELECT id, name FROM channel_groups").fetchall()
+
+    # Duration indices: take the most common value per duration from the
+    # old target-group table
+    duration_map = {}
+    if _table_exists(db, "duration_indices"):
+        duration_data = db.execute("""
+            SELECT duration_seconds, index_value, COUNT(*) as count
+            FROM duration_indices
+            GROUP BY duration_seconds, index_value
+            ORDER BY duration_seconds, count DESC
+        """).fetchall()
+        for row in duration_data:
+            duration_map.setdefault(row['duration_seconds'], row['index_value'])
+
+    for cg in channel_groups:
+        db.executemany("""
+            INSERT OR IGNORE INTO duration_indices_new
+            (channel_group_id, duration_seconds, index_value, description)
+            VALUES (?, ?, ?, ?)
+        """, [
+            (cg['id'], duration, index_val, f"{_duration_description(duration)} ({cg['name']})")
+            for duration, index_val in duration_map.items()
+        ])
+
+    # AMB Baltics pattern (from image data)
+    amb_seasonal = [
+        (1, 0.9, "Sausis"), (2, 0.95, "Vasaris"), (3, 1.5, "Kovas"),
+        (4, 1.55, "Balandis"), (5, 1.6, "Gegužė"), (6, 1.55, "Birželis"),
+        (7, 1.1, "Liepa"), (8, 1.1, "Rugpjūtis"), (9, 1.65, "Rugsėjis"),
+        (10, 1.65, "Spalis"), (11, 1.65, "Lapkritis"), (12, 1.5, "Gruodis")
+    ]
+    # MG grupė pattern (slightly different)
+    mg_seasonal = [
+        (1, 0.9, "Sausis"), (2, 1.0, "Vasaris"), (3, 1.4, "Kovas"),
+        (4, 1.45, "Balandis"), (5, 1.45, "Gegužė"), (6, 1.4, "Birželis"),
+        (7, 0.95, "Liepa"), (8, 1.0, "Rugpjūtis"), (9, 1.60, "Rugsėjis"),
+        (10, 1.65, "Spalis"), (11, 1.65, "Lapkritis"), (12, 1.5, "Gruodis")
+    ]
+    amb_position = [
+        ("first", 1.45, "Pirma pozicija"),
+        ("second", 1.3, "Antra pozicija"),
+        ("last", 1.3, "Paskutinė"),
+        ("other", 1.2, "Kita spec.")
+    ]
+    mg_position = [
+        ("first", 1.5, "Pirma pozicija"),
+        ("second", 1.4, "Antra pozicija"),
+        ("last", 1.4, "Paskutinė"),
+        ("other", 1.3, "Kita spec.")
+    ]
+
+    for cg in channel_groups:
+        is_amb = 'AMB' in cg['name']
+        db.executemany("""
+            INSERT OR IGNORE INTO seasonal_indices_new
+            (channel_group_id, month, index_value, description)
+            VALUES (?, ?, ?, ?)
+        """, [(cg['id'], month, index_val, f"{desc} ({cg['name']})")
+              for month, index_val, desc in (amb_seasonal if is_amb else mg_seasonal)])
+        db.executemany("""
+            INSERT OR IGNORE INTO position_indices_new
+            (channel_group_id, position_type, index_value, description)
+            VALUES (?, ?, ?, ?)
+        """, [(cg['id'], pos_type, index_val, f"{desc} ({cg['name']})")
+              for pos_type, index_val, desc in (amb_position if is_amb else mg_position)])
+
+    for table in ("duration_indices", "seasonal_indices", "position_indices"):
+        if _table_exists(db, table):
+            db.execute(f"DROP TABLE IF EXISTS {table}_old")
+            db.execute(f"ALTER TABLE {table} RENAME TO {table}_old")
+        db.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+
+
+@migration(7)
+def remove_pricing_list_requirement(db):
+    """Campaigns no longer need a pricing list (pricing_list_id nullable)"""
+    columns = {row[1]: row for row in db.execute("PRAGMA table_info(campaigns)").fetchall()}
+    if 'pricing_list_id' not in columns or not columns['pricing_list_id'][3]:
+        return
+
+    db.execute("""
+    CREATE TABLE campaigns_new (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        pricing_list_id INTEGER,
+        start_date TEXT,
+        end_date TEXT,
+        agency TEXT,
+        client TEXT,
+        product TEXT,
+        country TEXT DEFAULT 'Lietuva',
+        status TEXT DEFAULT 'draft'
+    )""")
+    keep = [c for c in _columns(db, "campaigns_new") if c in columns and c != 'pricing_list_id']
+    col_list = ", ".join(keep)
+    # Pricing lists that no longer exist become NULL
+    db.execute(f"""
+        INSERT INTO campaigns_new ({col_list}, pricing_list_id)
+        SELECT {col_list},
+               CASE WHEN pricing_list_id IN (SELECT id FROM pricing_lists)
+                    THEN pricing_list_id END
+        FROM campaigns
+    """)
+    db.execute("DROP TABLE campaigns")
+    db.execute("ALTER TABLE campaigns_new RENAME TO campaigns")
+
+
+@migration(8)
+def create_trp_distribution(db):
+    """Per-day TRP calendar for a campaign"""
+    db.execute("""
+    CREATE TABLE IF NOT EXISTS trp_distribution (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        campaign_id INTEGER NOT NULL,
+        date TEXT NOT NULL,
+        trp_value REAL NOT NULL DEFAULT 0.0,
+        updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(campaign_id, date),
+        FOREIGN KEY(campaign_id) REFERENCES campaigns(id) ON DELETE CASCADE
+    )""")
+
+
+@migration(9)
+def add_brand_id_to_campaigns(db):
+    """Add Agency CRM brand_id to campaigns
+
+    Replaces add_brand_id_to_campaigns.py. Existing campaigns are matched
+    to brands by product name when the Agency CRM database is reachable.
+    """
+    if 'brand_id' in _columns(db, "campaigns"):
+        return
+    db.execute("ALTER TABLE campaigns ADD COLUMN brand_id INTEGER")
+
+    if not os.path.exists(AGENCY_CRM_DB_PATH):
+        return
+    agency_conn = sqlite3.connect(AGENCY_CRM_DB_PATH)
+    try:
+        brand_map = {name: brand_id for brand_id, name in
+                     agency_conn.execute("SELECT id, name FROM brands").fetchall()}
+    finally:
+        agency_conn.close()
+    db.executemany(
+        "UPDATE campaigns SET brand_id = ? WHERE product = ?",
+        list((brand_id, name) for name, brand_id in brand_map.items()),
+    )
+
+
+
+# Secondary indexes for the planner's foreign-key lookups. Kept as data so
+# the benchmark can drop and recreate exactly the same set.
+LOOKUP_INDEXES = {
+    # list_wave_items / report loaders; rowid order satisfies ORDER BY id
+    "idx_wave_items_wave": "wave_items(wave_id)",
+    # channel group export joins wave_items.owner to channel_groups.name
+    "idx_wave_items_owner": "wave_items(owner, wave_id)",
+    # ON DELETE SET NULL from tvcs
+    "idx_wave_items_tvc": "wave_items(tvc_id)",
+    "idx_waves_campaign": "waves(campaign_id, start_date)",
+    "idx_tvcs_campaign": "tvcs(campaign_id)",
+    # covers get_discounts_for_wave and the per-wave discount totals
+    "idx_discounts_wave": "discounts(wave_id, discount_type, discount_percentage)",
+    "idx_discounts_campaign": "discounts(campaign_id)",
+    "idx_pricing_list_items_lookup": "pricing_list_items(pricing_list_id, owner, target_group)",
+}
+
+
+@migration(10)
+def add_lookup_indexes(db):
+    """Secondary indexes for wave, item, TVC, discount and rate card lookups"""
+    for name, target in LOOKUP_INDEXES.items():
+        db.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
+    db.execute("ANALYZE")
+
+
+
+# Day numbers (julianday, truncated) for the calendar overlap test. A missing
+# start or end date leaves that side open; rows with no dates at all stay NULL
+# and never match a window.
+_START_DAY = ("CASE WHEN COALESCE(NULLIF(start_date, ''), NULLIF(end_date, '')) IS NOT NULL "
+              "THEN COALESCE(CAST(julianday(NULLIF(start_date, '')) AS INTEGER), 0) END")
+_END_DAY = ("CASE WHEN COALESCE(NULLIF(start_date, ''), NULLIF(end_date, '')) IS NOT NULL "
+            "THEN COALESCE(CAST(julianday(NULLIF(end_date, '')) AS INTEGER), 99999999) END")
+
+
+@migration(11)
+def calendar_day_ranges(db):
+    """Indexed day-number ranges on campaigns/waves and a calendar revision counter"""
+    for table in ("campaigns", "waves"):
+        existing = {row[1] for row in db.execute(f"PRAGMA table_xinfo({table})")}
+        if "start_day" not in existing:
+            db.execute(f"ALTER TABLE {table} ADD COLUMN start_day INTEGER "
+                       f"GENERATED ALWAYS AS ({_START_DAY}) VIRTUAL")
+        if "end_day" not in existing:
+            db.execute(f"ALTER TABLE {table} ADD COLUMN end_day INTEGER "
+                       f"GENERATED ALWAYS AS ({_END_DAY}) VIRTUAL")
+        db.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_day_range ON {table}(end_day, start_day)")
+
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS data_revisions (
+            scope TEXT PRIMARY KEY,
+            revision INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    db.execute("INSERT OR IGNORE INTO data_revisions(scope, revision) VALUES ('calendar', 0)")
+    for table in ("campaigns", "waves"):
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            db.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_{event.lower()}_calendar_rev
+                AFTER {event} ON {table}
+                BEGIN
+                    UPDATE data_revisions SET revision = revision + 1 WHERE scope = 'calendar';
+                END
+            """)
+
+
+@migration(12)
+def refdata_revision_triggers(db):
+    """Bump the 'refdata' revision on channel group and index table changes"""
+    db.execute("INSERT OR IGNORE INTO data_revisions(scope, revision) VALUES ('refdata', 0)")
+    for table in ("channel_groups", "duration_indices", "seasonal_indices", "position_indices"):
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            db.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_{event.lower()}_refdata_rev
+                AFTER {event} ON {table}
+                BEGIN
+                    UPDATE data_revisions SET revision = revision + 1 WHERE scope = 'refdata';
+                END
+            """)
+
+
+@migration(13)
+def create_trp_series(db):
+    """Per-wave / per-wave-item daily TRP as a start day plus packed float32 values"""
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS trp_series (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            wave_id INTEGER NOT NULL,
+            wave_item_id INTEGER,
+            start_day INTEGER NOT NULL,
+            daily_trp BLOB NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (wave_id) REFERENCES waves(id) ON DELETE CASCADE,
+            FOREIGN KEY (wave_item_id) REFERENCES wave_items(id) ON DELETE CASCADE
+        )
+    """)
+    # One series per wave (wave_item_id NULL) and per wave item
+    db.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_trp_series_owner "
+               "ON trp_series(wave_id, COALESCE(wave_item_id, 0))")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_trp_series_item ON trp_series(wave_item_id)")
+
+    # Carry over the old per-item JSON column ({"YYYY-MM-DD": trp})
+    from .models import pack_trp_series
+    rows = db.execute("""
+        SELECT id, wave_id, daily_trp_distribution FROM wave_items
+        WHERE daily_trp_distribution IS NOT NULL AND daily_trp_distribution != ''
+    """).fetchall()
+    for row in rows:
+        try:
+            series = pack_trp_series(json.loads(row["daily_trp_distribution"]))
+        except (ValueError, TypeError, AttributeError):
+            continue
+        if series:
+            db.execute("""
+                INSERT OR IGNORE INTO trp_series (wave_id, wave_item_id, start_day, daily_trp)
+                VALUES (?, ?, ?, ?)
+            """, (row["wave_id"], row["id"], *series))
+
+
+# Campaign id of a changed row, per table; "{row}" is NEW or OLD
+_CAMPAIGN_OF_ROW = {
+    "campaigns": "{row}.id",
+    "waves": "{row}.campaign_id",
+    "tvcs": "{row}.campaign_id",
+    "trp_distribution": "{row}.campaign_id",
+    "wave_items": "(SELECT campaign_id FROM waves WHERE id = {row}.wave_id)",
+    "trp_series": "(SELECT campaign_id FROM waves WHERE id = {row}.wave_id)",
+    "discounts": "COALESCE({row}.campaign_id, (SELECT campaign_id FROM waves WHERE id = {row}.wave_id))",
+}
+
+
+def _campaign_revision_triggers(db, campaign_of_row):
+    for table, campaign_of in campaign_of_row.items():
+        for event, rows in (("INSERT", ["NEW"]), ("UPDATE", ["OLD", "NEW"]), ("DELETE", ["OLD"])):
+            campaigns = " UNION ".join(f"SELECT {campaign_of.format(row=row)} AS campaign_id" for row in rows)
+            db.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_{event.lower()}_campaign_rev
+                AFTER {event} ON {table}
+                BEGIN
+                    INSERT INTO campaign_revisions(campaign_id, revision)
+                    SELECT campaign_id, 1 FROM ({campaigns}) WHERE campaign_id IS NOT NULL
+                    ON CONFLICT(campaign_id) DO UPDATE SET revision = revision + 1;
+                END
+            """)
+
+
+@migration(14)
+def campaign_revisions(db):
+    """Per-campaign revision counter bumped by any write to the campaign's data"""
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS campaign_revisions (
+            campaign_id INTEGER PRIMARY KEY,
+            revision INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    _campaign_revision_triggers(db, _CAMPAIGN_OF_ROW)
+
+
+@migration(15)
+def create_export_jobs(db):
+    """Background export jobs (see export_jobs.py)"""
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS export_jobs (
+            id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            params TEXT NOT NULL,  -- JSON: target ids, options, batch flag
+            status TEXT NOT NULL DEFAULT 'queued'
+                CHECK(status IN ('queued', 'running', 'done', 'failed')),
+            done INTEGER NOT NULL DEFAULT 0,
+            total INTEGER NOT NULL DEFAULT 1,
+            result_path TEXT,
+            filename TEXT,
+            mimetype TEXT,
+            error TEXT,
+            owner TEXT,  -- host:pid of the web worker running the job
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    db.execute("CREATE INDEX IF NOT EXISTS idx_export_jobs_status ON export_jobs(status, updated_at)")
+
+
+
+@migration(16)
+def create_crm_campaign_links(db):
+    """Projects-CRM campaign <-> local campaign mapping, backfilled from campaign names"""
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS crm_campaign_links (
+            local_id INTEGER PRIMARY KEY REFERENCES campaigns(id) ON DELETE CASCADE,
+            crm_id INTEGER,  -- NULL until resolved for rows backfilled from the name
+            code TEXT,       -- Projects-CRM campaign code, e.g. PLN-25-006-A
+            last_synced_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    db.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_crm_links_crm_id ON crm_campaign_links(crm_id)")
+    db.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_crm_links_code ON crm_campaign_links(code)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_campaigns_name ON campaigns(name)")
+
+    # Synced campaigns are named "Name (PLN-...)"; the newest campaign wins a shared code
+    db.execute("""
+        INSERT OR IGNORE INTO crm_campaign_links(local_id, code, last_synced_at)
+        SELECT id, substr(name, instr(name, ' (') + 2, length(name) - instr(name, ' (') - 2), NULL
+        FROM campaigns
+        WHERE name LIKE '% (PLN-%)'
+          AND length(name) - length(replace(name, '(', '')) = 1
+        ORDER BY id DESC
+    """)
+
+
+
+@migration(17)
+def campaigns_revision_triggers(db):
+    """Bump the 'campaigns' revision on campaign and CRM link changes (campaign list cache)"""
+    db.execute("INSERT OR IGNORE INTO data_revisions(scope, revision) VALUES ('campaigns', 0)")
+    for table in ("campaigns", "crm_campaign_links"):
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            db.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_{event.lower()}_campaigns_rev
+                AFTER {event} ON {table}
+                BEGIN
+                    UPDATE data_revisions SET revision = revision + 1 WHERE scope = 'campaigns';
+                END
+            """)
+
+
+
+@migration(18)
+def create_crm_outbox(db):
+    """Outbox of Projects-CRM plan writes, drained by crm_outbox.py"""
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS crm_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            campaign_id INTEGER NOT NULL,  -- local campaign; no FK, the row outlives a deleted campaign
+            op TEXT NOT NULL CHECK(op IN ('create_plan', 'delete_plan')),
+            plan_name TEXT NOT NULL,
+            payload TEXT,  -- JSON: description, budget for create_plan
+            status TEXT NOT NULL DEFAULT 'pending'
+                CHECK(status IN ('pending', 'sending', 'done', 'skipped', 'failed')),
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            claimed_by TEXT,
+            last_error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            processed_at TIMESTAMP
+        )
+    """)
+    db.execute("CREATE INDEX IF NOT EXISTS idx_crm_outbox_due ON crm_outbox(status, next_attempt_at)")
+
+
+
+@migration(19)
+def campaign_listing_indexes(db):
+    """Indexes behind the filtered, keyset-paginated campaign list"""
+    db.execute("CREATE INDEX IF NOT EXISTS idx_campaigns_status ON campaigns(status)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_campaigns_agency ON campaigns(agency)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_campaigns_client ON campaigns(client)")
+    # Same expressions as models.CAMPAIGN_SORTS
+    db.execute("CREATE INDEX IF NOT EXISTS idx_campaigns_start_date ON campaigns(IFNULL(start_date, ''))")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_campaigns_end_date ON campaigns(IFNULL(end_date, ''))")
+
+
+
+# Campaign whose search row a changed row affects, per table; "{row}" is NEW or OLD
+_SEARCH_CAMPAIGN_OF_ROW = {
+    "campaigns": ("{row}.id", "name, client, product, agency"),
+    "crm_campaign_links": ("{row}.local_id", "local_id, code"),
+    "waves": ("{row}.campaign_id", "campaign_id, name"),
+    "tvcs": ("{row}.campaign_id", "campaign_id, name"),
+}
+
+_SEARCH_ROW_SQL = """
+    SELECT c.id, c.name, c.client, c.product, c.agency,
+           (SELECT code FROM crm_campaign_links WHERE local_id = c.id),
+           (SELECT group_concat(name, ' ') FROM waves WHERE campaign_id = c.id),
+           (SELECT group_concat(name, ' ') FROM tvcs WHERE campaign_id = c.id)
+    FROM campaigns c
+"""
+
+
+@migration(20)
+def campaign_search_index(db):
+    """FTS5 index over campaign names, client, product, agency, CRM code, waves and TVCs"""
+    # rowid is the campaign id; remove_diacritics 2 folds ą, č, ė, š, ž ... to a, c, e, s, z
+    db.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS campaign_search USING fts5(
+            name, client, product, agency, code, waves, tvcs,
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+    """)
+    # Default ranking: bm25 with the name and code weighted highest
+    db.execute("INSERT INTO campaign_search(campaign_search, rank) "
+               "VALUES ('rank', 'bm25(10.0, 4.0, 4.0, 2.0, 8.0, 1.0, 1.0)')")
+    for table, (campaign_of, columns) in _SEARCH_CAMPAIGN_OF_ROW.items():
+        for event, rows in (("INSERT", ["NEW"]), (f"UPDATE OF {columns}", ["OLD", "NEW"]), ("DELETE", ["OLD"])):
+            campaigns = " UNION ".join(f"SELECT {campaign_of.format(row=row)}" for row in rows)
+            db.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_{event.split()[0].lower()}_campaign_search
+                AFTER {event} ON {table}
+                BEGIN
+                    DELETE FROM campaign_search WHERE rowid IN ({campaigns});
+                    INSERT INTO campaign_search(rowid, name, client, product, agency, code, waves, tvcs)
+                    {_SEARCH_ROW_SQL} WHERE c.id IN ({campaigns});
+                END
+            """)
+    db.execute("DELETE FROM campaign_search")
+    db.execute(f"""
+        INSERT INTO campaign_search(rowid, name, client, product, agency, code, waves, tvcs)
+        {_SEARCH_ROW_SQL}
+    """)
+
+
+
+@migration(21)
+def trp_rates_refdata_revision(db):
+    """Bump the 'refdata' revision on TRP rate changes too (campaign workspace ETag)"""
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        db.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_trp_rates_{event.lower()}_refdata_rev
+            AFTER {event} ON trp_rates
+            BEGIN
+                UPDATE data_revisions SET revision = revision + 1 WHERE scope = 'refdata';
+            END
+        """)
+
+
+
+@migration(22)
+def crm_links_campaign_revision(db):
+    """Bump the campaign revision when its Projects-CRM link changes (workspace ETag)"""
+    _campaign_revision_triggers(db, {"crm_campaign_links": "{row}.local_id"})
+
+
+
+@migration(23)
+def crm_outbox_wave_id(db):
+    """Wave behind each queued plan write, so waves sharing a name stay apart"""
+    _add_columns(db, "crm_outbox", [("wave_id", "INTEGER")])  # no FK: outlives the wave
+
+
+if __name__ == "__main__":
+    print(f"Schema version: {run_migrations()}")
@@ -1,272 +1,14 @@
 # app/models.py
-import sqlite3, os
-DB_PATH = os.path.join(os.path.dirname(__file__), "tv-calc.db")
-
-def get_db():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA foreign_keys = ON")
-    return conn
-
-def init_db():
-    with get_db() as db:
-        # -------- Channel groups & channels --------
-        db.execute("""
-        CREATE TABLE IF NOT EXISTS channel_groups (
-            id   INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT UNIQUE NOT NULL
-        )""")
-        db.execute("""
-        CREATE TABLE IF NOT EXISTS channels (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            channel_group_id INTEGER NOT NULL,
-            name TEXT NOT NULL,
-            size TEXT NOT NULL CHECK(size IN ('big','small')),
-            UNIQUE(channel_group_id, name),
-            FOREIGN KEY(channel_group_id) REFERENCES channel_groups(id) ON DELETE CASCADE
-        )""")
-
-        # -------- TRP rates (legacy admin) --------
-        db.execute("""
-        CREATE TABLE IF NOT EXISTS trp_rates (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            owner TEXT NOT NULL,
-            target_group TEXT NOT NULL,
-            primary_label TEXT NOT NULL,
-            secondary_label TEXT,
-            share_primary REAL,
-            share_secondary REAL,
-            prime_share_primary REAL,
-            prime_share_secondary REAL,
-            price_per_sec_eur REAL NOT NULL,
-            UNIQUE(owner, target_group)
-        )""")
-
-        # -------- Pricing lists (rate cards) --------
-        db.execute("""
-        CREATE TABLE IF NOT EXISTS pricing_lists (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT UNIQUE NOT NULL
-        )""")
-        # Check if we need to migrate the pricing_list_items table to remove unique constraint
-        cursor = db.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name='pricing_list_items'")
-        table_def = cursor.fetchone()
-        
-        if table_def and 'UNIQUE(pricing_list_id, owner, target_group)' in table_def['sql']:
-            # Table has the old unique constraint, need to migrate
-            db.execute("ALTER TABLE pricing_list_items RENAME TO pricing_list_items_old")
-            
-            # Create new table without unique constraint
-            db.execute("""
-            CREATE TABLE pricing_list_items (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                pricing_list_id INTEGER NOT NULL,
-                owner TEXT NOT NULL,
-                target_group TEXT NOT NULL,
-                primary_label TEXT NOT NULL,
-                secondary_label TEXT,
-                share_primary REAL,
-                share_secondary REAL,
-                prime_share_primary REAL,
-                prime_share_secondary REAL,
-                price_per_sec_eur REAL NOT NULL,
-                FOREIGN KEY(pricing_list_id) REFERENCES pricing_lists(id) ON DELETE CASCADE
-            )""")
-            
-            # Copy data from old table
-            db.execute("""
-            INSERT INTO pricing_list_items 
-            SELECT * FROM pricing_list_items_old
-            """)
-            
-            # Drop old table
-            db.execute("DROP TABLE pricing_list_items_old")
-        else:
-            # Create table without unique constraint if it doesn't exist
-            db.execute("""
-            CREATE TABLE IF NOT EXISTS pricing_list_items (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                pricing_list_id INTEGER NOT NULL,
-                owner TEXT NOT NULL,
-                target_group TEXT NOT NULL,
-                primary_label TEXT NOT NULL,
-                secondary_label TEXT,
-                share_primary REAL,
-                share_secondary REAL,
-                prime_share_primary REAL,
-                prime_share_secondary REAL,
-                price_per_sec_eur REAL NOT NULL,
-                FOREIGN KEY(pricing_list_id) REFERENCES pricing_lists(id) ON DELETE CASCADE
-            )""")
-
-        # -------- Campaigns / Waves --------
-        db.execute("""
-        CREATE TABLE IF NOT EXISTS campaigns (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            pricing_list_id INTEGER NOT NULL,
-            start_date TEXT,
-            end_date TEXT,
-            status TEXT DEFAULT 'draft',
-            FOREIGN KEY(pricing_list_id) REFERENCES pricing_lists(id) ON DELETE RESTRICT
-        )""")
-        
-        # TVC (TV Commercials) table
-        db.execute("""
-        CREATE TABLE IF NOT EXISTS tvcs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            campaign_id INTEGER NOT NULL,
-            name TEXT NOT NULL,
-            duration INTEGER NOT NULL, -- duration in seconds
-            FOREIGN KEY(campaign_id) REFERENCES campaigns(id) ON DELETE CASCADE
-        )""")
-        db.execute("""
-        CREATE TABLE IF NOT EXISTS waves (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            campaign_id INTEGER NOT NULL,
-            name TEXT,
-            start_date TEXT,
-            end_date TEXT,
-            FOREIGN KEY(campaign_id) REFERENCES campaigns(id) ON DELETE CASCADE
-        )""")
-        db.execute("""
-        CREATE TABLE IF NOT EXISTS wave_items (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            wave_id INTEGER NOT NULL,
-            owner TEXT NOT NULL,
-            target_group TEXT NOT NULL,
-            primary_label TEXT NOT NULL,
-            secondary_label TEXT,
-            share_primary REAL,
-            share_secondary REAL,
-            prime_share_primary REAL,
-            prime_share_secondary REAL,
-            price_per_sec_eur REAL NOT NULL,
-            trps REAL NOT NULL,
-            tvc_id INTEGER,
-            FOREIGN KEY(wave_id) REFERENCES waves(id) ON DELETE CASCADE,
-            FOREIGN KEY(tvc_id) REFERENCES tvcs(id) ON DELETE SET NULL
-        )""")
-
-        db.commit()
-        
-        # discount table
-        
-        db.execute("""
-        CREATE TABLE IF NOT EXISTS discounts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            campaign_id INTEGER,
-            wave_id INTEGER,
-            discount_type TEXT CHECK(discount_type IN ('client', 'agency')) NOT NULL,
-            discount_percentage REAL NOT NULL,
-            FOREIGN KEY(campaign_id) REFERENCES campaigns(id) ON DELETE CASCADE,
-            FOREIGN KEY(wave_id) REFERENCES waves(id) ON DELETE CASCADE
-        )
-        """)
-        db.commit()
-
-def migrate_add_tvc_id_to_wave_items():
-    """Add tvc_id column to wave_items table if it doesn't exist"""
-    with get_db() as db:
-        # Check if tvc_id column already exists
-        cursor = db.execute("PRAGMA table_info(wave_items)")
-        columns = [row[1] for row in cursor.fetchall()]
-        
-        if 'tvc_id' not in columns:
-            # Add the tvc_id column
-            db.execute("ALTER TABLE wave_items ADD COLUMN tvc_id INTEGER")
-            db.commit()
-            print("Added tvc_id column to wave_items table")
-
-def migrate_add_campaign_fields():
-    """Add missing fields to campaigns table"""
-    with get_db() as db:
-        cursor = db.execute("PRAGMA table_info(campaigns)")
-        columns = [row[1] for row in cursor.fetchall()]
-        
-        new_columns = [
-            ("agency", "TEXT"),
-            ("client", "TEXT"),
-            ("product", "TEXT"),
-            ("country", "TEXT DEFAULT 'Lietuva'")
-        ]
-        
-        for col_name, col_type in new_columns:
-            if col_name not in columns:
-                db.execute(f"ALTER TABLE campaigns ADD COLUMN {col_name} {col_type}")
-                print(f"Added {col_name} column to campaigns table")
-        
-        db.commit()
-
-def migrate_add_wave_item_fields():
-    """Add all missing fields from Excel to wave_items table"""
-    with get_db() as db:
-        cursor = db.execute("PRAGMA table_info(wave_items)")
-        columns = [row[1] for row in cursor.fetchall()]
-        
-        new_columns = [
-            ("channel_id", "INTEGER"),
-            ("channel_share", "REAL DEFAULT 0.75"),
-            ("pt_zone_share", "REAL DEFAULT 0.55"),
-            ("npt_zone_share", "REAL DEFAULT 0.45"),
-            ("clip_duration", "INTEGER DEFAULT 10"),
-            ("grp_planned", "REAL"),
-            ("affinity1", "REAL"),
-            ("affinity2", "REAL"),
-            ("affinity3", "REAL"),
-            ("gross_cpp_eur", "REAL"),
-            ("duration_index", "REAL DEFAULT 1.0"),
-            ("seasonal_index", "REAL DEFAULT 1.0"),
-            ("trp_purchase_index", "REAL DEFAULT 0.95"),
-            ("advance_purchase_index", "REAL DEFAULT 0.95"),
-            ("web_index", "REAL DEFAULT 1.0"),
-            ("advance_payment_index", "REAL DEFAULT 1.0"),
-            ("loyalty_discount_index", "REAL DEFAULT 1.0"),
-            ("position_index", "REAL DEFAULT 1.0"),
-            ("gross_price_eur", "REAL"),
-            ("client_discount", "REAL DEFAULT 0"),
-            ("net_price_eur", "REAL"),
-            ("agency_discount", "REAL DEFAULT 0"),
-            ("net_net_price_eur", "REAL"),
-            ("tg_size_thousands", "REAL DEFAULT 0"),
-            ("tg_share_percent", "REAL DEFAULT 0"),
-            ("tg_sample_size", "INTEGER DEFAULT 0"),
-            ("daily_trp_distribution", "TEXT")  # JSON string for daily TRP values
-        ]
-        
-        for col_name, col_type in new_columns:
-            if col_name not in columns:
-                db.execute(f"ALTER TABLE wave_items ADD COLUMN {col_name} {col_type}")
-                print(f"Added {col_name} column to wave_items table")
-        
-        db.commit()
-
-def migrate_add_pricing_indices():
-    """Add duration and seasonal indices to pricing_list_items"""
-    with get_db() as db:
-        cursor = db.execute("PRAGMA table_info(pricing_list_items)")
-        columns = [row[1] for row in cursor.fetchall()]
-        
-        new_columns = [
-            ("duration_index", "REAL DEFAULT 1.0"),
-            ("seasonal_index", "REAL DEFAULT 1.0"),
-            ("tg_size_thousands", "REAL DEFAULT 0"),  # TG dydis tūkstančiais
-            ("tg_share_percent", "REAL DEFAULT 0"),   # TG dalis procentais 
-            ("tg_sample_size", "INTEGER DEFAULT 0")   # TG imties dydis
-        ]
-        
-        for col_name, col_type in new_columns:
-            if col_name not in columns:
-                db.execute(f"ALTER TABLE pricing_list_items ADD COLUMN {col_name} {col_type}")
-                print(f"Added {col_name} column to pricing_list_items table")
-        
-        db.commit()
+import sqlite3, os, re
+from .db import DB_PATH, get_db
+from . import pricing_engine, refdata
 
 # ---------------- Channel groups / channels ----------------
 
 def upsert_channel_group(name: str) -> int:
     with get_db() as db:
         db.execute("INSERT OR IGNORE INTO channel_groups(name) VALUES (?)", (name,))
+        refdata.invalidate()
         row = db.execute("SELECT id FROM channel_groups WHERE name=?", (name,)).fetchone()
         return row["id"]
 
@@ -366,10 +108,12 @@ def update_channel_group(group_id: int, name: str):
         raise ValueError("name required")
     with get_db() as db:
         db.execute("UPDATE channel_groups SET name=? WHERE id=?", (name.strip(), group_id))
+        refdata.invalidate()
 
 def delete_channel_group(group_id: int):
     with get_db() as db:
         db.execute("DELETE FROM channel_groups WHERE id=?", (group_id,))
+        refdata.invalidate()
 
 # ---------------- TRP rates (legacy) ----------------
 
@@ -668,6 +412,126 @@ def list_campaigns():
         """).fetchall()
         return [dict(r) for r in rows]
 
+# Sort keys of list_campaigns_page; each is backed by an index ending in the rowid
+CAMPAIGN_SORTS = {
+    "id": "c.id",
+    "name": "c.name",
+    "start_date": "IFNULL(c.start_date, '')",
+    "end_date": "IFNULL(c.end_date, '')",
+}
+
+_TODAY = "date('now', 'localtime')"
+_MONTH_START = "date('now', 'localtime', 'start of month')"
+_MONTH_END = "date('now', 'localtime', 'start of month', '+1 month', '-1 day')"
+_YEAR = "strftime('%Y', 'now', 'localtime')"
+
+CAMPAIGN_DATE_RANGES = {
+    "current_month": f"""(c.start_date BETWEEN {_MONTH_START} AND {_MONTH_END}
+                          OR c.end_date BETWEEN {_MONTH_START} AND {_MONTH_END}
+                          OR c.start_date <= {_TODAY} AND c.end_date >= {_TODAY})""",
+    "current_year": f"(substr(c.start_date, 1, 4) = {_YEAR} OR substr(c.end_date, 1, 4) = {_YEAR})",
+    "past": f"c.end_date < {_TODAY}",
+    "future": f"c.start_date > {_TODAY}",
+}
+
+
+def _campaign_filter_sql(filters: dict) -> tuple[list, list]:
+    """WHERE conditions and parameters for every filter except status and agency"""
+    conditions, params = [], []
+    match = campaign_search_query(filters.get("search") or "")
+    if match:
+        conditions.append("c.id IN (SELECT rowid FROM campaign_search WHERE campaign_search MATCH ?)")
+        params.append(match)
+    if filters.get("client"):
+        conditions.append("c.client = ?")
+        params.append(filters["client"])
+    if filters.get("date_range"):
+        conditions.append(CAMPAIGN_DATE_RANGES[filters["date_range"]])
+    # Explicit period: campaigns overlapping [date_from, date_to]
+    if filters.get("date_from"):
+        conditions.append("IFNULL(c.end_date, c.start_date) >= ?")
+        params.append(filters["date_from"])
+    if filters.get("date_to"):
+        conditions.append("IFNULL(c.start_date, c.end_date) <= ?")
+        params.append(filters["date_to"])
+    return conditions, params
+
+
+def list_campaigns_page(filters: dict, sort: str = "-id", after: tuple | None = None, limit: int = 50):
+    """One page of campaigns plus the status/agency counts of the filtered set
+
+    ``filters`` takes search, status, agency, client, date_range (a key of
+    CAMPAIGN_DATE_RANGES), date_from and date_to. ``sort`` is a key of
+    CAMPAIGN_SORTS, prefixed with "-" for descending. Paging is by keyset:
+    ``after`` is the (sort value, id) of the last row already shown, so a
+    page costs the same however deep it is. Up to ``limit`` rows are
+    returned, each with its sort value in ``sort_key``.
+
+    The counts come from one GROUP BY status, agency over the filtered
+    set without the status and agency filters, so the caller can derive
+    both facets (and the total) from it. Returns (rows, facet rows).
+    """
+    descending = sort.startswith("-")
+    key = CAMPAIGN_SORTS[sort.lstrip("-")]
+    conditions, params = _campaign_filter_sql(filters)
+
+    page_conditions, page_params = list(conditions), list(params)
+    for column in ("status", "agency"):
+        if filters.get(column):
+            page_conditions.append(f"c.{column} = ?")
+            page_params.append(filters[column])
+    if after is not None:
+        op = "<" if descending else ">"
+        if key == "c.id":
+            page_conditions.append(f"c.id {op} ?")
+            page_params.append(after[1])
+        else:
+            # The plain comparison lets SQLite seek into the index
+            page_conditions.append(f"{key} {op}= ? AND ({key}, c.id) {op} (?, ?)")
+            page_params += [after[0], *after]
+
+    direction = "DESC" if descending else "ASC"
+    with get_db() as db:
+        rows = db.execute(f"""
+            SELECT c.*, NULL AS pricing_list_name, {key} AS sort_key
+            FROM campaigns c
+            {"WHERE " + " AND ".join(page_conditions) if page_conditions else ""}
+            ORDER BY {key} {direction}, c.id {direction}
+            LIMIT ?
+        """, (*page_params, limit)).fetchall()
+        facets = db.execute(f"""
+            SELECT c.status, c.agency, COUNT(*) AS n
+            FROM campaigns c
+            {"WHERE " + " AND ".join(conditions) if conditions else ""}
+            GROUP BY c.status, c.agency
+        """, params).fetchall()
+        return [dict(r) for r in rows], [dict(r) for r in facets]
+
+def campaign_search_query(text: str) -> str:
+    """FTS5 query for free text: every word must match as a prefix"""
+    return " ".join(f'"{word}"*' for word in re.findall(r"\w+", text))
+
+def search_campaigns(text: str, limit: int = 20):
+    """Campaigns matching ``text`` in the campaign_search index, best match first
+
+    Words match by prefix and without Lithuanian diacritics ("sauk" finds
+    "Šaukštai"). Ranking is bm25 with the weights set in migration 20.
+    """
+    match = campaign_search_query(text)
+    if not match:
+        return []
+    with get_db() as db:
+        rows = db.execute("""
+            SELECT c.id, c.name, c.client, c.product, c.agency, c.status, c.start_date, c.end_date,
+                   s.code AS campaign_code, s.rank AS score
+            FROM campaign_search s
+            JOIN campaigns c ON c.id = s.rowid
+            WHERE campaign_search MATCH ?
+            ORDER BY s.rank
+            LIMIT ?
+        """, (match, limit)).fetchall()
+        return [dict(r) for r in rows]
+
 def update_campaign(cid: int, data: dict):
     sets, args = [], []
     for k in ["name","pricing_list_id","start_date","end_date","status"]:
@@ -686,6 +550,46 @@ def delete_campaign(cid: int):
         # Delete campaign (waves and wave_items will cascade)
         db.execute("DELETE FROM campaigns WHERE id=?", (cid,))
 
+def find_campaign_id_by_name(name: str) -> int | None:
+    """Newest local campaign with exactly this name"""
+    with get_db() as db:
+        row = db.execute("SELECT id FROM campaigns WHERE name = ? ORDER BY id DESC LIMIT 1", (name,)).fetchone()
+        return row["id"] if row else None
+
+# ---------- Projects-CRM campaign links ----------
+
+def get_crm_link(*, crm_id: int | None = None, local_id: int | None = None, code: str | None = None):
+    """Link row found by the Projects-CRM id, the local campaign id or the campaign code"""
+    column, value = next((c, v) for c, v in (("crm_id", crm_id), ("local_id", local_id), ("code", code))
+                         if v is not None)
+    with get_db() as db:
+        row = db.execute(f"SELECT * FROM crm_campaign_links WHERE {column} = ?", (value,)).fetchone()
+        return dict(row) if row else None
+
+def list_crm_links():
+    with get_db() as db:
+        return [dict(r) for r in db.execute("SELECT * FROM crm_campaign_links").fetchall()]
+
+def save_crm_link(local_id: int, crm_id: int | None, code: str | None):
+    """Record that a local campaign mirrors a Projects-CRM campaign
+
+    Any other local campaign still holding the same CRM id or code loses it,
+    so both directions stay one-to-one.
+    """
+    with get_db() as db:
+        db.execute("""
+            DELETE FROM crm_campaign_links
+            WHERE local_id != ? AND (crm_id = ? OR code = ?)
+        """, (local_id, crm_id, code))
+        db.execute("""
+            INSERT INTO crm_campaign_links(local_id, crm_id, code, last_synced_at)
+            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(local_id) DO UPDATE SET
+                crm_id = excluded.crm_id,
+                code = excluded.code,
+                last_synced_at = CURRENT_TIMESTAMP
+        """, (local_id, crm_id, code))
+
 def create_wave(campaign_id: int, name: str | None, start_date: str | None, end_date: str | None) -> int:
     with get_db() as db:
         db.execute("""
@@ -725,6 +629,47 @@ def delete_wave(wid: int):
     with get_db() as db:
         db.execute("DELETE FROM waves WHERE id=?", (wid,))
 
+def enqueue_crm_plan_sync(campaign_id: int, op: str, plan_name: str, payload: dict | None = None,
+                          wave_id: int | None = None):
+    """Queue a Projects-CRM plan write in the caller's transaction (see crm_outbox.py)"""
+    import json
+    with get_db() as db:
+        db.execute("""
+            INSERT INTO crm_outbox(campaign_id, wave_id, op, plan_name, payload)
+            VALUES (?, ?, ?, ?, ?)
+        """, (campaign_id, wave_id, op, plan_name, json.dumps(payload) if payload else None))
+
+# ---------------- Calendar ----------------
+def get_data_revision(scope: str) -> int:
+    """Get the change counter for a scope (bumped by triggers, see migrations)"""
+    with get_db() as db:
+        row = db.execute("SELECT revision FROM data_revisions WHERE scope=?", (scope,)).fetchone()
+        return row["revision"] if row else 0
+
+def list_calendar_events(start_date: str, end_date: str):
+    """Get campaigns and waves overlapping [start_date, end_date] in one query
+
+    The overlap test runs on the indexed start_day/end_day columns; each
+    campaign row is followed by its waves, newest campaign first.
+    """
+    with get_db() as db:
+        rows = db.execute("""
+            WITH win(first_day, last_day) AS (
+                SELECT CAST(julianday(?) AS INTEGER), CAST(julianday(?) AS INTEGER)
+            )
+            SELECT 'campaign' AS type, c.id AS campaign_id, c.name AS campaign_name,
+                   NULL AS wave_id, c.name AS name, c.start_date, c.end_date, c.status
+            FROM campaigns c, win
+            WHERE c.end_day >= win.first_day AND c.start_day <= win.last_day
+            UNION ALL
+            SELECT 'wave', w.campaign_id, c.name, w.id, w.name, w.start_date, w.end_date, NULL
+            FROM waves w, win
+            JOIN campaigns c ON c.id = w.campaign_id
+            WHERE w.end_day >= win.first_day AND w.start_day <= win.last_day
+            ORDER BY campaign_id DESC, wave_id
+        """, (start_date, end_date)).fetchall()
+        return [dict(r) for r in rows]
+
 def _pricing_list_id_for_wave(wave_id: int) -> int | None:
     with get_db() as db:
         row = db.execute("""
@@ -742,6 +687,11 @@ def list_wave_items(wave_id: int):
         """, (wave_id,)).fetchall()
         return [dict(r) for r in rows]
 
+def get_wave_item(item_id: int):
+    with get_db() as db:
+        row = db.execute("SELECT * FROM wave_items WHERE id=?", (item_id,)).fetchone()
+        return dict(row) if row else None
+
 def create_wave_item_prefill(wave_id: int, owner: str, target_group: str, trps: float, tvc_id: int = None) -> int:
     pl_id = _pricing_list_id_for_wave(wave_id)
     if not pl_id:
@@ -778,46 +728,80 @@ def create_wave_item_prefill(wave_id: int, owner: str, target_group: str, trps:
 
 def create_wave_item_excel(wave_id: int, excel_data: dict) -> int:
     """Create a wave item with Excel-style data structure"""
-        
-    # Get pricing info from TRP rates based on channel_group (which is the owner) and target_group
-    rate = get_trp_rate_item(excel_data["channel_group"], excel_data["target_group"])
-    
-    # Calculate derived values
-    # GRP Planned = TRP × 100 / affinity1 (correct Excel formula)
-    affinity1 = excel_data.get("affinity1")
-    if affinity1 and affinity1 != 0:
-        grp_planned = excel_data["trps"] * 100 / affinity1
-    else:
-        grp_planned = 0  # Cannot calculate without valid affinity1
-    # CPP = price per second (from rate list, no clip duration multiplication)
-    gross_cpp_eur = rate["price_per_sec_eur"] if rate else 1.0
-    
-    # Get indices from database if available, otherwise use form values
+    return create_wave_items_excel(wave_id, [excel_data])[0]
+
+def create_wave_items_excel(wave_id: int, items: list[dict]) -> list[int]:
+    """Create several Excel-style wave items in one transaction
+
+    Rates are looked up once per (channel_group, target_group) and indices
+    once per (channel_group, clip_duration); all items are priced together
+    and inserted with executemany. Returns the new ids in input order.
+    """
+    if not items:
+        return []
+
     # Get wave dates for seasonal index calculation
     with get_db() as db:
         wave_data = db.execute("SELECT start_date, end_date FROM waves WHERE id = ?", (wave_id,)).fetchone()
-        wave_start_date = wave_data["start_date"] if wave_data else None
-        wave_end_date = wave_data["end_date"] if wave_data else None
-    
+    if not wave_data:
+        raise ValueError("Wave not found")
+
+    # Get pricing info from TRP rates based on channel_group (which is the owner) and target_group
+    rates = {}
+    for key in {(d["channel_group"], d["target_group"]) for d in items}:
+        rates[key] = get_trp_rate_item(*key)
+
     # Get indices from database using channel group and wave date range
-    db_indices = get_indices_for_wave_item(excel_data["channel_group"], excel_data["clip_duration"], wave_start_date, wave_end_date)
-    
-    # Use database indices if available, otherwise fall back to form values
-    duration_index = db_indices.get("duration_index", excel_data.get("duration_index", 1.25))
-    seasonal_index = db_indices.get("seasonal_index", excel_data.get("seasonal_index", 0.9))
-    
-    # Calculate gross price with all indices and clip duration
-    gross_price_eur = (excel_data["trps"] * gross_cpp_eur * excel_data["clip_duration"] *
-                      duration_index * seasonal_index * 
-                      excel_data["trp_purchase_index"] * excel_data["advance_purchase_index"] * 
-                      excel_data["position_index"])
-    
-    # Calculate net prices
-    net_price_eur = gross_price_eur * (1 - excel_data["client_discount"] / 100)
-    net_net_price_eur = net_price_eur * (1 - excel_data["agency_discount"] / 100)
+    indices = {}
+    for key in {(d["channel_group"], d["clip_duration"]) for d in items}:
+        indices[key] = get_indices_for_wave_item(key[0], key[1], wave_data["start_date"], wave_data["end_date"])
+
+    rows = []
+    for excel_data in items:
+        rate = rates[(excel_data["channel_group"], excel_data["target_group"])]
+        db_indices = indices[(excel_data["channel_group"], excel_data["clip_duration"])]
+        rows.append({
+            **excel_data,
+            "rate": rate,
+            # CPP = price per second (from rate list, no clip duration multiplication)
+            "gross_cpp_eur": rate["price_per_sec_eur"] if rate else 1.0,
+            # Use database indices if available, otherwise fall back to form values
+            "duration_index": db_indices.get("duration_index", excel_data.get("duration_index", 1.25)),
+            "seasonal_index": db_indices.get("seasonal_index", excel_data.get("seasonal_index", 0.9)),
+        })
+
+    # Gross/net/net-net prices and GRP Planned (TRP × 100 / affinity1)
+    priced = pricing_engine.price_rows(rows)
+
+    params = []
+    for n, row in enumerate(rows):
+        rate = row["rate"]
+        params.append((
+            wave_id, row["target_group"], _norm_number(row["trps"]), None,  # channel_id set to None since we use channel_group
+            row["channel_share"], row["pt_zone_share"], row["clip_duration"], 
+            row.get("tvc_id"),  # TVC ID from form
+            priced["grp"][n], row.get("affinity1"), row.get("affinity2"), row.get("affinity3"),
+            row["gross_cpp_eur"], row["duration_index"], row["seasonal_index"],
+            row["trp_purchase_index"], row["advance_purchase_index"], row["position_index"],
+            priced["gross"][n], row["client_discount"], priced["net"][n], 
+            row["agency_discount"], priced["net_net"][n],
+            # TG data from Excel/form, fallback to TRP rates, then defaults
+            row.get("tg_size_thousands") or (rate.get("tg_size_thousands", 0) if rate else 0),
+            row.get("tg_share_percent") or (rate.get("tg_share_percent", 0) if rate else 0), 
+            row.get("tg_sample_size") or (rate.get("tg_sample_size", 0) if rate else 0),
+            # Use channel_group as owner
+            row["channel_group"], 
+            rate["primary_label"] if rate else "N/A",
+            rate["secondary_label"] if rate else None,
+            rate["share_primary"] if rate else 0,
+            rate["share_secondary"] if rate else 0,
+            rate["prime_share_primary"] if rate else 0,
+            rate["prime_share_secondary"] if rate else 0,
+            rate["price_per_sec_eur"] if rate else row["gross_cpp_eur"]
+        ))
     
     with get_db() as db:
-        db.execute("""
+        insert = """
             INSERT INTO wave_items(
                 wave_id, target_group, trps, channel_id, channel_share, pt_zone_share, clip_duration, tvc_id,
                 grp_planned, affinity1, affinity2, affinity3, gross_cpp_eur, duration_index,
@@ -828,154 +812,110 @@ def create_wave_item_excel(wave_id: int, excel_data: dict) -> int:
                 prime_share_primary, prime_share_secondary, price_per_sec_eur
             )
             VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
-        """, (
-            wave_id, excel_data["target_group"], _norm_number(excel_data["trps"]), None,  # channel_id set to None since we use channel_group
-            excel_data["channel_share"], excel_data["pt_zone_share"], excel_data["clip_duration"], 
-            excel_data.get("tvc_id"),  # TVC ID from form
-            grp_planned, excel_data.get("affinity1"), excel_data.get("affinity2"), excel_data.get("affinity3"),
-            gross_cpp_eur, duration_index, seasonal_index,
-            excel_data["trp_purchase_index"], excel_data["advance_purchase_index"], excel_data["position_index"],
-            gross_price_eur, excel_data["client_discount"], net_price_eur, 
-            excel_data["agency_discount"], net_net_price_eur,
-            # TG data from Excel/form, fallback to TRP rates, then defaults
-            excel_data.get("tg_size_thousands") or (rate.get("tg_size_thousands", 0) if rate else 0),
-            excel_data.get("tg_share_percent") or (rate.get("tg_share_percent", 0) if rate else 0), 
-            excel_data.get("tg_sample_size") or (rate.get("tg_sample_size", 0) if rate else 0),
-            # Use channel_group as owner
-            excel_data["channel_group"], 
-            rate["primary_label"] if rate else "N/A",
-            rate["secondary_label"] if rate else None,
-            rate["share_primary"] if rate else 0,
-            rate["share_secondary"] if rate else 0,
-            rate["prime_share_primary"] if rate else 0,
-            rate["prime_share_secondary"] if rate else 0,
-            rate["price_per_sec_eur"] if rate else gross_cpp_eur
-        ))
-        return db.execute("SELECT last_insert_rowid() AS id").fetchone()["id"]
+            RETURNING id
+        """
+        # One cached statement per row; RETURNING gives each row's own id
+        return [db.execute(insert, p).fetchone()["id"] for p in params]
+
+# allow overriding any snapped values including discounts and Excel structure fields
+WAVE_ITEM_EDITABLE = ["owner","target_group","primary_label","secondary_label",
+                      "share_primary","share_secondary","prime_share_primary","prime_share_secondary",
+                      "price_per_sec_eur","trps","client_discount","agency_discount",
+                      "channel_share","pt_zone_share","clip_duration","affinity1","affinity2","affinity3",
+                      "duration_index","seasonal_index","trp_purchase_index","advance_purchase_index","web_index","advance_payment_index","loyalty_discount_index","position_index"]
+WAVE_ITEM_NUMERIC = set(WAVE_ITEM_EDITABLE[4:])
+# Edits to these fields trigger a price / GRP recalculation
+_PRICE_FIELDS = {"client_discount", "agency_discount", "trps", "clip_duration", "trp_purchase_index", "advance_purchase_index", "web_index", "advance_payment_index", "loyalty_discount_index", "position_index", "duration_index", "seasonal_index"}
+_GRP_FIELDS = {"trps", "affinity1"}
+_WAVE_ITEM_COMPUTED = ["grp_planned", "gross_price_eur", "net_price_eur", "net_net_price_eur"]
 
 def update_wave_item(item_id: int, data: dict):
-    print(f"DEBUG: update_wave_item called with item_id={item_id}, data={data}")
-    # allow overriding any snapped values including discounts and Excel structure fields
-    numeric = {"share_primary","share_secondary","prime_share_primary","prime_share_secondary","price_per_sec_eur","trps","client_discount","agency_discount",
-               "channel_share","pt_zone_share","clip_duration","affinity1","affinity2","affinity3",
-               "duration_index","seasonal_index","trp_purchase_index","advance_purchase_index","web_index","advance_payment_index","loyalty_discount_index","position_index"}
-    sets, args = [], []
-    for k in ["owner","target_group","primary_label","secondary_label",
-              "share_primary","share_secondary","prime_share_primary","prime_share_secondary",
-              "price_per_sec_eur","trps","client_discount","agency_discount",
-              "channel_share","pt_zone_share","clip_duration","affinity1","affinity2","affinity3",
-              "duration_index","seasonal_index","trp_purchase_index","advance_purchase_index","web_index","advance_payment_index","loyalty_discount_index","position_index"]:
-        if k in data:
-            v = _norm_number(data[k]) if k in numeric else data[k]
-            sets.append(f"{k}=?"); args.append(v)
-    
-    # Recalculate prices and GRP if relevant fields were updated
-    need_price_recalc = any(field in data for field in ["client_discount", "agency_discount", "trps", "clip_duration", "trp_purchase_index", "advance_purchase_index", "web_index", "advance_payment_index", "loyalty_discount_index", "position_index", "duration_index", "seasonal_index"])
-    need_grp_recalc = any(field in data for field in ["trps", "affinity1"])
-    
-    if need_price_recalc or need_grp_recalc:
-        with get_db() as db:
-            # Get current item data
-            item = db.execute("SELECT * FROM wave_items WHERE id = ?", (item_id,)).fetchone()
-            if item:
-                # Get updated values or use existing ones (SQLite Row uses [] not .get())
-                trps = data.get("trps", item["trps"] or 0)
-                gross_cpp = item["gross_cpp_eur"] or 0
-                
-                # Get updated indices or use existing ones
-                duration_index = data.get("duration_index", item["duration_index"] or 1.0)
-                seasonal_index = data.get("seasonal_index", item["seasonal_index"] or 1.0)
-                trp_purchase_index = data.get("trp_purchase_index", item["trp_purchase_index"] or 0.95)
-                advance_purchase_index = data.get("advance_purchase_index", item["advance_purchase_index"] or 0.95)
-                web_index = data.get("web_index", item["web_index"] or 1.0)
-                advance_payment_index = data.get("advance_payment_index", item["advance_payment_index"] or 1.0)
-                loyalty_discount_index = data.get("loyalty_discount_index", item["loyalty_discount_index"] or 1.0)
-                position_index = data.get("position_index", item["position_index"] or 1.0)
-                
-                # Recalculate gross price with all indices and clip duration
-                clip_duration = data.get("clip_duration", item["clip_duration"] or 10)
-                gross_price = (trps * gross_cpp * clip_duration * duration_index * seasonal_index *
-                             trp_purchase_index * advance_purchase_index * web_index *
-                             advance_payment_index * loyalty_discount_index * position_index)
-                
-                # Get discounts
-                client_discount = data.get("client_discount", item["client_discount"] or 0)
-                agency_discount = data.get("agency_discount", item["agency_discount"] or 0)
-                
-                # Calculate net prices
-                net_price = gross_price * (1 - client_discount / 100)
-                net_net_price = net_price * (1 - agency_discount / 100)
-                
-                # Recalculate GRP if needed
-                if need_grp_recalc:
-                    updated_trps = data.get("trps", item["trps"] or 0)
-                    updated_affinity1 = data.get("affinity1", item["affinity1"])
-                    
-                    if updated_affinity1 and updated_affinity1 != 0:
-                        grp_planned = updated_trps * 100 / updated_affinity1
-                    else:
-                        grp_planned = 0
-                    
-                    sets.append("grp_planned=?"); args.append(grp_planned)
-                
-                # Add price updates to sets
-                sets.append("gross_price_eur=?"); args.append(gross_price)
-                sets.append("net_price_eur=?"); args.append(net_price)
-                sets.append("net_net_price_eur=?"); args.append(net_net_price)
-    
-    if not sets:
-        print(f"DEBUG: No fields to update for item_id={item_id}")
-        return
-        
-    args.append(item_id)
-    sql = f"UPDATE wave_items SET {', '.join(sets)} WHERE id=?"
-    print(f"DEBUG: Executing SQL: {sql} with args: {args}")
-    
-    with get_db() as db:
-        db.execute(sql, args)
-        print(f"DEBUG: Update completed for item_id={item_id}")
+    update_wave_items([{"id": item_id, "changes": data}])
+
+def update_wave_items(edits: list[dict]) -> list[dict]:
+    """Apply [{id, changes}] edits to wave items in one transaction
+
+    All rows are loaded with one query, repriced together by the pricing
+    engine and written back with executemany. Returns the updated rows.
+    """
+    changes_by_id = {}
+    for edit in edits:
+        item_id = int(edit["id"])
+        changes = {k: (_norm_number(v) if k in WAVE_ITEM_NUMERIC else v)
+                   for k, v in (edit.get("changes") or {}).items() if k in WAVE_ITEM_EDITABLE}
+        changes_by_id.setdefault(item_id, {}).update(changes)
+    if not changes_by_id:
+        return []
+
+    with get_db() as db:
+        ids = list(changes_by_id)
+        placeholders = ",".join("?" * len(ids))
+        current = {r["id"]: dict(r) for r in db.execute(
+            f"SELECT * FROM wave_items WHERE id IN ({placeholders})", ids)}
+        missing = [i for i in ids if i not in current]
+        if missing:
+            raise ValueError(f"Wave items not found: {', '.join(map(str, missing))}")
+
+        merged = []
+        for item_id, changes in changes_by_id.items():
+            row = current[item_id]
+            row.update(changes)
+            merged.append(row)
+        priced = pricing_engine.price_rows(merged)
+
+        for n, row in enumerate(merged):
+            changed = changes_by_id[row["id"]].keys()
+            if changed & _GRP_FIELDS:
+                row["grp_planned"] = priced["grp"][n]
+            if changed & (_PRICE_FIELDS | _GRP_FIELDS):
+                row["gross_price_eur"] = priced["gross"][n]
+                row["net_price_eur"] = priced["net"][n]
+                row["net_net_price_eur"] = priced["net_net"][n]
+
+        columns = WAVE_ITEM_EDITABLE + _WAVE_ITEM_COMPUTED
+        db.executemany(
+            f"UPDATE wave_items SET {', '.join(f'{k}=?' for k in columns)} WHERE id=?",
+            [[row[k] for k in columns] + [row["id"]] for row in merged])
+        return merged
 
 def delete_wave_item(item_id: int):
     with get_db() as db:
         db.execute("DELETE FROM wave_items WHERE id=?", (item_id,))
 
+# Net / net-net from the stored gross and the wave's discounts (largest of
+# each type, else the campaign-level one), in one statement; same discount
+# step as pricing_engine
+_REPRICE_DISCOUNTS_SQL = """
+    WITH d AS (
+        SELECT w.id AS wave_id,
+               COALESCE(MAX(CASE WHEN wd.discount_type = 'client' THEN wd.discount_percentage END),
+                        MAX(CASE WHEN cd.discount_type = 'client' THEN cd.discount_percentage END), 0) AS client,
+               COALESCE(MAX(CASE WHEN wd.discount_type = 'agency' THEN wd.discount_percentage END),
+                        MAX(CASE WHEN cd.discount_type = 'agency' THEN cd.discount_percentage END), 0) AS agency
+        FROM waves w
+        LEFT JOIN discounts wd ON wd.wave_id = w.id
+        LEFT JOIN discounts cd ON cd.wave_id IS NULL AND cd.campaign_id = w.campaign_id
+        WHERE {where}
+        GROUP BY w.id
+    )
+    UPDATE wave_items
+    SET client_discount = d.client, agency_discount = d.agency,
+        net_price_eur = COALESCE(wave_items.gross_price_eur, 0) * (1 - d.client / 100.0),
+        net_net_price_eur = COALESCE(wave_items.gross_price_eur, 0) * (1 - d.client / 100.0) * (1 - d.agency / 100.0)
+    FROM d
+    WHERE wave_items.wave_id = d.wave_id
+"""
+
 def recalculate_wave_item_prices_with_discounts(wave_id: int):
     """Recalculate all wave item prices using wave-level discounts"""
     with get_db() as db:
-        # Get wave-level discounts
-        discounts = db.execute("""
-            SELECT discount_type, discount_percentage 
-            FROM discounts 
-            WHERE wave_id = ?
-        """, (wave_id,)).fetchall()
-        
-        client_discount = 0
-        agency_discount = 0
-        
-        for discount in discounts:
-            if discount["discount_type"] == "client":
-                client_discount = discount["discount_percentage"]
-            elif discount["discount_type"] == "agency":
-                agency_discount = discount["discount_percentage"]
-        
-        # Get all wave items for this wave
-        items = db.execute("SELECT * FROM wave_items WHERE wave_id = ?", (wave_id,)).fetchall()
-        
-        for item in items:
-            # Recalculate prices with wave-level discounts
-            gross_price = item["gross_price_eur"] or 0
-            net_price = gross_price * (1 - client_discount / 100)
-            net_net_price = net_price * (1 - agency_discount / 100)
-            
-            # Update the item with new calculated prices and discounts
-            db.execute("""
-                UPDATE wave_items 
-                SET client_discount = ?, agency_discount = ?, 
-                    net_price_eur = ?, net_net_price_eur = ?
-                WHERE id = ?
-            """, (client_discount, agency_discount, net_price, net_net_price, item["id"]))
-        
-        db.commit()
+        return db.execute(_REPRICE_DISCOUNTS_SQL.format(where="w.id = ?"), (wave_id,)).rowcount
+
+def recalculate_campaign_prices_with_discounts(campaign_id: int):
+    """Recalculate item prices of every wave in a campaign; returns per-wave totals"""
+    with get_db() as db:
+        db.execute(_REPRICE_DISCOUNTS_SQL.format(where="w.campaign_id = ?"), (campaign_id,))
+        return list_wave_totals(campaign_id)
 
 # ---------------- TVCs (TV Commercials) ----------------
 
@@ -1081,39 +1021,72 @@ def delete_discount(discount_id: int):
     with get_db() as db:
         db.execute("DELETE FROM discounts WHERE id = ?", (discount_id,))
 
+def _discounted_costs(base_cost, client_discount, agency_discount):
+    # Apply discounts sequentially
+    client_cost = base_cost * (1 - client_discount / 100)
+    agency_cost = client_cost * (1 - agency_discount / 100)
+
+    return {
+        'base_cost': base_cost,
+        'client_cost': client_cost,
+        'agency_cost': agency_cost,
+        'client_discount_percent': client_discount,
+        'agency_discount_percent': agency_discount
+    }
+
+def _largest_discounts(discounts):
+    largest = {}
+    for discount in discounts:
+        kind, percentage = discount['discount_type'], discount['discount_percentage']
+        largest[kind] = max(largest.get(kind, percentage), percentage)
+    return largest
+
+def _wave_costs(items, discounts, campaign_discounts=()):
+    """Wave totals from its items and discounts
+
+    Per type the wave's largest discount wins, else the campaign-level one
+    (the same rule as _REPRICE_DISCOUNTS_SQL).
+    """
+    base_cost = sum(item['price_per_sec_eur'] * item['trps'] for item in items)
+    wave, campaign = _largest_discounts(discounts), _largest_discounts(campaign_discounts)
+    return _discounted_costs(base_cost,
+                             wave.get('client', campaign.get('client', 0)),
+                             wave.get('agency', campaign.get('agency', 0)))
+
+# Wave totals with the discount rule of _REPRICE_DISCOUNTS_SQL
+_WAVE_TOTALS_SQL = """
+    SELECT w.id AS wave_id, w.name,
+           COALESCE((SELECT SUM(wi.price_per_sec_eur * wi.trps) FROM wave_items wi
+                     WHERE wi.wave_id = w.id), 0) AS base_cost,
+           COALESCE((SELECT MAX(discount_percentage) FROM discounts
+                     WHERE wave_id = w.id AND discount_type = 'client'),
+                    (SELECT MAX(discount_percentage) FROM discounts
+                     WHERE wave_id IS NULL AND campaign_id = w.campaign_id AND discount_type = 'client'),
+                    0) AS client,
+           COALESCE((SELECT MAX(discount_percentage) FROM discounts
+                     WHERE wave_id = w.id AND discount_type = 'agency'),
+                    (SELECT MAX(discount_percentage) FROM discounts
+                     WHERE wave_id IS NULL AND campaign_id = w.campaign_id AND discount_type = 'agency'),
+                    0) AS agency
+    FROM waves w
+    WHERE {where}
+    ORDER BY w.start_date, w.id
+"""
+
+def list_wave_totals(campaign_id: int):
+    """Get totals with discounts for every wave of a campaign in one query"""
+    with get_db() as db:
+        rows = db.execute(_WAVE_TOTALS_SQL.format(where="w.campaign_id = ?"), (campaign_id,)).fetchall()
+    return [{'wave_id': r['wave_id'], 'name': r['name'],
+             **_discounted_costs(r['base_cost'], r['client'], r['agency'])} for r in rows]
+
 def calculate_wave_total_with_discounts(wave_id: int):
     """Calculate wave total cost with discounts applied"""
     with get_db() as db:
-        # Get base cost from wave items
-        items = db.execute("""
-        SELECT price_per_sec_eur, trps FROM wave_items WHERE wave_id = ?
-        """, (wave_id,)).fetchall()
-        
-        base_cost = sum(item['price_per_sec_eur'] * item['trps'] for item in items)
-        
-        # Get discounts for this wave
-        discounts = get_discounts_for_wave(wave_id)
-        
-        client_discount = 0
-        agency_discount = 0
-        
-        for discount in discounts:
-            if discount['discount_type'] == 'client':
-                client_discount = max(client_discount, discount['discount_percentage'])
-            elif discount['discount_type'] == 'agency':
-                agency_discount = max(agency_discount, discount['discount_percentage'])
-        
-        # Apply discounts sequentially
-        client_cost = base_cost * (1 - client_discount / 100)
-        agency_cost = client_cost * (1 - agency_discount / 100)
-        
-        return {
-            'base_cost': base_cost,
-            'client_cost': client_cost,
-            'agency_cost': agency_cost,
-            'client_discount_percent': client_discount,
-            'agency_discount_percent': agency_discount
-        }
+        row = db.execute(_WAVE_TOTALS_SQL.format(where="w.id = ?"), (wave_id,)).fetchone()
+    if row is None:
+        return _discounted_costs(0, 0, 0)
+    return _discounted_costs(row['base_cost'], row['client'], row['agency'])
 
 # ---------------- Campaign Status ----------------
 
@@ -1132,10 +1105,118 @@ def get_campaign_status(campaign_id: int):
         row = db.execute("SELECT status FROM campaigns WHERE id = ?", (campaign_id,)).fetchone()
         return row['status'] if row else None
 
+def get_campaign_revision(campaign_id: int):
+    """Get the campaign's change counter and name: (revision, name), or None
+
+    The revision is bumped by triggers on any write to the campaign, its
+    waves, items, TVCs, discounts or TRP distribution (see migrations).
+    """
+    with get_db() as db:
+        row = db.execute("""
+            SELECT c.name, COALESCE(r.revision, 0) AS revision
+            FROM campaigns c
+            LEFT JOIN campaign_revisions r ON r.campaign_id = c.id
+            WHERE c.id = ?
+        """, (campaign_id,)).fetchone()
+        return (row['revision'], row['name']) if row else None
+
+def get_campaign_workspace(campaign_id: int):
+    """Everything the campaign editor loads when a campaign is opened, or None
+
+    The campaign with its CRM code and revisions, its TVCs, discounts and
+    daily TRP. Its waves come with their items, totals, wave-level daily
+    TRP and seasonal index per channel group. Also the reference data:
+    channel groups, TRP rates, and duration indices for the TVC lengths in
+    use. All of it is read in one transaction with one query per table,
+    not per wave.
+    """
+    with get_db() as db:
+        campaign = db.execute("""
+            SELECT c.*, NULL AS pricing_list_name, l.code AS campaign_code,
+                   COALESCE(r.revision, 0) AS revision,
+                   (SELECT revision FROM data_revisions WHERE scope = 'refdata') AS refdata_revision
+            FROM campaigns c
+            LEFT JOIN campaign_revisions r ON r.campaign_id = c.id
+            LEFT JOIN crm_campaign_links l ON l.local_id = c.id
+            WHERE c.id = ?
+        """, (campaign_id,)).fetchone()
+        if not campaign:
+            return None
+        waves = [dict(r) for r in db.execute(
+            "SELECT * FROM waves WHERE campaign_id = ? ORDER BY id", (campaign_id,))]
+        items = db.execute("""
+            SELECT wi.* FROM wave_items wi
+            JOIN waves w ON w.id = wi.wave_id
+            WHERE w.campaign_id = ?
+            ORDER BY wi.id
+        """, (campaign_id,)).fetchall()
+        tvcs = [dict(r) for r in db.execute(
+            "SELECT * FROM tvcs WHERE campaign_id = ? ORDER BY name", (campaign_id,))]
+        discounts = [dict(r) for r in db.execute("""
+            SELECT d.*, w.name as wave_name
+            FROM discounts d
+            LEFT JOIN waves w ON d.wave_id = w.id
+            WHERE d.campaign_id = ? OR d.wave_id IN (
+                SELECT id FROM waves WHERE campaign_id = ?
+            )
+            ORDER BY d.discount_type, d.wave_id
+        """, (campaign_id, campaign_id))]
+        legacy_trp = _legacy_trp_distribution(db, campaign_id)
+        wave_trp = {r['wave_id']: _series_to_dict(r['start_day'], r['daily_trp']) for r in db.execute("""
+            SELECT s.wave_id, s.start_day, s.daily_trp
+            FROM waves w
+            JOIN trp_series s ON s.wave_id = w.id AND s.wave_item_id IS NULL
+            WHERE w.campaign_id = ?
+        """, (campaign_id,))}
+        channel_groups = [dict(r) for r in db.execute("SELECT id, name FROM channel_groups ORDER BY name")]
+        trp_rates = [dict(r) for r in db.execute("SELECT * FROM trp_rates ORDER BY owner, target_group")]
+
+    items_by_wave = {}
+    for item in items:
+        items_by_wave.setdefault(item['wave_id'], []).append(dict(item))
+    discounts_by_wave = {}
+    for discount in discounts:
+        discounts_by_wave.setdefault(discount['wave_id'], []).append(discount)
+    campaign_discounts = discounts_by_wave.get(None, [])
+
+    # Indices are looked up in the refdata snapshot, no SQL
+    owners = sorted({rate['owner'] for rate in trp_rates})
+    durations = sorted({tvc['duration'] for tvc in tvcs})
+    for wave in waves:
+        wave['items'] = items_by_wave.get(wave['id'], [])
+        wave['total'] = _wave_costs(wave['items'], discounts_by_wave.get(wave['id'], []), campaign_discounts)
+        wave['trp_distribution'] = wave_trp.get(wave['id'], {})
+        wave['seasonal_indices'] = {
+            owner: get_indices_for_wave_item(owner, 0, wave['start_date'], wave['end_date'])['seasonal_index']
+            for owner in owners
+        }
+
+    campaign = dict(campaign)
+    revisions = {'campaign': campaign.pop('revision'), 'refdata': campaign.pop('refdata_revision') or 0}
+    return {
+        'campaign': campaign,
+        'revisions': revisions,
+        'waves': waves,
+        'tvcs': tvcs,
+        'discounts': discounts,
+        'trp_distribution': _sum_trp_series(wave_trp.values()) if wave_trp else legacy_trp,
+        'refdata': {
+            'channel_groups': channel_groups,
+            'trp_rates': trp_rates,
+            'duration_indices': {owner: {duration: get_duration_index(owner, duration) for duration in durations}
+                                 for owner in owners},
+        },
+    }
+
 # ---------------- Report Generation ----------------
 
 def get_campaign_report_data(campaign_id: int):
-    """Get all data needed for campaign reports"""
+    """Get all data needed for campaign reports
+
+    Loads the whole campaign tree (waves, items with TVC info, wave
+    discounts and per-wave costs) with four set-based queries, however many
+    waves the campaign has.
+    """
     with get_db() as db:
         # Get campaign info (pricing_list_id might be NULL, so use LEFT JOIN)
         campaign = db.execute("""
@@ -1148,520 +1229,391 @@ def get_campaign_report_data(campaign_id: int):
         if not campaign:
             return None
         
-        # Get waves with items and costs
-        waves_data = []
         waves = db.execute("SELECT * FROM waves WHERE campaign_id = ? ORDER BY start_date, name", (campaign_id,)).fetchall()
-        
-        for wave in waves:
-            wave_dict = dict(wave)
-            
-            # Get wave items with TVC info
-            items = db.execute("""
-            SELECT wi.*, t.name as tvc_name, t.duration as tvc_duration
-            FROM wave_items wi
-            LEFT JOIN tvcs t ON wi.tvc_id = t.id
-            WHERE wi.wave_id = ? 
-            ORDER BY wi.owner, wi.target_group
-            """, (wave['id'],)).fetchall()
-            wave_dict['items'] = [dict(item) for item in items]
-            
-            # Get wave costs with discounts
-            wave_dict['costs'] = calculate_wave_total_with_discounts(wave['id'])
-            
-            # Get discounts
-            discounts = get_discounts_for_wave(wave['id'])
-            wave_dict['discounts'] = discounts
-            
-            waves_data.append(wave_dict)
-        
-        return {
-            'campaign': dict(campaign),
-            'waves': waves_data
-        }
+        items = db.execute("""
+        SELECT wi.*, t.name as tvc_name, t.duration as tvc_duration
+        FROM wave_items wi
+        JOIN waves w ON w.id = wi.wave_id
+        LEFT JOIN tvcs t ON wi.tvc_id = t.id
+        WHERE w.campaign_id = ?
+        ORDER BY wi.wave_id, wi.owner, wi.target_group
+        """, (campaign_id,)).fetchall()
+        discounts = db.execute("""
+        SELECT d.* FROM discounts d
+        JOIN waves w ON w.id = d.wave_id
+        WHERE w.campaign_id = ?
+        ORDER BY d.wave_id, d.discount_type
+        """, (campaign_id,)).fetchall()
+        campaign_discounts = db.execute("""
+        SELECT * FROM discounts WHERE campaign_id = ? AND wave_id IS NULL
+        """, (campaign_id,)).fetchall()
+
+    items_by_wave = {}
+    for item in items:
+        items_by_wave.setdefault(item['wave_id'], []).append(dict(item))
+    discounts_by_wave = {}
+    for discount in discounts:
+        discounts_by_wave.setdefault(discount['wave_id'], []).append(dict(discount))
+
+    waves_data = []
+    for wave in waves:
+        wave_dict = dict(wave)
+        wave_dict['items'] = items_by_wave.get(wave['id'], [])
+        wave_dict['discounts'] = discounts_by_wave.get(wave['id'], [])
+        wave_dict['costs'] = _wave_costs(wave_dict['items'], wave_dict['discounts'], campaign_discounts)
+        waves_data.append(wave_dict)
+
+    return {
+        'campaign': dict(campaign),
+        'waves': waves_data
+    }
 
 # ---------------- TRP Calendar ----------------
 
-def save_trp_distribution(campaign_id: int, trp_data: dict):
-    """Save TRP distribution for a campaign"""
-    with get_db() as db:
-        for date_str, trp_value in trp_data.items():
-            db.execute("""
-                INSERT INTO trp_distribution (campaign_id, date, trp_value, updated_at)
-                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-                ON CONFLICT(campaign_id, date) DO UPDATE SET
-                    trp_value = excluded.trp_value,
-                    updated_at = CURRENT_TIMESTAMP
-            """, (campaign_id, date_str, float(trp_value) if trp_value else 0.0))
+def _sum_trp_series(series):
+    """Day-by-day sum of several {date: trp} dicts, in date order"""
+    totals = {}
+    for trp_data in series:
+        for date_str, trp in trp_data.items():
+            totals[date_str] = totals.get(date_str, 0.0) + trp
+    return {date_str: round(totals[date_str], 4) for date_str in sorted(totals)}
+
+def _legacy_trp_distribution(db, campaign_id: int):
+    rows = db.execute("""
+        SELECT date, trp_value FROM trp_distribution 
+        WHERE campaign_id = ? AND trp_value > 0
+        ORDER BY date
+    """, (campaign_id,)).fetchall()
+    return {row['date']: row['trp_value'] for row in rows}
 
 def load_trp_distribution(campaign_id: int):
-    """Load TRP distribution for a campaign"""
+    """Daily TRP calendar of a campaign (what the exports print)
+
+    The sum of the wave-level series in trp_series. Campaigns saved before
+    wave series existed only have the campaign-level trp_distribution
+    rows; those are returned when no wave of the campaign has a series.
+    """
+    series = load_campaign_wave_trp_distributions(campaign_id)
+    if series:
+        return _sum_trp_series(series.values())
     with get_db() as db:
-        rows = db.execute("""
-            SELECT date, trp_value FROM trp_distribution 
-            WHERE campaign_id = ? AND trp_value > 0
-            ORDER BY date
-        """, (campaign_id,)).fetchall()
-        
-        return {row['date']: row['trp_value'] for row in rows}
+        return _legacy_trp_distribution(db, campaign_id)
 
 def delete_trp_distribution(campaign_id: int):
     """Delete all TRP distribution data for a campaign"""
     with get_db() as db:
         db.execute("DELETE FROM trp_distribution WHERE campaign_id = ?", (campaign_id,))
 
+# Wave / wave-item daily TRP: one trp_series row per owner holding the first
+# day (julianday number, as in campaigns/waves.start_day) and the daily
+# values as packed little-endian float32.
+_JULIAN_DAY_OFFSET = 1721424  # CAST(julianday(d) AS INTEGER) == d.toordinal() + offset
+MAX_TRP_SERIES_DAYS = 1096  # Three years; keeps a mistyped date from packing megabytes
+
+def date_to_day(date_str: str) -> int:
+    from datetime import date
+    return date.fromisoformat(date_str).toordinal() + _JULIAN_DAY_OFFSET
+
+def day_to_date(day: int) -> str:
+    from datetime import date
+    return date.fromordinal(day - _JULIAN_DAY_OFFSET).isoformat()
+
+def pack_trp_series(trp_data: dict):
+    """(start_day, blob) for a {date: trp} dict, or None when it has no TRP"""
+    from array import array
+    import sys
+
+    values = {date_to_day(d): float(v) for d, v in trp_data.items() if v and float(v) > 0}
+    if not values:
+        return None
+    first, last = min(values), max(values)
+    if last - first + 1 > MAX_TRP_SERIES_DAYS:
+        raise ValueError(f"TRP distribution spans {last - first + 1} days; "
+                         f"at most {MAX_TRP_SERIES_DAYS} are allowed")
+    packed = array('f', (values.get(day, 0.0) for day in range(first, last + 1)))
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    return first, packed.tobytes()
+
+def unpack_trp_series(blob: bytes):
+    """Daily values of a packed series; a zero-copy view on little-endian hosts"""
+    import sys
+    if sys.byteorder == 'big':
+        from array import array
+        values = array('f', blob)
+        values.byteswap()
+        return values
+    return memoryview(blob).cast('f')
+
+def _series_to_dict(start_day: int, blob: bytes):
+    return {day_to_date(start_day + n): round(v, 4)
+            for n, v in enumerate(unpack_trp_series(blob)) if v > 0}
+
+def save_wave_trp_distribution(wave_id: int, trp_data: dict, wave_item_id: int | None = None):
+    """Save daily TRP for a wave (or one of its items) as a single packed row"""
+    series = pack_trp_series(trp_data)
+    with get_db() as db:
+        if series is None:
+            db.execute("""
+                DELETE FROM trp_series WHERE wave_id = ? AND COALESCE(wave_item_id, 0) = ?
+            """, (wave_id, wave_item_id or 0))
+            return
+        db.execute("""
+            INSERT INTO trp_series (wave_id, wave_item_id, start_day, daily_trp, updated_at)
+            VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(wave_id, COALESCE(wave_item_id, 0)) DO UPDATE SET
+                start_day = excluded.start_day,
+                daily_trp = excluded.daily_trp,
+                updated_at = CURRENT_TIMESTAMP
+        """, (wave_id, wave_item_id, *series))
+
+def load_wave_trp_distribution(wave_id: int, wave_item_id: int | None = None):
+    """Load daily TRP for a wave (or one of its items) as {date: trp}"""
+    with get_db() as db:
+        row = db.execute("""
+            SELECT start_day, daily_trp FROM trp_series
+            WHERE wave_id = ? AND COALESCE(wave_item_id, 0) = ?
+        """, (wave_id, wave_item_id or 0)).fetchone()
+    return _series_to_dict(row["start_day"], row["daily_trp"]) if row else {}
+
+def load_campaign_wave_trp_distributions(campaign_id: int):
+    """Load the wave-level daily TRP of every wave in a campaign: {wave_id: {date: trp}}"""
+    with get_db() as db:
+        rows = db.execute("""
+            SELECT s.wave_id, s.start_day, s.daily_trp
+            FROM waves w
+            JOIN trp_series s ON s.wave_id = w.id AND s.wave_item_id IS NULL
+            WHERE w.campaign_id = ?
+        """, (campaign_id,)).fetchall()
+    return {row["wave_id"]: _series_to_dict(row["start_day"], row["daily_trp"]) for row in rows}
+
+def list_waves_with_trp(campaign_id: int):
+    """Get the waves of a campaign with their total TRP (sum of items)"""
+    with get_db() as db:
+        rows = db.execute("""
+            SELECT w.id, w.name, w.start_date, w.end_date,
+                   COALESCE(SUM(wi.trps), 0) AS total_trp
+            FROM waves w
+            LEFT JOIN wave_items wi ON wi.wave_id = w.id
+            WHERE w.campaign_id = ?
+            GROUP BY w.id
+            ORDER BY w.start_date, w.id
+        """, (campaign_id,)).fetchall()
+        return [dict(r) for r in rows]
+
+def replace_campaign_wave_trp_distributions(campaign_id: int, distributions: dict):
+    """Replace the wave-level daily TRP of a campaign's waves in one transaction
+
+    ``distributions`` maps wave_id to {date: trp}; waves missing from it keep
+    their series, waves mapped to an empty dict lose it.
+    """
+    rows = []
+    for wave_id, trp_data in distributions.items():
+        series = pack_trp_series(trp_data)
+        if series:
+            rows.append((wave_id, *series))
+    with get_db() as db:
+        wave_ids = [r["id"] for r in db.execute(
+            "SELECT id FROM waves WHERE campaign_id = ?", (campaign_id,))]
+        foreign = set(distributions) - set(wave_ids)
+        if foreign:
+            raise ValueError(f"Waves not in campaign: {', '.join(map(str, sorted(foreign)))}")
+        db.executemany("DELETE FROM trp_series WHERE wave_id = ? AND wave_item_id IS NULL",
+                       [(wave_id,) for wave_id in distributions])
+        db.executemany("""
+            INSERT INTO trp_series (wave_id, wave_item_id, start_day, daily_trp)
+            VALUES (?, NULL, ?, ?)
+        """, rows)
+
 # openpyxl imports moved inside export_channel_group_excel function
 from io import BytesIO
 import csv
 import io
 
-def generate_client_excel_report(campaign_id: int):
-    """Generate Excel report for client (with client discounts applied)"""
-    import openpyxl
-    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+def generate_client_excel_report(campaign_id: int, data: dict | None = None):
+    """Generate Excel report for client (with client discounts applied)
+
+    ``data`` is the result of get_campaign_report_data() when the caller
+    already loaded it. The sheet is streamed in write-only mode: the plan
+    table and the TRP calendar next to it are produced row by row.
+    """
     from io import BytesIO
     from datetime import datetime, timedelta
     import sys
+    from .excel_export import SheetWriter, WEEKDAY_NAMES, write_only_workbook
 
-    data = get_campaign_report_data(campaign_id)
+    if data is None:
+        data = get_campaign_report_data(campaign_id)
     if not data:
         return None
 
     campaign = data['campaign']
     waves = data['waves']
 
-    # Load TRP calendar data
-    trp_data = load_trp_distribution(campaign_id)
+    wb, styles = write_only_workbook()
+    sheet = SheetWriter(wb, "TV Planas", styles)
 
-    # Create workbook
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "TV Planas"
-    
-    # Professional styles
-    header_fill = PatternFill(start_color="1F4E79", end_color="1F4E79", fill_type="solid")  # Dark blue
-    header_font = Font(color="FFFFFF", bold=True, size=11)
-    wave_fill = PatternFill(start_color="E7F3FF", end_color="E7F3FF", fill_type="solid")  # Light blue
-    wave_font = Font(bold=True, color="1F4E79", size=10)
-    total_fill = PatternFill(start_color="FFF2CC", end_color="FFF2CC", fill_type="solid")  # Light yellow for totals
-    border = Border(left=Side(style='thin', color='D0D0D0'), right=Side(style='thin', color='D0D0D0'), 
-                   top=Side(style='thin', color='D0D0D0'), bottom=Side(style='thin', color='D0D0D0'))
-    thick_border = Border(left=Side(style='medium'), right=Side(style='medium'), 
-                         top=Side(style='medium'), bottom=Side(style='medium'))
-    
-    current_row = 1
-    
-    # Campaign header
-    ws.merge_cells(f'A{current_row}:P{current_row}')
-    cell = ws[f'A{current_row}']
-    cell.value = f"TV KOMUNIKACIJOS PLANAS"
-    cell.font = Font(size=18, bold=True, color="1F4E79")
-    cell.alignment = Alignment(horizontal='center')
-    cell.fill = PatternFill(start_color="F8F9FA", end_color="F8F9FA", fill_type="solid")
-    current_row += 1
-
-    # Campaign name
-    ws.merge_cells(f'A{current_row}:P{current_row}')
-    cell = ws[f'A{current_row}']
-    cell.value = f"KAMPANIJA: {campaign['name'].upper()}"
-    cell.font = Font(size=14, bold=True, color="1F4E79")
-    cell.alignment = Alignment(horizontal='center')
-    current_row += 3
-    
-    # Campaign info section
-    info_font = Font(bold=True, size=10, color="1F4E79")
-    value_font = Font(size=10)
-    
-    # Create a bordered info section
-    info_cells = [
-        ("Kampanijos laikotarpis:", f"{campaign.get('start_date', '')} - {campaign.get('end_date', '')}"),
-        ("Klientas:", campaign.get('client', '')),
-        ("Agentūra:", campaign.get('agency', '')),
-        ("Kampanija:", campaign.get('product', '')),
-        ("Kainoraštis:", campaign.get('pricing_list_name', '')),
-        ("Statusas:", campaign.get('status', 'draft').replace('_', ' ').title())
-    ]
-    
-    for label, value in info_cells:
-        ws[f'A{current_row}'] = label
-        ws[f'A{current_row}'].font = info_font
-        ws[f'B{current_row}'] = value
-        ws[f'B{current_row}'].font = value_font
-        current_row += 1
-    
-    # Main table starts at row 15 (after campaign info)
-    current_row = 15
-    
-    # Table headers - keeping only the columns you want (16 columns total)
-    headers = [
-        'Pradžia', 'Pabaiga', 'Kanalų grupė', 'Perkama TG', 'TVC', 'Trukmė',
-        'Kanalo dalis', 'PT zonos dalis', 'nPT zonos dalis', 'GRP plan.',
-        'Gross CPP', 'Trukmės koeficientas', 'Sezoninis koeficientas',
-        'Gross kaina', 'Kliento nuolaida %', 'Net kaina'
-    ]
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=current_row, column=col)
-        cell.value = header
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
-        cell.border = border
-
-    # Set header row height to make it taller (CLIENT EXCEL EXPORT)
-    ws.row_dimensions[current_row].height = 120
-
-    current_row += 1
-    
-    # Data rows
-    total_cost = 0
-    row_count = 0
-    light_fill = PatternFill(start_color="F9F9F9", end_color="F9F9F9", fill_type="solid")  # Zebra striping
-    
-    for wave in waves:
-        wave_start_row = current_row
-        
-        for item in wave['items']:
-            item_cost = item['trps'] * item['price_per_sec_eur']
-            
-            # Calculate values
-            tg_size = item.get('tg_size_thousands', 0)
-            tg_share = item.get('tg_share_percent', 0)
-            tg_sample = item.get('tg_sample_size', 0)
-            channel_share = item.get('channel_share', 0.75)
-            if channel_share < 1:  # If it's a decimal (0.75), convert to percentage
-                channel_share = channel_share * 100
-            pt_zone_share = item.get('pt_zone_share', 0.55)
-            if pt_zone_share < 1:  # If it's a decimal (0.55), convert to percentage
-                pt_zone_share = pt_zone_share * 100
-            affinity1 = item.get('affinity1', 0)
-            grp_planned = (item['trps'] * 100 / affinity1) if affinity1 > 0 else 0
-            gross_cpp = item.get('gross_cpp_eur', item.get('price_per_sec_no_discount', item['price_per_sec_eur']))
-            
-            # Indices
-            duration_idx = item.get('duration_index', 1.0)
-            seasonal_idx = item.get('seasonal_index', 1.0)
-            trp_purchase_idx = item.get('trp_purchase_index', 1.0)
-            advance_idx = item.get('advance_purchase_index', 1.0)
-            position_idx = item.get('position_index', 1.0)
-            
-            # Calculate base gross price (TRP * CPP * Duration) without multipliers
-            # The Excel shows individual coefficients as separate rows, so we want the base calculation
-            clip_duration = item.get('tvc_duration', item.get('clip_duration', 0))
-            gross_price = item['trps'] * gross_cpp * clip_duration
-
-            # Get actual client discount from item data
-            client_discount = item.get('client_discount', 0)
-            print(f"DEBUG EXCEL: TRP={item['trps']}, CPP={gross_cpp}, Duration={clip_duration}, Gross={gross_price}, Client_discount={client_discount}", file=sys.stderr, flush=True)
-            net_price = gross_price * (1 - client_discount / 100)
-            agency_discount = item.get('agency_discount', 0)
-            net_net_price = net_price * (1 - agency_discount / 100)
-            
-            # Populate only the 16 remaining columns
-            ws.cell(row=current_row, column=1).value = wave.get('start_date', '')  # Pradžia
-            ws.cell(row=current_row, column=2).value = wave.get('end_date', '')  # Pabaiga
-            ws.cell(row=current_row, column=3).value = item['owner']  # Kanalų grupė
-            ws.cell(row=current_row, column=4).value = item['target_group']  # Perkama TG
-            ws.cell(row=current_row, column=5).value = item.get('tvc_name', '-')  # TVC
-            ws.cell(row=current_row, column=6).value = item.get('tvc_duration', item.get('clip_duration', 0))  # Trukmė
-            ws.cell(row=current_row, column=7).value = channel_share / 100  # Kanalo dalis - as decimal
-            ws.cell(row=current_row, column=8).value = pt_zone_share / 100  # PT zonos dalis - as decimal
-            ws.cell(row=current_row, column=9).value = 0.45  # nPT zonos dalis - default value
-            ws.cell(row=current_row, column=10).value = round(grp_planned, 2) if grp_planned > 0 else ""  # GRP plan.
-            ws.cell(row=current_row, column=11).value = gross_cpp  # Gross CPP - as number
-            ws.cell(row=current_row, column=12).value = duration_idx  # Trukmės koeficientas
-            ws.cell(row=current_row, column=13).value = seasonal_idx  # Sezoninis koeficientas
-            ws.cell(row=current_row, column=14).value = gross_price  # Gross kaina - as number
-            ws.cell(row=current_row, column=15).value = client_discount  # Kl. nuol. % - show the actual percentage value
-            ws.cell(row=current_row, column=16).value = net_price  # Net kaina - as number
-            
-            # Apply borders and formatting to all 16 columns
-            for col in range(1, 17):
-                cell = ws.cell(row=current_row, column=col)
-                cell.border = border
-
-                # Add center alignment for Pradžia, Pabaiga, and Kanalų grupė columns with text wrapping
-                if col in [1, 2, 3]:  # Pradžia, Pabaiga, Kanalų grupę
-                    cell.alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
+    table_start_row = 15  # Main table and calendar both start here
+    cal_start_col = 26    # Calendar starts from column Z - closer to the main table
+
+    # Calendar layout: campaign period extended to cover every wave
+    calendar = None
+    if campaign.get('start_date') and campaign.get('end_date'):
+        try:
+            start_date = datetime.strptime(campaign['start_date'], '%Y-%m-%d')
+            end_date = datetime.strptime(campaign['end_date'], '%Y-%m-%d')
+            cal_waves = []
+            for wave_idx, wave in enumerate(waves):
+                if not (wave.get('start_date') and wave.get('end_date')):
+                    continue
+                wave_start = datetime.strptime(wave['start_date'], '%Y-%m-%d')
+                wave_end = datetime.strptime(wave['end_date'], '%Y-%m-%d')
+                start_date = min(start_date, wave_start)
+                end_date = max(end_date, wave_end)
+                cal_waves.append((wave_idx, wave, wave_start, wave_end))
+            days = [start_date + timedelta(days=n) for n in range((end_date - start_date).days + 1)]
+            calendar = (days, cal_waves)
+        except ValueError as e:
+            print(f"Calendar generation error: {e}")  # For debugging
+
+    # Column widths have to be set before the first row is streamed
+    if calendar:
+        label_col = cal_start_col + len(calendar[0]) + 1
+        for col in range(19, min(label_col, 60)):
+            sheet.width(col, 4.5)  # Wider for TRP values
+    widths = [16, 16, 20, 18, 15, 12, 15, 15, 16, 14, 14, 18, 18, 16, 15, 16]  # Pradžia .. Net kaina
+    for col, width in enumerate(widths, 1):
+        sheet.width(col, width)
+
+    # Campaign header and info section
+    sheet.merge(1, 1, 16)
+    sheet.merge(2, 1, 16)
+
+    def header_section():
+        yield 1, {1: ("TV KOMUNIKACIJOS PLANAS", "client.title")}, None
+        yield 2, {1: (f"KAMPANIJA: {campaign['name'].upper()}", "client.subtitle")}, None
+        info_cells = [
+            ("Kampanijos laikotarpis:", f"{campaign.get('start_date', '')} - {campaign.get('end_date', '')}"),
+            ("Klientas:", campaign.get('client', '')),
+            ("Agentūra:", campaign.get('agency', '')),
+            ("Kampanija:", campaign.get('product', '')),
+            ("Kainoraštis:", campaign.get('pricing_list_name', '')),
+            ("Statusas:", campaign.get('status', 'draft').replace('_', ' ').title())
+        ]
+        for n, (label, value) in enumerate(info_cells):
+            yield 5 + n, {1: (label, "client.info_label"), 2: (value, "client.info_value")}, None
+
+    # Style of each of the 16 table columns
+    column_styles = (["client.cell_center"] * 3 + ["client.cell"] * 3 + ["client.cell_pct"] * 3
+                     + ["client.cell_money"] * 2 + ["client.cell_index"] * 2
+                     + ["client.cell_money", "client.cell_discount", "client.cell_money"])
+
+    def plan_table():
+        headers = [
+            'Pradžia', 'Pabaiga', 'Kanalų grupė', 'Perkama TG', 'TVC', 'Trukmė',
+            'Kanalo dalis', 'PT zonos dalis', 'nPT zonos dalis', 'GRP plan.',
+            'Gross CPP', 'Trukmės koeficientas', 'Sezoninis koeficientas',
+            'Gross kaina', 'Kliento nuolaida %', 'Net kaina'
+        ]
+        yield table_start_row, {col: (header, "client.header") for col, header in enumerate(headers, 1)}, 120
+
+        row_idx = table_start_row + 1
+        for wave in waves:
+            # Base gross (TRP * CPP * Duration) without multipliers: the Excel shows
+            # the individual coefficients as separate columns
+            priced = pricing_engine.price_rows(wave['items'], formula="client_report",
+                                               overrides=pricing_engine.REPORT_OVERRIDES)
+
+            for n, item in enumerate(wave['items']):
+                channel_share = item.get('channel_share', 0.75)
+                if channel_share < 1:  # If it's a decimal (0.75), convert to percentage
+                    channel_share = channel_share * 100
+                pt_zone_share = item.get('pt_zone_share', 0.55)
+                if pt_zone_share < 1:  # If it's a decimal (0.55), convert to percentage
+                    pt_zone_share = pt_zone_share * 100
+                grp_planned = priced['grp'][n]
+
+                values = [
+                    wave.get('start_date', ''),                        # Pradžia
+                    wave.get('end_date', ''),                          # Pabaiga
+                    item['owner'],                                     # Kanalų grupė
+                    item['target_group'],                              # Perkama TG
+                    item.get('tvc_name', '-'),                         # TVC
+                    item.get('tvc_duration') or item.get('clip_duration') or pricing_engine.default_for('clip_duration', 'client_report'),  # Trukmė
+                    channel_share / 100,                               # Kanalo dalis - as decimal
+                    pt_zone_share / 100,                               # PT zonos dalis - as decimal
+                    0.45,                                              # nPT zonos dalis - default value
+                    round(grp_planned, 2) if grp_planned > 0 else "",  # GRP plan.
+                    item.get('gross_cpp_eur') or item.get('price_per_sec_eur'),  # Gross CPP
+                    item.get('duration_index', 1.0),                   # Trukmės koeficientas
+                    item.get('seasonal_index', 1.0),                   # Sezoninis koeficientas
+                    priced['gross'][n],                                # Gross kaina
+                    item.get('client_discount') or 0,                  # Kl. nuol. %
+                    priced['net'][n],                                  # Net kaina
+                ]
+                # Row height accommodates wrapped text
+                yield row_idx, {col: (value, column_styles[col - 1]) for col, value in enumerate(values, 1)}, 40
+                row_idx += 1
+
+            if wave['items']:
+                row_idx += 1  # Blank row between waves
+
+    def calendar_section():
+        days, cal_waves = calendar
+        cols = range(cal_start_col, cal_start_col + len(days))
+        weekend = [day.weekday() in [5, 6] for day in days]
+
+        # Month headers, merged over the month's days
+        month_starts = [col for col, day in zip(cols, days) if col == cal_start_col or day.day == 1]
+        for first_col, next_col in zip(month_starts, month_starts[1:] + [cols.stop]):
+            sheet.merge(table_start_row, first_col, next_col - 1)
+        yield table_start_row, {
+            col: (days[col - cal_start_col].strftime('%B %Y'), "client.cal_month") for col in month_starts
+        }, 13
+
+        yield table_start_row + 1, {
+            col: (day.day, "client.cal_day_weekend" if we else "client.cal_day")
+            for col, day, we in zip(cols, days, weekend)
+        }, 13
+
+        weekday_row = {
+            col: (WEEKDAY_NAMES[day.weekday()], "client.cal_weekday_weekend" if we else "client.cal_weekday")
+            for col, day, we in zip(cols, days, weekend)
+        }
+        weekday_row[20] = "Savaitės dienos"
+        weekday_row[label_col] = (None, "client.cal_note")
+        yield table_start_row + 2, weekday_row, 13
+
+        # Wave rows with individual TRP distribution (TRP value per wave per day)
+        row_idx = table_start_row + 3
+        for wave_idx, wave, wave_start, wave_end in cal_waves:
+            wave_total_trp = sum(item['trps'] for item in wave['items'] if (item.get('trps') or 0) > 0)
+            wave_days = (wave_end - wave_start).days + 1
+            daily_trp = wave_total_trp / wave_days if wave_days > 0 else 0
+            active_value = f"{daily_trp:.2f}" if daily_trp > 0 else ""
+
+            cells = {}
+            for col, day, we in zip(cols, days, weekend):
+                if wave_start <= day <= wave_end:
+                    cells[col] = (active_value, "client.cal_active_weekend" if we else "client.cal_active")
                 else:
-                    # All other columns get text wrapping with left alignment
-                    cell.alignment = Alignment(horizontal='left', vertical='center', wrap_text=True)
-
-                # Format numbers based on new 16-column structure
-                if col in [7, 8, 9]:  # Percentage columns: Kanalo dalis, PT zonos dalis, nPT zonos dalis
-                    cell.number_format = '0.00%'
-                elif col in [12, 13]:  # Index columns: Trukmės koeficientas, Sezoninis koeficientas
-                    cell.number_format = '0.00'
-                elif col in [10, 11, 14, 16]:  # Number/Currency columns: GRP plan., Gross CPP, Gross kaina, Net kaina
-                    cell.number_format = '#,##0.00'
-                elif col == 15:  # Discount percentage column: Kl. nuol. %
-                    cell.number_format = '0.0"%"'
-
-            # Set row height to accommodate wrapped text
-            ws.row_dimensions[current_row].height = 40
-
-            current_row += 1
-            row_count += 1
-        
-        # Wave summary with client discount
-        if wave['items']:
-            costs = wave['costs']
-            client_cost = costs['client_cost']
-            total_cost += client_cost
+                    cells[col] = ("", "client.cal_idle_weekend" if we else "client.cal_idle")
+
+            # Wave label with TRP total, channel group from the first item
+            channel_group = wave['items'][0]['owner'] if wave['items'] and wave['items'][0].get('owner') else f"Banga {wave_idx + 1}"
+            cells[label_col] = (f"{channel_group} (TRP: {wave_total_trp:.2f})", "client.cal_label")
+            yield row_idx, cells, 13
+            row_idx += 1
+
+        # Calendar rows keep a standard readable height
+        for spare_row in range(row_idx, row_idx + 3):
+            yield spare_row, {}, 13
+
+    sections = [header_section(), plan_table()]
+    if calendar:
+        sections.append(calendar_section())
+    sheet.rows(*sections)
 
-            current_row += 1
-    
-    
-    # Add Enhanced TRP Calendar at the same level as main table (to the right)
-    if trp_data or (campaign.get('start_date') and campaign.get('end_date')):
-        # Calendar will be positioned at the same level as main table (row 15+)
-        cal_start_row = 15  # Same as main table start
-        
-        import json
-        from datetime import datetime, timedelta
-        if isinstance(trp_data, str):
-            trp_data = json.loads(trp_data)
-        
-        # Get date range from campaign or extend to include all waves
-        start_date_str = campaign.get('start_date', '')
-        end_date_str = campaign.get('end_date', '')
-        
-        if start_date_str and end_date_str:
-            try:
-                start_date = datetime.strptime(start_date_str, '%Y-%m-%d')
-                end_date = datetime.strptime(end_date_str, '%Y-%m-%d')
-                
-                # Check if any waves extend beyond campaign dates
-                for wave in waves:
-                    if wave.get('start_date'):
-                        wave_start = datetime.strptime(wave['start_date'], '%Y-%m-%d')
-                        if wave_start < start_date:
-                            start_date = wave_start
-                    if wave.get('end_date'):
-                        wave_end = datetime.strptime(wave['end_date'], '%Y-%m-%d')
-                        if wave_end > end_date:
-                            end_date = wave_end
-                
-                # Show all active days - no date limiting, just make columns narrower
-                calendar_limited = False  # We're not limiting dates anymore
-                
-                # Create horizontal calendar like in the UI - start from column Z (26) closer to main table
-                
-                
-                # Month headers row
-                current_date = start_date
-                col_idx = 26  # Start calendar from column Z - closer to the main table
-                months = []
-                month_spans = {}
-                
-                # Calculate month spans
-                while current_date <= end_date:
-                    month_key = current_date.strftime('%Y-%m')
-                    month_name = current_date.strftime('%B %Y')
-                    if month_key not in month_spans:
-                        month_spans[month_key] = {'name': month_name, 'start_col': col_idx, 'days': 0}
-                        months.append(month_key)
-                    month_spans[month_key]['days'] += 1
-                    current_date += timedelta(days=1)
-                    col_idx += 1
-                
-                # Render month headers
-                for month_key in months:
-                    month_info = month_spans[month_key]
-                    start_col = month_info['start_col']
-                    end_col = start_col + month_info['days'] - 1
-                    
-                    # Set value first, then merge
-                    ws.cell(row=cal_start_row, column=start_col).value = month_info['name']
-                    
-                    # Style the main cell before merging
-                    cell = ws.cell(row=cal_start_row, column=start_col)
-                    cell.font = Font(bold=True, size=10, color="1F4E79")  # Readable font
-                    cell.fill = PatternFill(start_color="E8F4F8", end_color="E8F4F8", fill_type="solid")
-                    cell.alignment = Alignment(horizontal='center')
-                    cell.border = border
-                    
-                    # Merge after setting value and style (if needed)
-                    if start_col != end_col:
-                        ws.merge_cells(f'{openpyxl.utils.get_column_letter(start_col)}{cal_start_row}:{openpyxl.utils.get_column_letter(end_col)}{cal_start_row}')
-                
-                # Day numbers row
-                current_date = start_date
-                col_idx = 26  # Start from column Z
-                while current_date <= end_date:
-                    day_cell = ws.cell(row=cal_start_row + 1, column=col_idx)
-                    day_cell.value = current_date.day
-                    day_cell.font = Font(bold=True, size=10)  # Readable day numbers
-                    day_cell.alignment = Alignment(horizontal='center')
-                    
-                    # Weekend styling
-                    if current_date.weekday() in [5, 6]:  # Saturday, Sunday
-                        day_cell.fill = PatternFill(start_color="F5F5F5", end_color="F5F5F5", fill_type="solid")
-                    else:
-                        day_cell.fill = PatternFill(start_color="FFFFFF", end_color="FFFFFF", fill_type="solid")
-                    day_cell.border = border
-                    
-                    current_date += timedelta(days=1)
-                    col_idx += 1
-                
-                # Week days row
-                current_date = start_date
-                col_idx = 26  # Start from column Z
-                weekday_names = ['Pr', 'An', 'Tr', 'Kt', 'Pn', 'Št', 'Sk']
-                while current_date <= end_date:
-                    weekday_cell = ws.cell(row=cal_start_row + 2, column=col_idx)
-                    weekday_cell.value = weekday_names[current_date.weekday()]
-                    weekday_cell.font = Font(size=9)  # Readable weekday names
-                    weekday_cell.alignment = Alignment(horizontal='center')
-                    
-                    # Weekend styling
-                    if current_date.weekday() in [5, 6]:  # Saturday, Sunday
-                        weekday_cell.fill = PatternFill(start_color="F5F5F5", end_color="F5F5F5", fill_type="solid")
-                        weekday_cell.font = Font(size=9, color="999999")  # Readable weekend font
-                    else:
-                        weekday_cell.fill = PatternFill(start_color="FFFFFF", end_color="FFFFFF", fill_type="solid")
-                    weekday_cell.border = border
-                    
-                    current_date += timedelta(days=1)
-                    col_idx += 1
-                
-                # Wave rows with individual TRP distribution (showing TRP values per wave per day)
-                row_idx = cal_start_row + 3
-                valid_wave_count = 0
-                for wave_idx, wave in enumerate(waves):
-                    if wave.get('start_date') and wave.get('end_date'):
-                        try:
-                            wave_start = datetime.strptime(wave['start_date'], '%Y-%m-%d')
-                            wave_end = datetime.strptime(wave['end_date'], '%Y-%m-%d')
-                            
-                            # Calculate total TRP for this wave
-                            wave_total_trp = sum(item['trps'] for item in wave['items'] if item.get('trps', 0) > 0)
-                            wave_days = (wave_end - wave_start).days + 1
-                            daily_trp = wave_total_trp / wave_days if wave_days > 0 else 0
-
-                            current_date = start_date
-                            col_idx = 26  # Start from column Z
-                            
-                            while current_date <= end_date:
-                                wave_cell = ws.cell(row=row_idx, column=col_idx)
-                                
-                                if wave_start <= current_date <= wave_end:
-                                    # Show TRP value for active days
-                                    wave_cell.value = f"{daily_trp:.2f}" if daily_trp > 0 else ""
-                                    wave_cell.font = Font(size=9, bold=True, color="FFFFFF")
-                                    if current_date.weekday() in [5, 6]:  # Weekend
-                                        wave_cell.fill = PatternFill(start_color="81C784", end_color="81C784", fill_type="solid")  # Light green
-                                    else:
-                                        wave_cell.fill = PatternFill(start_color="66BB6A", end_color="66BB6A", fill_type="solid")  # Green
-                                    wave_cell.alignment = Alignment(horizontal='center')
-                                else:
-                                    wave_cell.value = ""
-                                    if current_date.weekday() in [5, 6]:  # Weekend
-                                        wave_cell.fill = PatternFill(start_color="F9F9F9", end_color="F9F9F9", fill_type="solid")
-                                    else:
-                                        wave_cell.fill = PatternFill(start_color="FFFFFF", end_color="FFFFFF", fill_type="solid")
-                                
-                                wave_cell.border = border
-                                current_date += timedelta(days=1)
-                                col_idx += 1
-                            
-                            row_idx += 1
-                            valid_wave_count += 1
-                        except ValueError as e:
-                            # Skip waves with invalid dates
-                            continue
-                
-                # Skip the combined TRP row - we now show individual TRP per wave
-                trp_row = row_idx  # row_idx will be at the end of all wave rows
-                
-                # Column labels for the calendar
-                ws.cell(row=cal_start_row + 2, column=20).value = "Savaitės dienos"
-                ws.cell(row=cal_start_row + 2, column=col_idx + 1).font = Font(size=8, italic=True)
-                
-                # Wave labels with TRP totals
-                label_row = cal_start_row + 3
-                for wave_idx, wave in enumerate(waves):
-                    if wave.get('start_date') and wave.get('end_date'):
-                        try:
-                            datetime.strptime(wave['start_date'], '%Y-%m-%d')
-                            datetime.strptime(wave['end_date'], '%Y-%m-%d')
-                            wave_total_trp = sum(item['trps'] for item in wave['items'] if item.get('trps', 0) > 0)
-                            # Get channel group from first item in wave
-                            channel_group = wave['items'][0]['owner'] if wave['items'] and wave['items'][0].get('owner') else f"Banga {wave_idx + 1}"
-                            label = f"{channel_group} (TRP: {wave_total_trp:.2f})"
-                            ws.cell(row=label_row, column=col_idx + 1).value = label
-                            ws.cell(row=label_row, column=col_idx + 1).font = Font(size=9, color="1F4E79", bold=True)
-                            label_row += 1
-                        except ValueError:
-                            continue
-                
-                # Total TRP summary calculated from all waves
-                
-                # Set row heights for calendar section to standard readable height
-                for row in range(cal_start_row, trp_row + 3):  # All calendar rows
-                    try:
-                        ws.row_dimensions[row].height = 13  # Standard readable height
-                    except:
-                        pass  # Skip if row setting fails
-                
-                # Make calendar columns wider to show TRP values properly
-                calendar_start_col = 19  # S column - closer to the main table
-                calendar_end_col = min(col_idx + 1, 60)  # Limit to reasonable range
-                for col in range(calendar_start_col, calendar_end_col):
-                    try:
-                        ws.column_dimensions[openpyxl.utils.get_column_letter(col)].width = 4.5  # Wider for TRP values
-                    except:
-                        pass
-                
-            except Exception as e:
-                # Fallback to simple table if date parsing fails
-                print(f"Calendar generation error: {e}")  # For debugging
-                try:
-                    ws.cell(row=cal_start_row, column=1).value = "Data"
-                    ws.cell(row=cal_start_row, column=2).value = "TRP"
-                    for col in [1, 2]:
-                        cell = ws.cell(row=cal_start_row, column=col)
-                        cell.font = header_font
-                        cell.fill = header_fill
-                        cell.border = border
-                    cal_start_row += 1
-                    
-                    if trp_data:
-                        for date_str, trp_value in sorted(trp_data.items()):
-                            try:
-                                ws.cell(row=cal_start_row, column=1).value = date_str
-                                ws.cell(row=cal_start_row, column=2).value = float(trp_value)
-                                # Add borders for consistency
-                                for col in [1, 2]:
-                                    ws.cell(row=cal_start_row, column=col).border = border
-                                cal_start_row += 1
-                            except:
-                                continue  # Skip problematic entries
-                except Exception as fallback_error:
-                    print(f"Fallback table creation failed: {fallback_error}")
-                    # If even fallback fails, just add a simple message
-                    try:
-                        ws.cell(row=cal_start_row, column=1).value = "TRP data available - see campaign details"
-                    except:
-                        pass  # Give up gracefully
-    
-    
-    # Set wider column widths for the 16 remaining columns to properly fit content
-    ws.column_dimensions['A'].width = 16   # Pradžia
-    ws.column_dimensions['B'].width = 16   # Pabaiga
-    ws.column_dimensions['C'].width = 20   # Kanalų grupę
-    ws.column_dimensions['D'].width = 18   # Perkama TG
-    ws.column_dimensions['E'].width = 15   # TVC
-    ws.column_dimensions['F'].width = 12   # Trukmé
-    ws.column_dimensions['G'].width = 15   # Kanalo dalis
-    ws.column_dimensions['H'].width = 15   # PT zonos dalis
-    ws.column_dimensions['I'].width = 16   # nPT zonos dalis
-    ws.column_dimensions['J'].width = 14   # GRP plan.
-    ws.column_dimensions['K'].width = 14   # Gross CPP
-    ws.column_dimensions['L'].width = 18   # Trukmés koeficientas
-    ws.column_dimensions['M'].width = 18   # Sezoninis koeficientas
-    ws.column_dimensions['N'].width = 16   # Gross kaina
-    ws.column_dimensions['O'].width = 15   # Kliento nuolaida %
-    ws.column_dimensions['P'].width = 16   # Net kaina
-    
     # Save to BytesIO
     print(f"DEBUG: Saving workbook to BytesIO", file=sys.stderr, flush=True)
     output = BytesIO()
@@ -1670,120 +1622,175 @@ def generate_client_excel_report(campaign_id: int):
     print(f"DEBUG: Excel generation complete, returning buffer", file=sys.stderr, flush=True)
     return output
 
-def generate_agency_csv_order(campaign_id: int):
-    """Generate CSV order file for agency (with both client and agency discounts)"""
-    data = get_campaign_report_data(campaign_id)
-    if not data:
-        return None
-    
+AGENCY_ORDER_HEADERS = [
+    'Banga', 'Laikotarpis', 'TVC', 'Trukmė', 'Savininkas', 'Tikslinė grupė', 'Kanalas',
+    'TRP', 'CPP €', 'TG dydis', 'Bazinė kaina €/sek', 'Kliento kaina €/sek', 'Agentūros kaina €/sek',
+    'Kliento nuolaida %', 'Agentūros nuolaida %', 'Galutinė suma €'
+]
+
+def _agency_order_line(wave_name, wave_period, item, client_discount_percent, agency_discount_percent):
+    """One order line and its agency cost (client, then agency discount on the base price)"""
+    base_price = item['price_per_sec_eur']
+    trps = item['trps']
+
+    client_price_per_sec = base_price * (1 - client_discount_percent / 100)
+    agency_price_per_sec = client_price_per_sec * (1 - agency_discount_percent / 100)
+    final_cost = agency_price_per_sec * trps
+
+    return [
+        wave_name,
+        wave_period,
+        item.get('tvc_name', '-'),
+        f"{item.get('tvc_duration', item.get('clip_duration', 0))}s",
+        item['owner'],
+        item['target_group'],
+        f"{item['primary_label']}{' + ' + item['secondary_label'] if item['secondary_label'] else ''}",
+        trps,
+        round(item.get('price_per_sec_no_discount', base_price), 2),
+        f"{item.get('tg_size_thousands', 0)}k",
+        round(base_price, 4),
+        round(client_price_per_sec, 4),
+        round(agency_price_per_sec, 4),
+        client_discount_percent,
+        agency_discount_percent,
+        round(final_cost, 2)
+    ], final_cost
+
+def _agency_order_rows(data: dict, trp_data: dict):
+    """Rows of a campaign's agency order, produced one at a time"""
     campaign = data['campaign']
-    waves = data['waves']
-    
-    # Load TRP calendar data
-    trp_data = load_trp_distribution(campaign_id)
-    
-    csv_content = []
-    csv_content.append(['# TV UŽSAKYMAS'])
-    csv_content.append(['Kampanija', campaign['name']])
-    csv_content.append(['Laikotarpis', f"{campaign.get('start_date', '')} - {campaign.get('end_date', '')}"])
-    csv_content.append(['Kainoraštis', campaign.get('pricing_list_name', '')])
-    csv_content.append(['Statusas', campaign.get('status', 'draft')])
-    csv_content.append([])  # Empty row
-    
-    # Headers
-    csv_content.append([
-        'Banga', 'Laikotarpis', 'TVC', 'Trukmė', 'Savininkas', 'Tikslinė grupė', 'Kanalas', 
-        'TRP', 'CPP €', 'TG dydis', 'Bazinė kaina €/sek', 'Kliento kaina €/sek', 'Agentūros kaina €/sek', 
-        'Kliento nuolaida %', 'Agentūros nuolaida %', 'Galutinė suma €'
-    ])
-    
+
+    yield ['# TV UŽSAKYMAS']
+    yield ['Kampanija', campaign['name']]
+    yield ['Laikotarpis', f"{campaign.get('start_date', '')} - {campaign.get('end_date', '')}"]
+    yield ['Kainoraštis', campaign.get('pricing_list_name', '')]
+    yield ['Statusas', campaign.get('status', 'draft')]
+    yield []  # Empty row
+    yield AGENCY_ORDER_HEADERS
+
     total_agency_cost = 0
-    
-    for wave in waves:
+    for wave in data['waves']:
         costs = wave['costs']
-        
+        wave_name = wave['name'] or f"Banga {wave['id']}"
+        wave_period = f"{wave.get('start_date', '')} - {wave.get('end_date', '')}"
         for item in wave['items']:
-            base_price = item['price_per_sec_eur']
-            trps = item['trps']
-            
-            # Calculate discounted prices per second
-            client_discount_percent = costs['client_discount_percent']
-            agency_discount_percent = costs['agency_discount_percent']
-            
-            client_price_per_sec = base_price * (1 - client_discount_percent / 100)
-            agency_price_per_sec = client_price_per_sec * (1 - agency_discount_percent / 100)
-            
-            final_cost = agency_price_per_sec * trps
+            row, final_cost = _agency_order_line(wave_name, wave_period, item,
+                                                 costs['client_discount_percent'],
+                                                 costs['agency_discount_percent'])
             total_agency_cost += final_cost
-            
-            csv_content.append([
-                wave['name'] or f"Banga {wave['id']}",
-                f"{wave.get('start_date', '')} - {wave.get('end_date', '')}",
-                item.get('tvc_name', '-'),
-                f"{item.get('tvc_duration', item.get('clip_duration', 0))}s",
-                item['owner'],
-                item['target_group'],
-                f"{item['primary_label']}{' + ' + item['secondary_label'] if item['secondary_label'] else ''}",
-                trps,
-                round(item.get('price_per_sec_no_discount', base_price), 2),
-                f"{item.get('tg_size_thousands', 0)}k",
-                round(base_price, 4),
-                round(client_price_per_sec, 4),
-                round(agency_price_per_sec, 4),
-                client_discount_percent,
-                agency_discount_percent,
-                round(final_cost, 2)
-            ])
-    
+            yield row
+
     # Total
-    csv_content.append([])
-    csv_content.append(['BENDRA AGENTŪROS SUMA €', '', '', '', '', '', '', '', '', '', '', '', '', '', '', round(total_agency_cost, 2)])
-    
+    yield []
+    yield ['BENDRA AGENTŪROS SUMA €', '', '', '', '', '', '', '', '', '', '', '', '', '', '', round(total_agency_cost, 2)]
+
     # Add TRP Calendar if exists
     if trp_data:
-        csv_content.append([])
-        csv_content.append(['# TRP KALENDORIUS'])
-        csv_content.append(['Data', 'TRP'])
-        
-        import json
-        if isinstance(trp_data, str):
-            trp_data = json.loads(trp_data)
-            
+        yield []
+        yield ['# TRP KALENDORIUS']
+        yield ['Data', 'TRP']
         for date_str, trp_value in sorted(trp_data.items()):
-            csv_content.append([date_str, float(trp_value)])
-    
-    # Write CSV
-    import csv as csv_module
-    from io import StringIO
-    
-    # First write to string
-    string_buffer = StringIO()
-    writer = csv_module.writer(string_buffer, delimiter=';', lineterminator='\n')
-    
-    for row in csv_content:
-        writer.writerow(row)
-    
-    # Convert to bytes with UTF-8 BOM
-    csv_string = string_buffer.getvalue()
-    output = BytesIO()
-    output.write('\ufeff'.encode('utf-8'))  # BOM
-    output.write(csv_string.encode('utf-8'))
-    output.seek(0)
-    
-    return output
+            yield [date_str, float(trp_value)]
 
-# ---------- INDICES MANAGEMENT ----------
+def agency_csv_order_chunks(campaign_id: int, data: dict | None = None):
+    """Agency order of a campaign as encoded CSV chunks (BOM first), or None
 
-def migrate_add_indices_tables():
-    """Create tables for duration and seasonal indices management - LEGACY FUNCTION
-    
-    This function is now deprecated. Indices have been migrated to use channel_group_id
-    instead of target_group. The new structure is already created by the migration script.
+    The campaign is loaded up front so a missing campaign is known before a
+    response starts; the CSV itself is written row by row as it is consumed.
+    """
+    from .csv_export import csv_chunks
+
+    if data is None:
+        data = get_campaign_report_data(campaign_id)
+    if not data:
+        return None
+    return csv_chunks(_agency_order_rows(data, load_trp_distribution(campaign_id)))
+
+def generate_agency_csv_order(campaign_id: int, data: dict | None = None):
+    """Generate CSV order file for agency (with both client and agency discounts)"""
+    chunks = agency_csv_order_chunks(campaign_id, data)
+    if chunks is None:
+        return None
+    return BytesIO(b"".join(chunks))
+
+def agency_order_files(channel_group_id: int | None = None, owner: str | None = None,
+                       date_from: str | None = None, date_to: str | None = None,
+                       status: str | None = None):
+    """Agency orders across campaigns, one CSV per sales house (wave item owner)
+
+    Returns (owner, encoded CSV chunks) pairs from a single ordered query
+    that is read from the cursor in chunks of EXPORT_CHUNK_SIZE; each pair
+    must be consumed before the next. Filters: channel group, owner name,
+    waves overlapping ``date_from``..``date_to``, campaign status.
     """
-    # This function is now a no-op since the migration has already been run
-    # and the new channel_group-based structure is in place
-    print("migrate_add_indices_tables: Indices tables already migrated to channel group structure")
-    pass
+    from itertools import groupby
+    from .csv_export import csv_chunks
+
+    filters, params = _channel_group_export_filters(date_from, date_to, status)
+    if channel_group_id is not None:
+        if not get_channel_group_by_id(channel_group_id):
+            raise ValueError(f"Channel group {channel_group_id} not found")
+        filters += " AND wi.owner = (SELECT name FROM channel_groups WHERE id = ?)"
+        params.append(channel_group_id)
+    if owner:
+        filters += " AND wi.owner = ?"
+        params.append(owner)
+    if not filters:
+        raise ValueError("Choose a channel group, owner or period to export")
+
+    headers = ['Kampanija', *AGENCY_ORDER_HEADERS]
+    period = f"{date_from or ''} - {date_to or ''}"
+
+    def items():
+        with get_db() as db:
+            cursor = db.execute(f"""
+                SELECT wi.*, t.name as tvc_name, t.duration as tvc_duration,
+                       w.name as wave_name, w.start_date as wave_start, w.end_date as wave_end,
+                       c.name as campaign_name,
+                       COALESCE((SELECT MAX(discount_percentage) FROM discounts
+                                 WHERE wave_id = w.id AND discount_type = 'client'), 0) AS client_discount_percent,
+                       COALESCE((SELECT MAX(discount_percentage) FROM discounts
+                                 WHERE wave_id = w.id AND discount_type = 'agency'), 0) AS agency_discount_percent
+                FROM wave_items wi
+                JOIN waves w ON wi.wave_id = w.id
+                JOIN campaigns c ON w.campaign_id = c.id
+                LEFT JOIN tvcs t ON wi.tvc_id = t.id
+                WHERE 1 = 1 {filters}
+                ORDER BY wi.owner, c.name, c.id, w.start_date, w.name, w.id, wi.target_group, wi.id
+            """, params)
+            while True:
+                chunk = cursor.fetchmany(EXPORT_CHUNK_SIZE)
+                if not chunk:
+                    break
+                for row in chunk:
+                    yield dict(row)
+
+    def order_rows(owner_name, owner_items):
+        yield ['# TV UŽSAKYMAS']
+        yield ['Kanalų grupė', owner_name]
+        if date_from or date_to:
+            yield ['Laikotarpis', period]
+        if status:
+            yield ['Statusas', status]
+        yield []  # Empty row
+        yield headers
+
+        total_agency_cost = 0
+        for item in owner_items:
+            row, final_cost = _agency_order_line(
+                item['wave_name'] or f"Banga {item['wave_id']}",
+                f"{item['wave_start'] or ''} - {item['wave_end'] or ''}",
+                item, item['client_discount_percent'], item['agency_discount_percent'])
+            total_agency_cost += final_cost
+            yield [item['campaign_name'], *row]
+
+        yield []
+        yield ['BENDRA AGENTŪROS SUMA €', *[''] * (len(headers) - 2), round(total_agency_cost, 2)]
+
+    return ((owner_name, csv_chunks(order_rows(owner_name, owner_items)))
+            for owner_name, owner_items in groupby(items(), key=lambda item: item['owner']))
+
+# ---------- INDICES MANAGEMENT ----------
 
 def list_duration_indices():
     """Get all duration indices grouped by channel group"""
@@ -1817,72 +1824,15 @@ def list_position_indices():
 
 def get_duration_index(channel_group, duration_seconds):
     """Get duration index for specific channel group and duration"""
-    with get_db() as db:
-        # First try to find by channel_group_id
-        if isinstance(channel_group, int):
-            channel_group_id = channel_group
-        else:
-            # Look up channel group ID by name
-            cg_row = db.execute(
-                "SELECT id FROM channel_groups WHERE name = ?", 
-                (channel_group,)
-            ).fetchone()
-            channel_group_id = cg_row["id"] if cg_row else None
-            
-        if channel_group_id:
-            row = db.execute(
-                "SELECT index_value FROM duration_indices WHERE channel_group_id = ? AND duration_seconds = ?",
-                (channel_group_id, duration_seconds)
-            ).fetchone()
-            return float(row["index_value"]) if row else 1.0
-        
-        return 1.0  # Default if no channel group found
+    return refdata.lookup("duration", channel_group, duration_seconds)
 
 def get_seasonal_index(channel_group, month):
     """Get seasonal index for specific channel group and month (1-12)"""
-    with get_db() as db:
-        # First try to find by channel_group_id
-        if isinstance(channel_group, int):
-            channel_group_id = channel_group
-        else:
-            # Look up channel group ID by name
-            cg_row = db.execute(
-                "SELECT id FROM channel_groups WHERE name = ?", 
-                (channel_group,)
-            ).fetchone()
-            channel_group_id = cg_row["id"] if cg_row else None
-            
-        if channel_group_id:
-            row = db.execute(
-                "SELECT index_value FROM seasonal_indices WHERE channel_group_id = ? AND month = ?",
-                (channel_group_id, month)
-            ).fetchone()
-            return float(row["index_value"]) if row else 1.0
-        
-        return 1.0  # Default if no channel group found
+    return refdata.lookup("seasonal", channel_group, month)
 
 def get_position_index(channel_group, position_type):
     """Get position index for specific channel group and position type"""
-    with get_db() as db:
-        # First try to find by channel_group_id
-        if isinstance(channel_group, int):
-            channel_group_id = channel_group
-        else:
-            # Look up channel group ID by name
-            cg_row = db.execute(
-                "SELECT id FROM channel_groups WHERE name = ?", 
-                (channel_group,)
-            ).fetchone()
-            channel_group_id = cg_row["id"] if cg_row else None
-            
-        if channel_group_id:
-            row = db.execute(
-                "SELECT index_value FROM position_indices WHERE channel_group_id = ? AND position_type = ?",
-                (channel_group_id, position_type)
-            ).fetchone()
-            return float(row["index_value"]) if row else 1.0
-        
-        return 1.0  # Default if no channel group found
+    return refdata.lookup("position", channel_group, position_type)
 
 def update_duration_index(channel_group, duration_seconds, index_value, description=None):
     """Update or create duration index"""
@@ -1903,6 +1853,7 @@ def update_duration_index(channel_group, duration_seconds, index_value, descript
                 VALUES (?, ?, ?, ?)
             """, (channel_group_id, duration_seconds, index_value, description))
             db.commit()
+            refdata.invalidate()
 
 def update_seasonal_index(channel_group, month, index_value, description=None):
     """Update seasonal index for specific channel group and month"""
@@ -1923,6 +1874,7 @@ def update_seasonal_index(channel_group, month, index_value, description=None):
                 VALUES (?, ?, ?, ?)
             """, (channel_group_id, month, index_value, description))
             db.commit()
+            refdata.invalidate()
 
 def delete_duration_index(channel_group, duration_seconds):
     """Delete duration index"""
@@ -1941,6 +1893,7 @@ def delete_duration_index(channel_group, duration_seconds):
             db.execute("DELETE FROM duration_indices WHERE channel_group_id = ? AND duration_seconds = ?", 
                        (channel_group_id, duration_seconds))
             db.commit()
+            refdata.invalidate()
 
 def get_target_groups_list():
     """Get all available target groups from TRP rates (indices are now by channel group)"""
@@ -2035,84 +1988,63 @@ def calculate_average_seasonal_index(channel_group, start_date, end_date):
     
     return average_index
 
-def migrate_remove_pricing_list_requirement():
-    """Remove pricing_list_id requirement from campaigns table"""
-    with get_db() as db:
-        # Check if pricing_list_id column exists and is NOT NULL
-        cursor = db.execute("PRAGMA table_info(campaigns)")
-        columns = {row[1]: row for row in cursor.fetchall()}
-        
-        if 'pricing_list_id' in columns:
-            col_info = columns['pricing_list_id']
-            is_not_null = col_info[3] == 1  # notnull flag
-            
-            if is_not_null:
-                print("Removing NOT NULL constraint from campaigns.pricing_list_id...")
-                
-                # SQLite doesn't support ALTER COLUMN, so we need to recreate the table
-                # First, get all existing data
-                existing_campaigns = db.execute("SELECT * FROM campaigns").fetchall()
-                
-                # Drop the old table (after backing up foreign key constraints)
-                db.execute("PRAGMA foreign_keys=OFF")
-                db.execute("DROP TABLE campaigns")
-                
-                # Recreate campaigns table without NOT NULL on pricing_list_id
-                db.execute("""
-                CREATE TABLE campaigns (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL,
-                    pricing_list_id INTEGER,  -- Removed NOT NULL
-                    start_date TEXT,
-                    end_date TEXT,
-                    agency TEXT,
-                    client TEXT, 
-                    product TEXT,
-                    country TEXT,
-                    status TEXT
-                )
-                """)
-                
-                # Restore data, setting pricing_list_id to NULL where needed
-                for row in existing_campaigns:
-                    values = list(row)
-                    # If pricing_list_id references non-existent pricing list, set to NULL
-                    if len(values) > 2 and values[2]:  # pricing_list_id
-                        try:
-                            check = db.execute("SELECT 1 FROM pricing_lists WHERE id = ?", (values[2],)).fetchone()
-                            if not check:
-                                values[2] = None
-                        except:
-                            values[2] = None
-                    
-                    # Handle cases where row might not have all columns
-                    while len(values) < 11:  # Pad with None for missing columns
-                        values.append(None)
-                    
-                    db.execute("""
-                    INSERT INTO campaigns (id, name, pricing_list_id, start_date, end_date, 
-                                         agency, client, product, country, status)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """, values[:10])
-                
-                db.execute("PRAGMA foreign_keys=ON")
-                db.commit()
-                print("Successfully removed NOT NULL constraint from pricing_list_id")
-            else:
-                print("pricing_list_id already allows NULL values")
-        else:
-            print("pricing_list_id column does not exist")
-
-        db.commit()
-
-
-def export_channel_group_excel(group_id: int):
-    """Export Excel file for all campaigns using this channel group"""
+# Rows of the channel-group report; {filters} narrows the scan (see _channel_group_export_filters)
+_CHANNEL_GROUP_EXPORT_FROM = """
+    FROM wave_items wi
+    JOIN waves w ON wi.wave_id = w.id
+    JOIN campaigns c ON w.campaign_id = c.id
+    JOIN channel_groups cg ON cg.id = ?
+    LEFT JOIN tvcs t ON wi.tvc_id = t.id
+    WHERE wi.owner = cg.name {filters}
+"""
+
+# Columns C..R are widened to their content; the longest value of each comes from SQL
+_CHANNEL_GROUP_CONTENT_COLUMNS = {
+    3: "cg.name", 4: "c.name", 5: "wi.target_group", 6: "t.name", 7: "wi.clip_duration",
+    8: "wi.tg_size_thousands", 9: "wi.tg_share_percent / 100.0", 10: "wi.tg_sample_size",
+    11: "wi.channel_share", 12: "wi.pt_zone_share", 13: "wi.npt_zone_share", 15: "wi.trps",
+    16: "wi.affinity1", 17: "wi.gross_cpp_eur", 18: "wi.duration_index",
+}
+
+EXPORT_CHUNK_SIZE = 500
+
+def _channel_group_export_filters(date_from=None, date_to=None, status=None):
+    """SQL conditions and parameters for the channel-group export filters
+
+    ``date_from``/``date_to`` keep waves overlapping the period, ``status``
+    keeps campaigns with that status.
+    """
     from datetime import datetime
+
+    conditions, params = [], []
+    for value, condition in ((date_from, "w.end_date >= ?"), (date_to, "w.start_date <= ?")):
+        if value:
+            try:
+                datetime.strptime(value, '%Y-%m-%d')
+            except ValueError:
+                raise ValueError(f"Invalid date: {value} (expected YYYY-MM-DD)")
+            conditions.append(condition)
+            params.append(value)
+    if status:
+        conditions.append("c.status = ?")
+        params.append(status)
+    return "".join(f" AND {c}" for c in conditions), params
+
+def export_channel_group_excel(group_id: int, date_from: str | None = None,
+                               date_to: str | None = None, status: str | None = None):
+    """Export Excel file for all campaigns using this channel group
+
+    Wave items are read from the cursor in chunks of EXPORT_CHUNK_SIZE and
+    streamed into a write-only sheet, so memory does not grow with the
+    number of items. Layout (date range, column widths, TRP and affinity
+    totals) comes from one aggregate query; price totals are accumulated
+    while the rows are written.
+    """
+    from datetime import datetime, timedelta
     import sys
     from io import BytesIO
     import openpyxl
-    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+    from .excel_export import SheetWriter, WEEKDAY_NAMES, write_only_workbook
 
     print(f"DEBUG: Starting Excel export for group_id={group_id}", file=sys.stderr, flush=True)
 
@@ -2135,484 +2067,212 @@ def export_channel_group_excel(group_id: int):
     group_name = group['name']
     print(f"DEBUG: Found group name={group_name}", file=sys.stderr)
 
-    # Get all wave items that use channels from this group
-    with get_db() as db:
-        # First get the channel group name from the ID
-        query = """
-        SELECT wi.*, w.start_date, w.end_date, w.campaign_id, c.name as campaign_name,
-               cg.name as channel_group_name, t.name as tvc_name
-        FROM wave_items wi
-        JOIN waves w ON wi.wave_id = w.id
-        JOIN campaigns c ON w.campaign_id = c.id
-        JOIN channel_groups cg ON cg.id = ?
-        LEFT JOIN tvcs t ON wi.tvc_id = t.id
-        WHERE wi.owner = cg.name
-        ORDER BY c.name, w.start_date, wi.id
-        """
-        rows = db.execute(query, (group_id,)).fetchall()
-
-    print(f"DEBUG: Found {len(rows)} rows for group_id={group_id}", file=sys.stderr, flush=True)
-
-    # Load TRP distribution data for all campaigns using this channel group
-    campaign_trp_data = {}
-    if rows:
-        campaign_ids = list(set(row['campaign_id'] for row in rows))
-        print(f"DEBUG: Loading TRP data for campaigns: {campaign_ids}", file=sys.stderr, flush=True)
-        for campaign_id in campaign_ids:
-            print(f"DEBUG: Loading TRP data for campaign {campaign_id}", file=sys.stderr, flush=True)
-            campaign_trp_data[campaign_id] = load_trp_distribution(campaign_id)
-            print(f"DEBUG: Loaded TRP data for campaign {campaign_id}: {len(campaign_trp_data[campaign_id])} entries", file=sys.stderr, flush=True)
-
-    if not rows:
-        # Create empty Excel with message
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Kanalų ataskaita"
-        ws['A1'] = f"Kanalų grupės '{group_name}' planai nerasti"
-        ws['A1'].font = Font(size=14, bold=True)
-    else:
-        # Create workbook with data
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Kanalų ataskaita"
-
-        # Styles
-        header_fill = PatternFill(start_color="1F4E79", end_color="1F4E79", fill_type="solid")
-        header_font = Font(color="FFFFFF", bold=True, size=10)
-        border = Border(left=Side(style='thin'), right=Side(style='thin'),
-                       top=Side(style='thin'), bottom=Side(style='thin'))
-
-        current_row = 1
+    filters, filter_params = _channel_group_export_filters(date_from, date_to, status)
+    source = _CHANNEL_GROUP_EXPORT_FROM.format(filters=filters)
+    params = (group_id, *filter_params)
 
-        # Main header
-        ws.merge_cells(f'A{current_row}:V{current_row}')
-        cell = ws[f'A{current_row}']
-        cell.value = f"KANALŲ GRUPĖS '{group_name}' PLANŲ ATASKAITA"
-        cell.font = Font(size=16, bold=True, color="1F4E79")
-        cell.alignment = Alignment(horizontal='center')
-        current_row += 2
+    wb, styles = write_only_workbook()
+    sheet = SheetWriter(wb, "Kanalų ataskaita", styles)
 
-        # Column headers - match the exact plan table columns
-        headers = [
-            'Pradžia', 'Pabaiga', 'Kanalų grupė', 'Kampanija', 'Perkama TG', 'TVC', 'Trukmė', 'TG\ndydis (*000)',
-            'TG\ndalis (%)', 'TG\nimtis', 'Kanalo\ndalis', 'PT zonos\ndalis', 'nPT zonos\ndalis', 'GRP\nplanuojamas', 'TRP\nperkamas',
-            'Affinity1', 'Gross CPP', 'Trukmės\nkoeficientas', 'Sezoninis\nkoeficientas', 'TRP\npirkimo',
-            'Išankstinio\npirkimo', 'WEB', 'Išankstinio\nmokėjimo', 'Lojalumo\nnuolaida',
-            'Gross\nkaina', 'Kliento\nnuolaida %', 'Net kaina', 'Agentūros\nnuolaida %', 'Net net kaina'
+    headers = [
+        'Pradžia', 'Pabaiga', 'Kanalų grupė', 'Kampanija', 'Perkama TG', 'TVC', 'Trukmė', 'TG\ndydis (*000)',
+        'TG\ndalis (%)', 'TG\nimtis', 'Kanalo\ndalis', 'PT zonos\ndalis', 'nPT zonos\ndalis', 'GRP\nplanuojamas', 'TRP\nperkamas',
+        'Affinity1', 'Gross CPP', 'Trukmės\nkoeficientas', 'Sezoninis\nkoeficientas', 'TRP\npirkimo',
+        'Išankstinio\npirkimo', 'WEB', 'Išankstinio\nmokėjimo', 'Lojalumo\nnuolaida',
+        'Gross\nkaina', 'Kliento\nnuolaida %', 'Net kaina', 'Agentūros\nnuolaida %', 'Net net kaina'
+    ]
+    clip_default = pricing_engine.default_for('clip_duration', 'channel_group')
+
+    def row_values(item, gross_price, net_price, net_net_price, grp_planned):
+        """Plan table values of one wave item, using actual database fields"""
+        return [
+            item['start_date'] or '',                                    # Pradžia
+            item['end_date'] or '',                                      # Pabaiga
+            item['channel_group_name'],                                  # Kanalų grupė
+            item['campaign_name'],                                       # Kampanija
+            item['target_group'],                                        # Perkama TG
+            item['tvc_name'] or '',                                      # TVC
+            item['clip_duration'] or clip_default,                     # Trukmė
+            item['tg_size_thousands'] or 0,                            # TG dydis (*000)
+            (item['tg_share_percent'] or 0) / 100,                     # TG dalis (%) - convert to decimal
+            item['tg_sample_size'] or 0,                               # TG imtis
+            item['channel_share'] or 0,                                # Kanalo dalis
+            item['pt_zone_share'] or 0,                                # PT zonos dalis
+            item['npt_zone_share'] or 0,                               # nPT zonos dalis
+            grp_planned,                                                # GRP plan. (calculated)
+            item['trps'] or 0,                                         # TRP perkamas
+            item['affinity1'] or 0,                                    # Affinity1
+            item['gross_cpp_eur'] or 0,                               # Gross CPP
+            item['duration_index'] or 1.0,                            # Trukmės koeficientas
+            item['seasonal_index'] or 1.0,                            # Sezoninis koeficientas
+            item['trp_purchase_index'] or 1.0,                        # TRP pirkimo
+            item['advance_purchase_index'] or 1.0,                    # Išankstinio pirkimo
+            item['web_index'] or 1.0,                                 # WEB
+            item['advance_payment_index'] or 1.0,                     # Išankstinio mokėjimo
+            item['loyalty_discount_index'] or 1.0,                    # Lojalumo nuolaida
+            gross_price,                                               # Gross kaina
+            item['client_discount'] or 0,                             # Kl. nuol. %
+            net_price,                                                 # Net kaina
+            item['agency_discount'] or 0,                             # Ag. nuol. %
+            net_net_price                                              # Net net kaina
         ]
 
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=current_row, column=col)
-            cell.value = header
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.border = border
-            cell.alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
-
-        # Set header row height to accommodate wrapped text
-        ws.row_dimensions[current_row].height = 40
-
-        current_row += 1
-
-        # Store the starting row for data (needed for calendar alignment)
-        data_start_row = current_row
-
-        # Data rows
-        print(f"DEBUG: About to process {len(rows)} rows", file=sys.stderr, flush=True)
-        for item in rows:
-            # Calculate values using actual database fields
-            # gross kaina = klipo trukme * trp perkamas * gross cpp * trukmes indeksas * sezoninis * trp pirkimo * isankstinio * web * isankstinio mokejimo * lojalumo nuolaida
-            clip_duration = item['clip_duration'] or 30
-            trps = item['trps'] or 0
-            gross_cpp = item['gross_cpp_eur'] or 0
-            duration_index = item['duration_index'] or 1.0
-            seasonal_index = item['seasonal_index'] or 1.0
-            trp_purchase_index = item['trp_purchase_index'] or 1.0
-            advance_purchase_index = item['advance_purchase_index'] or 1.0
-            web_index = item['web_index'] or 1.0
-            advance_payment_index = item['advance_payment_index'] or 1.0
-            loyalty_discount_index = item['loyalty_discount_index'] or 1.0
-
-            gross_price = (clip_duration * trps * gross_cpp * duration_index * seasonal_index *
-                          trp_purchase_index * advance_purchase_index * web_index *
-                          advance_payment_index * loyalty_discount_index)
-
-            # Calculate net prices
-            client_discount = item['client_discount'] or 0
-            agency_discount = item['agency_discount'] or 0
-            net_price = gross_price * (1 - client_discount / 100)
-            net_net_price = net_price * (1 - agency_discount / 100)
-
-
-            # Row data using actual database fields
-            grp_planned = (item['trps'] * 100 / item['affinity1']) if item['affinity1'] and item['affinity1'] > 0 else 0
-
-            row_data = [
-                item['start_date'] or '',                                    # Pradžia
-                item['end_date'] or '',                                      # Pabaiga
-                item['channel_group_name'],                                  # Kanalų grupė
-                item['campaign_name'],                                       # Kampanija
-                item['target_group'],                                        # Perkama TG
-                item['tvc_name'] or '',                                      # TVC
-                item['clip_duration'] or 30,                               # Trukmė
-                item['tg_size_thousands'] or 0,                            # TG dydis (*000)
-                (item['tg_share_percent'] or 0) / 100,                     # TG dalis (%) - convert to decimal
-                item['tg_sample_size'] or 0,                               # TG imtis
-                item['channel_share'] or 0,                                # Kanalo dalis
-                item['pt_zone_share'] or 0,                                # PT zonos dalis
-                item['npt_zone_share'] or 0,                               # nPT zonos dalis
-                grp_planned,                                                # GRP plan. (calculated)
-                item['trps'] or 0,                                         # TRP perkamas
-                item['affinity1'] or 0,                                    # Affinity1
-                item['gross_cpp_eur'] or 0,                               # Gross CPP
-                item['duration_index'] or 1.0,                            # Trukmės koeficientas
-                item['seasonal_index'] or 1.0,                            # Sezoninis koeficientas
-                item['trp_purchase_index'] or 1.0,                        # TRP pirkimo
-                item['advance_purchase_index'] or 1.0,                    # Išankstinio pirkimo
-                item['web_index'] or 1.0,                                 # WEB
-                item['advance_payment_index'] or 1.0,                     # Išankstinio mokėjimo
-                item['loyalty_discount_index'] or 1.0,                    # Lojalumo nuolaida
-                gross_price,                                               # Gross kaina
-                item['client_discount'] or 0,                             # Kl. nuol. %
-                net_price,                                                 # Net kaina
-                item['agency_discount'] or 0,                             # Ag. nuol. %
-                net_net_price                                              # Net net kaina
-            ]
-
-            for col, value in enumerate(row_data, 1):
-                cell = ws.cell(row=current_row, column=col)
-                cell.value = value
-                cell.border = border
-
-                # Add center alignment for Pradžia, Pabaiga, and Kanalų grupė columns
-                if col in [1, 2, 3]:  # Pradžia, Pabaiga, Kanalų grupė
-                    cell.alignment = Alignment(horizontal='center', vertical='center')
-
-                # Format numbers (column numbers after removing Pozicijos indeksas)
-                if col in [9, 11, 12, 13]:  # Percentage columns: TG dalis (%), Kanalo dalis, PT zonos dalis, nPT zonos dalis
-                    if value and isinstance(value, (int, float)):
-                        cell.number_format = '0.00%'
-                elif col in [18, 19, 20, 21, 22, 23, 24]:  # Index columns
-                    if value and isinstance(value, (int, float)):
-                        cell.number_format = '0.00'
-                elif col in [14, 15, 17, 25, 27, 29]:  # Currency columns: GRP plan., TRP perkamas, Gross CPP, Gross kaina, Net kaina, Net net kaina
-                    if value and isinstance(value, (int, float)):
-                        cell.number_format = '#,##0.00'
-                elif col in [26, 28]:  # Discount percentage columns: Kl. nuol. %, Ag. nuol. %
-                    if value and isinstance(value, (int, float)):
-                        cell.number_format = '0.0"%"'
-
-            current_row += 1
-
-        # Add totals row after all plan data
-        if rows:
-            # Calculate totals and averages properly
-            total_grp = 0
-            total_trp = sum(item['trps'] or 0 for item in rows)
-            total_gross = 0
-            total_net = 0
-            total_net_net = 0
-
-            # Calculate average affinity (only from non-zero values)
-            affinity_values = [item['affinity1'] for item in rows if item['affinity1'] and item['affinity1'] > 0]
-            avg_affinity = sum(affinity_values) / len(affinity_values) if affinity_values else 0
-
-            for item in rows:
-                # Calculate GRP for this item and add to total
-                if item['affinity1'] and item['affinity1'] > 0:
-                    grp = (item['trps'] or 0) * 100 / item['affinity1']
-                    total_grp += grp
-
-                # Use same price calculation as in rows
-                clip_duration = item['clip_duration'] or 30
-                trps = item['trps'] or 0
-                gross_cpp = item['gross_cpp_eur'] or 0
-                duration_index = item['duration_index'] or 1.0
-                seasonal_index = item['seasonal_index'] or 1.0
-                trp_purchase_index = item['trp_purchase_index'] or 1.0
-                advance_purchase_index = item['advance_purchase_index'] or 1.0
-                web_index = item['web_index'] or 1.0
-                advance_payment_index = item['advance_payment_index'] or 1.0
-                loyalty_discount_index = item['loyalty_discount_index'] or 1.0
-
-                gross_price = (clip_duration * trps * gross_cpp * duration_index * seasonal_index *
-                              trp_purchase_index * advance_purchase_index * web_index *
-                              advance_payment_index * loyalty_discount_index)
-
-                client_discount = item['client_discount'] or 0
-                agency_discount = item['agency_discount'] or 0
-                net_price = gross_price * (1 - client_discount / 100)
-                net_net_price = net_price * (1 - agency_discount / 100)
-
-                total_gross += gross_price
-                total_net += net_price
-                total_net_net += net_net_price
-
-            # Add totals row
-            totals_row_data = [''] * 29  # Create empty row with 29 columns (reduced by 1 after removing position index)
-            totals_row_data[0] = 'VISO:'  # First column shows "VISO:"
-            totals_row_data[13] = total_grp    # GRP plan. (column 14, index 13)
-            totals_row_data[14] = total_trp    # TRP perkamas (column 15, index 14)
-            totals_row_data[15] = avg_affinity # Affinity1 average (column 16, index 15)
-            totals_row_data[24] = total_gross  # Gross kaina (column 25, index 24)
-            totals_row_data[26] = total_net    # Net kaina (column 27, index 26)
-            totals_row_data[28] = total_net_net # Net net kaina (column 29, index 28)
-
-            # Style totals row
-            total_fill = PatternFill(start_color="FFE6CC", end_color="FFE6CC", fill_type="solid")  # Light orange
-            total_font = Font(bold=True, size=10)
-
-            for col, value in enumerate(totals_row_data, 1):
-                cell = ws.cell(row=current_row, column=col)
-                cell.value = value
-                cell.font = total_font
-                cell.fill = total_fill
-                cell.border = border
-
-                # Add center alignment for Pradžia, Pabaiga, and Kanalų grupė columns
-                if col in [1, 2, 3]:  # Pradžia, Pabaiga, Kanalų grupė
-                    cell.alignment = Alignment(horizontal='center', vertical='center')
-
-                # Apply number formatting for totals
-                if col in [14, 15, 17, 26, 28, 30]:  # Currency/number columns
-                    if value and isinstance(value, (int, float)):
-                        cell.number_format = '#,##0.00'
-                elif col == 16:  # Affinity average
-                    if value and isinstance(value, (int, float)):
-                        cell.number_format = '0.00'
-
-            current_row += 1
-
-        # Add calendar section to the right of the main table
-        if rows:
-            try:
-                from datetime import datetime, timedelta
-                import json
-
-                # Find the date range from all wave items
-                start_dates = [datetime.strptime(item['start_date'], '%Y-%m-%d') for item in rows if item['start_date']]
-                end_dates = [datetime.strptime(item['end_date'], '%Y-%m-%d') for item in rows if item['end_date']]
-
-                if start_dates and end_dates:
-                    start_date = min(start_dates)
-                    end_date = max(end_dates)
-
-                    # Calendar positioning - main table now has 30 columns (A-AD), calendar starts further right for better spacing
-                    calendar_start_col = 30  # Calendar data starts at AD (30) - to the right of all plan data
-
-                    # Calendar headers start at row 1 to align with main table
-                    # Month headers at row 1, day numbers at row 2, weekdays at row 3
-                    # Then calendar data starts at data_start_row (matches main data)
-                    month_header_row = 1
-                    calendar_end_col = min(calendar_start_col + (end_date - start_date).days + 5, 60)
-
-                    # Month headers
-                    current_date = start_date
-                    col_idx = calendar_start_col
-                    months = []
-                    month_spans = {}
-
-                    while current_date <= end_date:
-                        month_year = current_date.strftime('%Y-%m')
-                        if month_year not in month_spans:
-                            month_spans[month_year] = {'start': col_idx, 'name': current_date.strftime('%B %Y')}
-                            months.append(month_year)
-                        month_spans[month_year]['end'] = col_idx
-                        current_date += timedelta(days=1)
-                        col_idx += 1
-
-                    # Create month headers at row 1 - show month name only once per month (merged)
-                    for month_year in months:
-                        span = month_spans[month_year]
-                        start_col = span['start']
-                        end_col = span['end']
-
-                        # First set value and styling on all cells
-                        for col in range(start_col, end_col + 1):
-                            cell = ws.cell(row=month_header_row, column=col)
-                            if col == start_col:  # Only set value on first cell
-                                cell.value = span['name']
-                            cell.font = Font(bold=True, size=8, color="FFFFFF")
-                            cell.fill = PatternFill(start_color="1F4E79", end_color="1F4E79", fill_type="solid")
-                            cell.border = border
-                            cell.alignment = Alignment(horizontal='center')
-
-                        # Then merge if spanning multiple columns
-                        if start_col < end_col:
-                            ws.merge_cells(f'{openpyxl.utils.get_column_letter(start_col)}{month_header_row}:{openpyxl.utils.get_column_letter(end_col)}{month_header_row}')
-
-                    # Day headers at row 2
-                    current_date = start_date
-                    col_idx = calendar_start_col
-                    while current_date <= end_date:
-                        day_cell = ws.cell(row=2, column=col_idx)
-                        day_cell.value = current_date.strftime('%d')
-                        day_cell.font = Font(size=9, bold=True)
-                        day_cell.alignment = Alignment(horizontal='center')
-                        day_cell.fill = PatternFill(start_color="F5F5F5", end_color="F5F5F5", fill_type="solid")
-                        day_cell.border = border
-                        current_date += timedelta(days=1)
-                        col_idx += 1
-
-                    # Weekday headers at row 3
-                    current_date = start_date
-                    col_idx = calendar_start_col
-                    while current_date <= end_date:
-                        weekday_cell = ws.cell(row=3, column=col_idx)
-                        weekday_names = ['Pr', 'An', 'Tr', 'Kt', 'Pn', 'Št', 'Sk']
-                        weekday_value = weekday_names[current_date.weekday()]
-                        weekday_cell.value = weekday_value
-                        weekday_cell.font = Font(size=8, bold=True)
-                        weekday_cell.alignment = Alignment(horizontal='center')
-                        weekday_cell.fill = PatternFill(start_color="E6E6E6", end_color="E6E6E6", fill_type="solid")  # Light gray background
-                        weekday_cell.border = border
-                        current_date += timedelta(days=1)
-                        col_idx += 1
-
-                    # No need for separate calendar headers since Kampanija is now in main table
-
-                    # Add plan rows with TRP values - one row per plan (matching main table Y positions)
-                    # Use the stored data_start_row to match exact positions
-                    for plan_idx, item in enumerate(rows):
-                        # Use the exact same Y position as the corresponding plan row in main table
-                        row_idx = data_start_row + plan_idx
-
-                        # No need for separate plan labels since campaign name is now in main table
-
-                        # TRP values for each day for this specific plan
-                        current_date = start_date
-                        col_idx = calendar_start_col
-
-                        while current_date <= end_date:
-                            daily_trp = 0
-                            date_str = current_date.strftime('%Y-%m-%d')
-
-                            # Check if this specific plan is active on this date
-                            if (item['start_date'] and item['end_date'] and
-                                item['start_date'] <= date_str <= item['end_date']):
-
-                                # Get TRP value from campaign TRP distribution data
-                                campaign_id = item['campaign_id']
-                                if campaign_id in campaign_trp_data:
-                                    trp_data = campaign_trp_data[campaign_id]
-                                    if date_str in trp_data:
-                                        # Use actual TRP calendar data
-                                        daily_trp = trp_data[date_str]
-                                    else:
-                                        # If no TRP calendar data for this date, distribute evenly across wave period
-                                        wave_start = datetime.strptime(item['start_date'], '%Y-%m-%d')
-                                        wave_end = datetime.strptime(item['end_date'], '%Y-%m-%d')
-                                        wave_days = (wave_end - wave_start).days + 1
-                                        daily_trp = (item['trps'] or 0) / wave_days if wave_days > 0 else 0
-                                else:
-                                    # No TRP distribution data for campaign, distribute evenly
-                                    wave_start = datetime.strptime(item['start_date'], '%Y-%m-%d')
-                                    wave_end = datetime.strptime(item['end_date'], '%Y-%m-%d')
-                                    wave_days = (wave_end - wave_start).days + 1
-                                    daily_trp = (item['trps'] or 0) / wave_days if wave_days > 0 else 0
-
-                            # Create cell for EVERY day in the date range (whether active or not)
-                            trp_cell = ws.cell(row=row_idx, column=col_idx)
-
-                            if daily_trp > 0:
-                                trp_cell.value = round(daily_trp, 1)
-                                trp_cell.fill = PatternFill(start_color="E8F5E8", end_color="E8F5E8", fill_type="solid")
-                            else:
-                                trp_cell.value = ""
-                                trp_cell.fill = PatternFill(start_color="FFFFFF", end_color="FFFFFF", fill_type="solid")
-
-                            trp_cell.font = Font(size=8)
-                            trp_cell.alignment = Alignment(horizontal='center')
-                            trp_cell.border = border
-
-                            current_date += timedelta(days=1)
-                            col_idx += 1
-
-                    # No need for separate plan label column widths
-
-                    # Set calendar date columns to narrow width (approximately 0.4cm)
-                    total_days = (end_date - start_date).days + 1
-                    for col in range(calendar_start_col, calendar_start_col + total_days):
-                        col_letter = openpyxl.utils.get_column_letter(col)
-                        ws.column_dimensions[col_letter].width = 5
-
-            except Exception as e:
-                # If calendar generation fails, log it and skip it
-                print(f"DEBUG: Calendar generation failed: {str(e)}", file=sys.stderr, flush=True)
-                import traceback
-                traceback.print_exc()
-
-
-        # Set specific widths for columns to properly display content
-        ws.column_dimensions['A'].width = 12  # Pradžia
-        ws.column_dimensions['B'].width = 12  # Pabaiga
-        ws.column_dimensions['C'].width = 18  # Kanalų grupė
-        ws.column_dimensions['D'].width = 15  # Kampanija
-        ws.column_dimensions['E'].width = 10  # Perkama TG - thinner
-        ws.column_dimensions['F'].width = 8   # TVC - thinner
-        ws.column_dimensions['G'].width = 7   # Trukmė - thinner
-        ws.column_dimensions['H'].width = 8   # TG dydis (*000) - thinner
-        ws.column_dimensions['I'].width = 7   # TG dalis (%) - thinner
-        ws.column_dimensions['J'].width = 7   # TG imtis - thinner
-        ws.column_dimensions['K'].width = 7   # Kanalo dalis - thinner
-        ws.column_dimensions['L'].width = 8   # PT zonos dalis - thinner
-        ws.column_dimensions['M'].width = 9   # nPT zonos dalis - thinner
-        ws.column_dimensions['N'].width = 9   # GRP planuojamas - thinner
-        ws.column_dimensions['O'].width = 8   # TRP perkamas - thinner
-        ws.column_dimensions['P'].width = 8   # Affinity1 - thinner
-        ws.column_dimensions['Q'].width = 9   # Gross CPP - thinner
-        ws.column_dimensions['R'].width = 9   # Trukmės koeficientas - thinner
-        ws.column_dimensions['S'].width = 9   # Sezoninis koeficientas - thinner
-        ws.column_dimensions['T'].width = 8   # TRP pirkimo - thinner
-        ws.column_dimensions['U'].width = 9   # Išankstinio pirkimo - thinner
-        ws.column_dimensions['V'].width = 6   # WEB - thinner
-        ws.column_dimensions['W'].width = 9   # Išankstinio mokėjimo - thinner
-        ws.column_dimensions['X'].width = 9   # Lojalumo nuolaida - thinner
-        ws.column_dimensions['Y'].width = 9   # Gross kaina - thinner
-        ws.column_dimensions['Z'].width = 9   # Kliento nuolaida % - thinner
-        ws.column_dimensions['AA'].width = 9  # Net kaina - thinner
-        ws.column_dimensions['AB'].width = 9  # Agentūros nuolaida % - thinner
-        ws.column_dimensions['AC'].width = 10 # Net net kaina - thinner
-
-        # Auto-adjust column widths if content is wider than preset widths
+    # Number format of each column (applied to non-zero numbers only)
+    formatted = {}
+    for col in [9, 11, 12, 13]:  # Percentage columns: TG dalis (%), Kanalo dalis, PT zonos dalis, nPT zonos dalis
+        formatted[col] = "group.cell_pct"
+    for col in [18, 19, 20, 21, 22, 23, 24]:  # Index columns
+        formatted[col] = "group.cell_index"
+    for col in [14, 15, 17, 25, 27, 29]:  # Currency columns: GRP plan., TRP perkamas, Gross CPP, Gross kaina, Net kaina, Net net kaina
+        formatted[col] = "group.cell_money"
+    for col in [26, 28]:  # Discount percentage columns: Kl. nuol. %, Ag. nuol. %
+        formatted[col] = "group.cell_discount"
+
+    def cell_style(col, value):
+        if col in [1, 2, 3]:  # Pradžia, Pabaiga, Kanalų grupė
+            return "group.cell_center"
+        if col in formatted and value and isinstance(value, (int, float)):
+            return formatted[col]
+        return "group.cell"
+
+    def total_style(col, value):
+        if col in [1, 2, 3]:  # Pradžia, Pabaiga, Kanalų grupė
+            return "group.total_center"
+        if value and isinstance(value, (int, float)):
+            if col in [14, 15, 17, 26, 28, 30]:  # Currency/number columns
+                return "group.total_money"
+            if col == 16:  # Affinity average
+                return "group.total_index"
+        return "group.total"
+
+    header_row = 3
+    data_start_row = header_row + 1
+    calendar_start_col = 30  # Calendar data starts at AD (30) - to the right of all plan data
+
+    with get_db() as db:
+        lengths = ", ".join(f"MAX(LENGTH({expr})) AS w{col}" for col, expr in _CHANNEL_GROUP_CONTENT_COLUMNS.items())
+        summary = db.execute(f"""
+            SELECT COUNT(*) AS item_count,
+                   MIN(w.start_date) AS first_day, MAX(w.end_date) AS last_day,
+                   COALESCE(SUM(wi.trps), 0) AS total_trp,
+                   COALESCE(AVG(CASE WHEN wi.affinity1 > 0 THEN wi.affinity1 END), 0) AS avg_affinity,
+                   {lengths}
+            {source}
+        """, params).fetchone()
+
+        print(f"DEBUG: Found {summary['item_count']} rows for group_id={group_id}", file=sys.stderr, flush=True)
+
+        if not summary['item_count']:
+            # Create empty Excel with message
+            sheet.row(1, {1: (f"Kanalų grupės '{group_name}' planai nerasti", "group.empty")})
+            output = BytesIO()
+            wb.save(output)
+            output.seek(0)
+            return output
+
+        # Calendar date range from all wave items
+        days = []
         try:
-            print(f"DEBUG: Starting auto-adjust column widths", file=sys.stderr, flush=True)
-            column_count = 0
-            for column in ws.columns:
-                column_count += 1
-                if column_count > 100:  # Safety limit to prevent infinite loops
-                    print(f"DEBUG: Breaking auto-adjust after 100 columns", file=sys.stderr, flush=True)
+            if summary['first_day'] and summary['last_day']:
+                start_date = datetime.strptime(summary['first_day'], '%Y-%m-%d')
+                end_date = datetime.strptime(summary['last_day'], '%Y-%m-%d')
+                days = [start_date + timedelta(days=n) for n in range((end_date - start_date).days + 1)]
+        except ValueError as e:
+            # If calendar generation fails, log it and skip it
+            print(f"DEBUG: Calendar generation failed: {str(e)}", file=sys.stderr, flush=True)
+        day_strs = [day.strftime('%Y-%m-%d') for day in days]
+        cal_cols = range(calendar_start_col, calendar_start_col + len(days))
+
+        # Column widths (set before the first row): preset, widened to the content of columns C..R
+        widths = [12, 12, 18, 15, 10, 8, 7, 8, 7, 7, 7, 8, 9, 9, 8, 8, 9, 9, 9, 8, 9, 6, 9, 9, 9, 9, 9, 9, 10]
+        for col in range(3, 19):
+            content = max(len(headers[col - 1]), summary[f'w{col}'] or 0) if col in _CHANNEL_GROUP_CONTENT_COLUMNS \
+                else len(headers[col - 1])
+            if content + 2 > widths[col - 1]:
+                widths[col - 1] = min(content + 2, 50)
+        for col in cal_cols:
+            sheet.width(col, 5)  # Calendar date columns are narrow (approximately 0.4cm)
+        for col, width in enumerate(widths, 1):
+            sheet.width(col, width)
+
+        def header_section():
+            # Month headers at row 1 (merged), day numbers at row 2, weekdays at row 3
+            month_starts = [col for col, day in zip(cal_cols, days) if col == calendar_start_col or day.day == 1]
+            for first_col, next_col in zip(month_starts, month_starts[1:] + [cal_cols.stop]):
+                sheet.merge(1, first_col, next_col - 1)
+            title_row = {
+                col: (days[col - calendar_start_col].strftime('%B %Y') if col in month_starts else None, "group.cal_month")
+                for col in cal_cols
+            }
+            title_row[1] = (f"KANALŲ GRUPĖS '{group_name}' PLANŲ ATASKAITA", "group.title")
+            sheet.merge(1, 1, 22)  # Main header A1:V1
+            yield 1, title_row, None
+
+            yield 2, {col: (day.strftime('%d'), "group.cal_day") for col, day in zip(cal_cols, days)}, None
+
+            # Column headers - match the exact plan table columns, tall enough for wrapped text
+            header_cells = {col: (WEEKDAY_NAMES[day.weekday()], "group.cal_weekday") for col, day in zip(cal_cols, days)}
+            header_cells.update({col: (header, "group.header") for col, header in enumerate(headers, 1)})
+            yield header_row, header_cells, 40
+
+        def plan_section():
+            totals = {'grp': 0, 'gross': 0, 'net': 0, 'net_net': 0}
+            trp_campaign, trp_data = None, {}
+            row_idx = data_start_row
+            cursor = db.execute(f"""
+                SELECT wi.*, w.start_date, w.end_date, w.campaign_id, c.name as campaign_name,
+                       cg.name as channel_group_name, t.name as tvc_name
+                {source}
+                ORDER BY c.name, w.start_date, wi.id
+            """, params)
+
+            while True:
+                chunk = cursor.fetchmany(EXPORT_CHUNK_SIZE)
+                if not chunk:
                     break
-
-                max_length = 0
-                column_letter = None
-                for cell in column:
-                    try:
-                        # Skip merged cells
-                        if hasattr(cell, 'column_letter'):
-                            if column_letter is None:
-                                column_letter = cell.column_letter
-                            if cell.value and len(str(cell.value)) > max_length:
-                                max_length = len(str(cell.value))
-                    except:
-                        pass
-                if column_letter:
-                    col_index = openpyxl.utils.column_index_from_string(column_letter)
-                    # Skip calendar columns (S onwards, which is column 19)
-                    if col_index >= 19:
-                        continue
-                    # Skip Pradžia and Pabaiga columns from auto-adjustment to keep them narrow
-                    if column_letter in ['A', 'B']:
-                        continue
-                    # Get current width
-                    current_width = ws.column_dimensions[column_letter].width
-                    # Only adjust if content requires more width
-                    if max_length + 2 > current_width:
-                        adjusted_width = min(max_length + 2, 50)
-                        ws.column_dimensions[column_letter].width = adjusted_width
-            print(f"DEBUG: Finished auto-adjust, processed {column_count} columns", file=sys.stderr, flush=True)
-        except Exception as e:
-            print(f"DEBUG: Error in auto-adjust: {e}", file=sys.stderr, flush=True)
+                # Prices for the whole chunk in one pass (shared pricing engine)
+                priced = pricing_engine.price_rows(chunk, formula="channel_group")
+                for key in totals:
+                    totals[key] += sum(priced[key])
+
+                for n, item in enumerate(chunk):
+                    values = row_values(item, priced['gross'][n], priced['net'][n],
+                                        priced['net_net'][n], priced['grp'][n])
+                    cells = {col: (value, cell_style(col, value)) for col, value in enumerate(values, 1)}
+
+                    # TRP calendar of the plan: the campaign's TRP distribution, else
+                    # the item's TRP spread evenly across the wave period
+                    if item['campaign_id'] != trp_campaign:
+                        trp_campaign, trp_data = item['campaign_id'], load_trp_distribution(item['campaign_id'])
+                    even_trp = 0
+                    if item['start_date'] and item['end_date']:
+                        wave_days = (datetime.strptime(item['end_date'], '%Y-%m-%d')
+                                     - datetime.strptime(item['start_date'], '%Y-%m-%d')).days + 1
+                        even_trp = (item['trps'] or 0) / wave_days if wave_days > 0 else 0
+                    for col, date_str in zip(cal_cols, day_strs):
+                        daily_trp = 0
+                        if item['start_date'] and item['end_date'] and item['start_date'] <= date_str <= item['end_date']:
+                            daily_trp = trp_data[date_str] if date_str in trp_data else even_trp
+                        if daily_trp > 0:
+                            cells[col] = (round(daily_trp, 1), "group.cal_trp")
+                        else:
+                            cells[col] = ("", "group.cal_empty")
+
+                    yield row_idx, cells, None
+                    row_idx += 1
+
+            # Totals row after all plan data
+            totals_row_data = [''] * 29
+            totals_row_data[0] = 'VISO:'                       # First column shows "VISO:"
+            totals_row_data[13] = totals['grp']                # GRP plan.
+            totals_row_data[14] = summary['total_trp']         # TRP perkamas
+            totals_row_data[15] = summary['avg_affinity']      # Affinity1 average (non-zero values only)
+            totals_row_data[24] = totals['gross']              # Gross kaina
+            totals_row_data[26] = totals['net']                # Net kaina
+            totals_row_data[28] = totals['net_net']            # Net net kaina
+            yield row_idx, {col: (value, total_style(col, value)) for col, value in enumerate(totals_row_data, 1)}, None
+
+        sheet.rows(header_section(), plan_section())
 
     # Save to BytesIO
     print(f"DEBUG: Saving workbook to BytesIO", file=sys.stderr, flush=True)
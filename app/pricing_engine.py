@@ -0,0 +1,155 @@
+# app/pricing_engine.py
+"""
+Columnar pricing engine for wave items.
+
+The item formula, used when wave items are created, edited or re-priced:
+
+    gross   = clip_duration × trps × gross_cpp × duration × seasonal
+              × trp_purchase × advance_purchase × web × advance_payment
+              × loyalty × position
+    net     = gross × (1 − client_discount / 100)
+    net_net = net × (1 − agency_discount / 100)
+    grp     = trps × 100 / affinity1   (0 without a valid affinity1)
+
+The exports each have their own gross formula (see FORMULAS); net, net-net
+and GRP are the same for all of them.
+
+Inputs are columns (one sequence per field). Missing or empty values fall
+back to the wave_items column defaults in DEFAULTS unless the formula
+overrides them; a 0 is priced as 0 except where the formula says
+otherwise. Each output column is built in a single pass over the zipped
+inputs.
+"""
+import sqlite3
+from itertools import repeat
+from math import prod
+from operator import itemgetter
+
+# Same defaults as the wave_items schema
+DEFAULTS = {
+    "trps": 0.0,
+    "gross_cpp_eur": 0.0,
+    "clip_duration": 10,
+    "duration_index": 1.0,
+    "seasonal_index": 1.0,
+    "trp_purchase_index": 0.95,
+    "advance_purchase_index": 0.95,
+    "web_index": 1.0,
+    "advance_payment_index": 1.0,
+    "loyalty_discount_index": 1.0,
+    "position_index": 1.0,
+    "client_discount": 0.0,
+    "agency_discount": 0.0,
+    "affinity1": 0.0,
+}
+
+# Base gross: the part the client report shows before the coefficient rows
+BASE_FIELDS = ("clip_duration", "trps", "gross_cpp_eur")
+INDEX_FIELDS = ("duration_index", "seasonal_index", "trp_purchase_index",
+                "advance_purchase_index", "web_index", "advance_payment_index",
+                "loyalty_discount_index", "position_index")
+FIELDS = BASE_FIELDS + INDEX_FIELDS + ("client_discount", "agency_discount", "affinity1")
+
+# Gross factors and default overrides of each caller. The exports grew their
+# own formulas over time and their figures are checked against the agencies'
+# spreadsheets, so each formula is kept exactly as that export computed it.
+FORMULAS = {
+    # Wave item create / update / re-pricing: the full formula
+    "item": {"factors": BASE_FIELDS + INDEX_FIELDS, "defaults": {}},
+    # Client report: base gross only, the coefficients are separate columns
+    "client_report": {"factors": BASE_FIELDS, "defaults": {"clip_duration": 0}},
+    # Pavyzdys: price per TRP, without the clip duration and the web,
+    # advance payment and loyalty indices
+    "pavyzdys": {
+        "factors": ("trps", "gross_cpp_eur", "duration_index", "seasonal_index",
+                    "trp_purchase_index", "advance_purchase_index", "position_index"),
+        "defaults": {},
+    },
+    # Channel-group export: no position index, 30 s clips and neutral
+    # purchase indices by default; a stored 0 counts as missing there
+    "channel_group": {
+        "factors": tuple(f for f in BASE_FIELDS + INDEX_FIELDS if f != "position_index"),
+        "defaults": {"clip_duration": 30, "trp_purchase_index": 1.0, "advance_purchase_index": 1.0},
+        "zero_is_missing": True,
+    },
+}
+
+# Campaign reports: the TVC's duration wins over the stored clip duration and
+# items created from a rate card (no gross CPP yet) use their price per second.
+REPORT_OVERRIDES = {
+    "clip_duration": lambda i: i.get("tvc_duration") or i.get("clip_duration"),
+    "gross_cpp_eur": lambda i: i.get("gross_cpp_eur") or i.get("price_per_sec_eur"),
+}
+
+
+def default_for(field: str, formula: str = "item"):
+    """Value a missing ``field`` takes in ``formula``"""
+    return FORMULAS[formula]["defaults"].get(field, DEFAULTS[field])
+
+
+def _column(values, default, zero_is_missing=False):
+    if zero_is_missing:
+        return [float(v) if v else default for v in values]
+    # A stored 0 is a real value, only missing ones take the default
+    return [default if v is None or v == "" else float(v) for v in values]
+
+
+def _discounted(gross, client_discounts, agency_discounts):
+    net = [g * (1 - c / 100) for g, c in zip(gross, client_discounts)]
+    net_net = [v * (1 - a / 100) for v, a in zip(net, agency_discounts)]
+    return net, net_net
+
+
+def price_columns(columns: dict, *, formula: str = "item") -> dict:
+    """Price whole columns at once
+
+    ``columns`` maps field names from FIELDS to equal-length sequences;
+    absent fields take their default. Returns ``gross``, ``net``,
+    ``net_net`` and ``grp`` lists, gross computed by ``formula`` (a key of
+    FORMULAS).
+    """
+    n = max((len(v) for v in columns.values()), default=0)
+    zero_is_missing = FORMULAS[formula].get("zero_is_missing", False)
+    cols = {f: _column(columns.get(f, [None] * n), default_for(f, formula), zero_is_missing)
+            for f in FIELDS}
+
+    gross = list(map(prod, zip(*(cols[f] for f in FORMULAS[formula]["factors"]))))
+    net, net_net = _discounted(gross, cols["client_discount"], cols["agency_discount"])
+    grp = [t * 100 / a if a > 0 else 0 for t, a in zip(cols["trps"], cols["affinity1"])]
+    return {"gross": gross, "net": net, "net_net": net_net, "grp": grp}
+
+
+def price_rows(rows, *, formula: str = "item", overrides: dict | None = None) -> dict:
+    """Price a list of wave-item rows (dicts or sqlite3.Row)
+
+    ``overrides`` maps a field to a per-row callable, e.g. to take the TVC
+    duration instead of the stored clip_duration.
+    """
+    overrides = overrides or {}
+    keys = list(rows[0].keys()) if rows else []
+    stored = [f for f in FIELDS if f in keys and f not in overrides]
+    columns = {}
+    if stored:
+        # Transpose rows into columns in one C-level pass; sqlite3.Row is
+        # much faster to index by position than by name. The extra trailing
+        # key keeps itemgetter returning tuples; zip() drops that column.
+        if isinstance(rows[0], sqlite3.Row):
+            getter = itemgetter(*(keys.index(f) for f in stored), 0)
+        else:
+            getter = itemgetter(*stored, stored[0])
+        columns = dict(zip(stored, zip(*map(getter, rows))))
+    for field, value in overrides.items():
+        columns[field] = [value(r) for r in rows]
+    return price_columns(columns, formula=formula)
+
+
+def price_item(item, **kwargs) -> dict:
+    """Price a single wave item; returns scalar gross/net/net_net/grp"""
+    result = price_rows([item], **kwargs)
+    return {k: v[0] for k, v in result.items()}
+
+
+def apply_discounts(gross, client_discount, agency_discount):
+    """Net and net-net columns for a gross column and one pair of discounts"""
+    gross = [g or 0.0 for g in gross]
+    return _discounted(gross, repeat(client_discount or 0), repeat(agency_discount or 0))
@@ -1,35 +1,277 @@
 """
 Service to fetch campaigns and projects from Projects-CRM API
+
+All calls go through one ProjectsCRMClient:
+
+- It holds a pooled requests.Session, so calls reuse keep-alive
+  connections.
+- The campaign and project lists are cached for CACHE_TTL seconds. Past
+  that, a stale list is still served for up to MAX_STALE seconds while a
+  background thread refreshes it (stale-while-revalidate).
+- A circuit breaker opens after BREAKER_FAILURES consecutive failures.
+  While it is open, calls fail immediately instead of waiting for the
+  timeout. After BREAKER_COOLDOWN seconds one trial call is let through.
+
+Everything is configurable through TV_PLANNER_CRM_* environment variables,
+or by constructing a client directly, e.g. against a local stand-in CRM.
+metrics() reports cache ages and breaker state.
 """
+import base64
+import calendar
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from datetime import date
+
 import requests
 import logging
+from requests.adapters import HTTPAdapter
 
 logger = logging.getLogger(__name__)
 
 # Configuration
-PROJECTS_CRM_API_URL = "http://localhost:5002/api"
-PROJECTS_CRM_API_KEY = "projects-crm-api-key-change-in-production"
-TIMEOUT = 10
+PROJECTS_CRM_API_URL = os.environ.get("TV_PLANNER_CRM_URL", "http://localhost:5002/api")
+PROJECTS_CRM_API_KEY = os.environ.get("TV_PLANNER_CRM_API_KEY", "projects-crm-api-key-change-in-production")
+CONNECT_TIMEOUT = float(os.environ.get("TV_PLANNER_CRM_CONNECT_TIMEOUT", 2))
+TIMEOUT = float(os.environ.get("TV_PLANNER_CRM_TIMEOUT", 10))
+CACHE_TTL = float(os.environ.get("TV_PLANNER_CRM_CACHE_TTL", 60))
+MAX_STALE = float(os.environ.get("TV_PLANNER_CRM_MAX_STALE", 900))
+BREAKER_FAILURES = int(os.environ.get("TV_PLANNER_CRM_BREAKER_FAILURES", 3))
+BREAKER_COOLDOWN = float(os.environ.get("TV_PLANNER_CRM_BREAKER_COOLDOWN", 30))
+POOL_SIZE = 10
+
+
+class CRMUnavailable(Exception):
+    """Projects-CRM could not be reached (or the circuit breaker is open)"""
+
+
+class CircuitBreaker:
+    """Closed -> open after ``failures`` in a row -> half-open after ``cooldown``"""
+
+    def __init__(self, failures: int = BREAKER_FAILURES, cooldown: float = BREAKER_COOLDOWN):
+        self.failures = failures
+        self.cooldown = cooldown
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Whether a call may go out now; in half-open state only one trial call does"""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self.trial_running:
+                self.trial_running = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.consecutive_failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self.trial_running = False
+            if self.opened_at is not None or self.consecutive_failures >= self.failures:
+                if self.opened_at is None:
+                    logger.warning(f"Projects-CRM circuit breaker opened after {self.consecutive_failures} failures")
+                self.opened_at = time.monotonic()
+
+    def metrics(self) -> dict:
+        opened_for = time.monotonic() - self.opened_at if self.opened_at is not None else None
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "open_seconds": round(opened_for, 1) if opened_for is not None else None,
+            "rejected_calls": self.rejected,
+        }
+
+
+class ProjectsCRMClient:
+    """Pooled, cached and circuit-broken access to the Projects-CRM API"""
+
+    def __init__(self, base_url: str = PROJECTS_CRM_API_URL, api_key: str = PROJECTS_CRM_API_KEY,
+                 timeout: tuple = (CONNECT_TIMEOUT, TIMEOUT), cache_ttl: float = CACHE_TTL,
+                 max_stale: float = MAX_STALE, breaker: CircuitBreaker | None = None):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.cache_ttl = cache_ttl
+        self.max_stale = max_stale
+        self.breaker = breaker or CircuitBreaker()
+
+        self.session = requests.Session()
+        self.session.headers['X-API-Key'] = api_key
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._cache = {}  # key: (fetched_at, value)
+        self._refreshing = set()
+        self._locks = {}
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "errors": 0, "hits": 0, "stale_hits": 0, "misses": 0,
+                       "refreshes": 0, "refresh_errors": 0}
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        """One API call; raises CRMUnavailable on network errors, 5xx or an open breaker"""
+        if not self.breaker.allow():
+            raise CRMUnavailable("Projects-CRM circuit breaker is open")
+        self._count("requests")
+        try:
+            response = self.session.request(method, f"{self.base_url}{path}",
+                                            timeout=self.timeout, **kwargs)
+        except requests.exceptions.RequestException as e:
+            self._count("errors")
+            self.breaker.record_failure()
+            raise CRMUnavailable(f"Network error connecting to Projects-CRM: {e}") from e
+        if response.status_code >= 500:
+            self._count("errors")
+            self.breaker.record_failure()
+            raise CRMUnavailable(f"Projects-CRM API error: {response.status_code}")
+        self.breaker.record_success()
+        return response
+
+    def get_json(self, path: str):
+        """Body of a GET that must answer 200"""
+        response = self.request("GET", path)
+        if response.status_code != 200:
+            raise CRMUnavailable(f"Projects-CRM API error: {response.status_code}")
+        return response.json()
+
+    # ---------- Cache ----------
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _fetch(self, key: str, fetch):
+        value = fetch()
+        with self._lock:
+            self._cache[key] = (time.monotonic(), value)
+        return value
+
+    def _refresh(self, key: str, fetch):
+        try:
+            self._fetch(key, fetch)
+            self._count("refreshes")
+        except Exception as e:
+            self._count("refresh_errors")
+            logger.warning(f"Background refresh of Projects-CRM {key} failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def cached(self, key: str, fetch):
+        """``fetch()`` result cached under ``key`` with stale-while-revalidate
+
+        Fresh entries are returned as they are. An entry past its TTL (but
+        within max_stale) is returned right away while one background thread
+        refreshes it. Without a usable entry the caller fetches, and
+        concurrent callers wait for that one fetch. A failed fetch falls
+        back to any entry still held, however old.
+        """
+        entry = self._cache.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry[0]
+            if age < self.cache_ttl:
+                self._count("hits")
+                return entry[1]
+            if age < self.max_stale:
+                self._count("stale_hits")
+                with self._lock:
+                    start = key not in self._refreshing
+                    self._refreshing.add(key)
+                if start:
+                    threading.Thread(target=self._refresh, args=(key, fetch),
+                                     name=f"crm-refresh-{key}", daemon=True).start()
+                return entry[1]
+
+        with self._key_lock(key):
+            current = self._cache.get(key)
+            if current is not entry and current is not None:
+                self._count("hits")  # Fetched by the caller we waited for
+                return current[1]
+            self._count("misses")
+            try:
+                return self._fetch(key, fetch)
+            except CRMUnavailable:
+                if entry is not None:
+                    self._count("stale_hits")
+                    return entry[1]
+                raise
+
+    def cache_stamp(self, key: str):
+        """When the cached ``key`` was fetched (None when not cached); changes on every refresh"""
+        entry = self._cache.get(key)
+        return entry[0] if entry else None
+
+    def invalidate(self, key: str | None = None):
+        """Forget one cached list, or all of them"""
+        with self._lock:
+            if key is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(key, None)
+
+    def campaigns(self) -> list:
+        return self.cached("campaigns", lambda: self.get_json("/campaigns"))
+
+    def projects(self) -> list:
+        return self.cached("projects", lambda: self.get_json("/projects"))
+
+    def metrics(self) -> dict:
+        """Call/cache counters, age of each cached list and breaker state"""
+        now = time.monotonic()
+        with self._lock:
+            cache = {key: {"age_seconds": round(now - fetched_at, 1),
+                           "fresh": now - fetched_at < self.cache_ttl,
+                           "size": len(value) if isinstance(value, list) else None,
+                           "refreshing": key in self._refreshing}
+                     for key, (fetched_at, value) in self._cache.items()}
+            stats = dict(self._stats)
+        return {
+            "base_url": self.base_url,
+            **stats,
+            "cache_ttl": self.cache_ttl,
+            "max_stale": self.max_stale,
+            "cache": cache,
+            "breaker": self.breaker.metrics(),
+        }
+
+
+client = ProjectsCRMClient()
 
 
 def get_campaigns():
-    """Fetch all campaigns from Projects-CRM"""
+    """Fetch all campaigns from Projects-CRM (cached)"""
     try:
-        url = f"{PROJECTS_CRM_API_URL}/campaigns"
-        headers = {'X-API-Key': PROJECTS_CRM_API_KEY}
-        
-        response = requests.get(url, headers=headers, timeout=TIMEOUT)
-        
-        if response.status_code == 200:
-            campaigns = response.json()
-            logger.info(f"Fetched {len(campaigns)} campaigns from Projects-CRM")
-            return campaigns
-        else:
-            logger.error(f"Projects-CRM API error: {response.status_code}")
-            return []
-            
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Network error connecting to Projects-CRM: {e}")
+        campaigns = client.campaigns()
+        logger.info(f"Fetched {len(campaigns)} campaigns from Projects-CRM")
+        return campaigns
+    except CRMUnavailable as e:
+        logger.error(str(e))
         return []
     except Exception as e:
         logger.error(f"Error fetching campaigns: {e}")
@@ -39,19 +281,16 @@ def get_campaigns():
 def get_campaign(campaign_id):
     """Fetch specific campaign from Projects-CRM"""
     try:
-        url = f"{PROJECTS_CRM_API_URL}/campaigns/{campaign_id}"
-        headers = {'X-API-Key': PROJECTS_CRM_API_KEY}
-        
-        response = requests.get(url, headers=headers, timeout=TIMEOUT)
-        
+        response = client.request("GET", f"/campaigns/{campaign_id}")
+
         if response.status_code == 200:
             return response.json()
         else:
             logger.error(f"Projects-CRM API error for campaign {campaign_id}: {response.status_code}")
             return None
-            
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Network error connecting to Projects-CRM: {e}")
+
+    except CRMUnavailable as e:
+        logger.error(str(e))
         return None
     except Exception as e:
         logger.error(f"Error fetching campaign {campaign_id}: {e}")
@@ -59,23 +298,13 @@ def get_campaign(campaign_id):
 
 
 def get_projects():
-    """Fetch all projects from Projects-CRM"""
+    """Fetch all projects from Projects-CRM (cached)"""
     try:
-        url = f"{PROJECTS_CRM_API_URL}/projects"
-        headers = {'X-API-Key': PROJECTS_CRM_API_KEY}
-        
-        response = requests.get(url, headers=headers, timeout=TIMEOUT)
-        
-        if response.status_code == 200:
-            projects = response.json()
-            logger.info(f"Fetched {len(projects)} projects from Projects-CRM")
-            return projects
-        else:
-            logger.error(f"Projects-CRM API error: {response.status_code}")
-            return []
-            
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Network error connecting to Projects-CRM: {e}")
+        projects = client.projects()
+        logger.info(f"Fetched {len(projects)} projects from Projects-CRM")
+        return projects
+    except CRMUnavailable as e:
+        logger.error(str(e))
         return []
     except Exception as e:
         logger.error(f"Error fetching projects: {e}")
@@ -108,46 +337,277 @@ def get_tv_planner_campaigns():
     return [convert_campaign_for_tv_planner(campaign) for campaign in campaigns]
 
 
-def sync_projects_crm_campaign_to_local(campaign_id):
-    """Sync a specific Projects-CRM campaign to local TV-Planner database"""
-    from app import models
-    
-    # Remove 'crm_' prefix to get the actual campaign ID
+def _crm_id(campaign_id):
+    """Numeric Projects-CRM id of a 'crm_<id>' (or plain) campaign id"""
     if str(campaign_id).startswith('crm_'):
-        actual_crm_id = int(campaign_id.replace('crm_', ''))
+        return int(str(campaign_id).replace('crm_', ''))
+    return int(campaign_id)
+
+
+def _base_name(name):
+    """Campaign name without its " (CODE)" suffix"""
+    if ' (' in name and name.endswith(')'):
+        return name.split(' (')[0]
+    return name
+
+
+def merge_campaign_lists(local_campaigns, crm_campaigns, links):
+    """Local campaigns plus the CRM campaigns that have no local counterpart
+
+    A CRM campaign counts as already present when it is linked in
+    crm_campaign_links (by id or code), when its name, or its name without
+    the "(CODE)" suffix, is a local campaign name, or when a local campaign
+    with the same start date has a name that contains it or is contained
+    in it (case-insensitively). The lookup structures are built once, so
+    the merge is a single pass over the CRM list; the substring test only
+    runs against the local campaigns sharing the start date.
+    """
+    local_names = {c['name'] for c in local_campaigns}
+    names_by_start = {}
+    for local_campaign in local_campaigns:
+        names_by_start.setdefault(local_campaign.get('start_date'), []).append(local_campaign['name'].lower())
+    linked_ids = {link['crm_id'] for link in links if link['crm_id'] is not None}
+    linked_codes = {link['code'] for link in links if link['code']}
+
+    merged = list(local_campaigns)
+    for crm_campaign in crm_campaigns:
+        crm_name = crm_campaign['name']
+        base_name = _base_name(crm_name)
+        lowered = base_name.lower()
+        is_duplicate = (
+            crm_campaign.get('original_id') in linked_ids
+            or crm_campaign.get('campaign_code') in linked_codes
+            or crm_name in local_names
+            or base_name in local_names
+            or any(lowered in name or name in lowered
+                   for name in names_by_start.get(crm_campaign.get('start_date'), ()))
+        )
+        if not is_duplicate:
+            merged.append(crm_campaign)
+    return merged
+
+
+_merged_campaigns = {"key": None, "campaigns": None}
+_merged_lock = threading.Lock()
+
+
+def list_campaigns_with_crm():
+    """Local and Projects-CRM campaigns, deduplicated
+
+    The merged list is cached until either the CRM campaign list is
+    refreshed or a local campaign or CRM link changes (the 'campaigns' data
+    revision). Returns (campaigns, local count, CRM count).
+    """
+    from app import models
+
+    crm_raw = get_campaigns()
+    key = (client.cache_stamp("campaigns"), models.get_data_revision('campaigns'))
+    with _merged_lock:
+        if _merged_campaigns["key"] == key:
+            return _merged_campaigns["campaigns"]
+
+    local_campaigns = models.list_campaigns()
+    crm_campaigns = [convert_campaign_for_tv_planner(campaign) for campaign in crm_raw]
+    merged = merge_campaign_lists(local_campaigns, crm_campaigns, models.list_crm_links())
+    result = (merged, len(local_campaigns), len(crm_campaigns))
+    with _merged_lock:
+        _merged_campaigns.update(key=key, campaigns=result)
+    return result
+
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def _encode_cursor(position):
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor):
+    """(source, sort value, id) of the last campaign of the previous page"""
+    try:
+        source, value, campaign_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if source not in ("local", "crm"):
+        raise ValueError("Invalid cursor")
+    return source, value, campaign_id
+
+
+def _crm_sort_value(campaign, sort_key):
+    """Sort value of a CRM campaign, matching models.CAMPAIGN_SORTS"""
+    if sort_key == "id":
+        return campaign['original_id']
+    return campaign.get(sort_key) or ''
+
+
+def _search_words(text):
+    """Lower-case words of ``text`` with diacritics removed"""
+    folded = unicodedata.normalize("NFKD", text.lower())
+    return re.findall(r"\w+", "".join(ch for ch in folded if not unicodedata.combining(ch)))
+
+
+def _crm_matches(campaign, filters):
+    """Python twin of models._campaign_filter_sql for the not yet synced CRM campaigns"""
+    # Like the campaign_search index: every word is a prefix of some word, diacritics ignored
+    search = _search_words(filters.get("search") or "")
+    if search:
+        words = _search_words(" ".join(campaign.get(field) or ""
+                                       for field in ("name", "client", "product", "agency", "campaign_code")))
+        if not all(any(word.startswith(term) for word in words) for term in search):
+            return False
+    if filters.get("client") and campaign.get('client') != filters["client"]:
+        return False
+    start, end = campaign.get('start_date'), campaign.get('end_date')
+    date_range = filters.get("date_range")
+    if date_range:
+        today = date.today()
+        today_s, year = today.isoformat(), str(today.year)
+        month_start = today.replace(day=1).isoformat()
+        month_end = f"{today.year}-{today.month:02d}-{calendar.monthrange(today.year, today.month)[1]:02d}"
+        in_month = lambda d: d is not None and month_start <= d <= month_end
+        matches = {
+            "current_month": in_month(start) or in_month(end)
+                             or (start is not None and end is not None and start <= today_s <= end),
+            "current_year": (start or "")[:4] == year or (end or "")[:4] == year,
+            "past": end is not None and end < today_s,
+            "future": start is not None and start > today_s,
+        }[date_range]
+        if not matches:
+            return False
+    # Explicit period: campaigns overlapping [date_from, date_to]
+    period_start, period_end = start or end, end or start
+    if filters.get("date_from") and (period_end is None or period_end < filters["date_from"]):
+        return False
+    if filters.get("date_to") and (period_start is None or period_start > filters["date_to"]):
+        return False
+    return True
+
+
+def list_campaigns_page(filters: dict, sort: str = "-id", cursor: str | None = None,
+                        limit: int = PAGE_SIZE) -> dict:
+    """One page of the campaign list with status and agency facets
+
+    Local campaigns are filtered, sorted and paginated in SQL
+    (models.list_campaigns_page). The Projects-CRM campaigns not yet synced
+    come from the cached merged list and follow the local ones, sorted the
+    same way. The cursor records where the previous page stopped, so the
+    page size stays ``limit`` however many campaigns exist. Facets count
+    the campaigns matching every other filter: the status counts ignore
+    the status filter and the agency counts ignore the agency filter.
+    """
+    from app import models
+
+    sort_key = sort.lstrip("-")
+    if sort_key not in models.CAMPAIGN_SORTS:
+        raise ValueError(f"Unknown sort: {sort}")
+    if filters.get("date_range") and filters["date_range"] not in models.CAMPAIGN_DATE_RANGES:
+        raise ValueError(f"Unknown date range: {filters['date_range']}")
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    descending = sort.startswith("-")
+    source, value, last_id = _decode_cursor(cursor) if cursor else ("local", None, None)
+
+    items = []
+    if source == "local":
+        after = (value, last_id) if cursor else None
+        rows, facet_rows = models.list_campaigns_page(filters, sort, after, limit + 1)
+        items = [("local", row) for row in rows]
     else:
-        actual_crm_id = int(campaign_id)
-    
-    # Get the campaign from Projects-CRM
-    projects_crm_campaign = get_campaign(actual_crm_id)
+        _, facet_rows = models.list_campaigns_page(filters, sort, None, 0)
+
+    campaigns, local_count, _ = list_campaigns_with_crm()
+    crm_matching = [c for c in campaigns[local_count:] if _crm_matches(c, filters)]
+    for row in crm_matching:
+        facet_rows.append({'status': row['status'], 'agency': row['agency'], 'n': 1})
+
+    if len(items) <= limit:
+        crm_page = [c for c in crm_matching
+                    if all(not filters.get(column) or c[column] == filters[column]
+                           for column in ("status", "agency"))]
+        crm_page.sort(key=lambda c: (_crm_sort_value(c, sort_key), c['original_id']), reverse=descending)
+        if source == "crm":
+            position = (value, last_id)
+            crm_page = [c for c in crm_page
+                        if ((_crm_sort_value(c, sort_key), c['original_id']) < position if descending
+                            else (_crm_sort_value(c, sort_key), c['original_id']) > position)]
+        items += [("crm", c) for c in crm_page[:limit + 1 - len(items)]]
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last_source, last = items[-1]
+        if last_source == "local":
+            next_cursor = _encode_cursor(["local", last['sort_key'], last['id']])
+        else:
+            next_cursor = _encode_cursor(["crm", _crm_sort_value(last, sort_key), last['original_id']])
+
+    status_counts, agency_counts, total = {}, {}, 0
+    for row in facet_rows:
+        status_ok = not filters.get("status") or row['status'] == filters["status"]
+        agency_ok = not filters.get("agency") or row['agency'] == filters["agency"]
+        if agency_ok:
+            status_counts[row['status'] or ''] = status_counts.get(row['status'] or '', 0) + row['n']
+        if status_ok and row['agency']:
+            agency_counts[row['agency']] = agency_counts.get(row['agency'], 0) + row['n']
+        if status_ok and agency_ok:
+            total += row['n']
+
+    for _, item in items:
+        item.pop('sort_key', None)
+    return {
+        "items": [item for _, item in items],
+        "next_cursor": next_cursor,
+        "total": total,
+        "facets": {"status": status_counts, "agency": dict(sorted(agency_counts.items()))},
+    }
+
+
+def sync_projects_crm_campaign_to_local(campaign_id):
+    """Sync a specific Projects-CRM campaign to local TV-Planner database
+
+    Campaigns synced before are answered from crm_campaign_links without
+    contacting Projects-CRM.
+    """
+    from app import models
+    from app.db import before_request_transaction, get_db
+
+    actual_crm_id = _crm_id(campaign_id)
+    # The Projects-CRM call can take up to the client timeout, longer than
+    # SQLite's busy timeout: make it before a writing request locks the DB
+    with before_request_transaction():
+        link = models.get_crm_link(crm_id=actual_crm_id)
+        if link:
+            return link['local_id']
+
+        # Get the campaign from Projects-CRM
+        projects_crm_campaign = get_campaign(actual_crm_id)
     if not projects_crm_campaign:
         raise ValueError(f"Campaign {actual_crm_id} not found in Projects-CRM")
-    
+
     # Convert to TV-Planner format
     tv_campaign = convert_campaign_for_tv_planner(projects_crm_campaign)
-    
-    # Check if already exists in local database
-    try:
-        existing_campaigns = models.list_campaigns()
-        for existing in existing_campaigns:
-            if existing.get('name') == tv_campaign['name']:
-                logger.info(f"Campaign {tv_campaign['name']} already exists locally")
-                return existing['id']
-    except:
-        pass
-    
-    # Create in local database
-    local_campaign_id = models.create_campaign(
-        name=tv_campaign['name'],
-        start_date=tv_campaign['start_date'],
-        end_date=tv_campaign['end_date'], 
-        agency=tv_campaign['agency'],
-        client=tv_campaign['client'],
-        product=tv_campaign['product'],
-        country=tv_campaign['country']
-    )
-    
-    logger.info(f"Synced Projects-CRM campaign {actual_crm_id} to local campaign {local_campaign_id}")
+    code = projects_crm_campaign.get('code')
+
+    with get_db():
+        # Already mirrored: linked by code only (backfilled), or same name
+        link = models.get_crm_link(code=code) if code else None
+        local_campaign_id = link['local_id'] if link else models.find_campaign_id_by_name(tv_campaign['name'])
+        if local_campaign_id is not None:
+            logger.info(f"Campaign {tv_campaign['name']} already exists locally")
+        else:
+            # Create in local database
+            local_campaign_id = models.create_campaign(
+                name=tv_campaign['name'],
+                start_date=tv_campaign['start_date'],
+                end_date=tv_campaign['end_date'],
+                agency=tv_campaign['agency'],
+                client=tv_campaign['client'],
+                product=tv_campaign['product'],
+                country=tv_campaign['country']
+            )
+            logger.info(f"Synced Projects-CRM campaign {actual_crm_id} to local campaign {local_campaign_id}")
+        models.save_crm_link(local_campaign_id, actual_crm_id, code)
+
     return local_campaign_id
 
 
@@ -166,15 +626,12 @@ def create_plan_in_projects_crm(campaign_id, plan_name, description="", budget=0
     try:
         # Remove 'crm_' prefix to get actual campaign ID
         if str(campaign_id).startswith('crm_'):
-            actual_crm_campaign_id = int(campaign_id.replace('crm_', ''))
+            actual_crm_campaign_id = _crm_id(campaign_id)
         else:
             # This shouldn't happen for waves from Projects-CRM campaigns
             logger.warning(f"Trying to create plan for non-CRM campaign: {campaign_id}")
             return None
         
-        url = f"{PROJECTS_CRM_API_URL}/campaigns/{actual_crm_campaign_id}/plans"
-        headers = {'X-API-Key': PROJECTS_CRM_API_KEY, 'Content-Type': 'application/json'}
-        
         data = {
             'name': plan_name,
             'description': description,
@@ -182,7 +639,7 @@ def create_plan_in_projects_crm(campaign_id, plan_name, description="", budget=0
             'status': 'active'
         }
         
-        response = requests.post(url, json=data, headers=headers, timeout=TIMEOUT)
+        response = client.request("POST", f"/campaigns/{actual_crm_campaign_id}/plans", json=data)
         
         if response.status_code == 201:
             plan_data = response.json()
@@ -218,29 +675,26 @@ def sync_wave_to_projects_crm_plan(campaign_id, wave_name, wave_start_date, wave
 
 
 def get_projects_crm_campaign_id_from_local(local_campaign_id):
-    """Get the original Projects-CRM campaign ID from a local campaign"""
+    """Get the original Projects-CRM campaign ID from a local campaign
+
+    Read from crm_campaign_links. Only a link backfilled from the campaign
+    name (code known, CRM id not yet) needs the CRM campaign list, once.
+    """
     try:
         from app import models
-        
-        # Get the campaign details to find the original CRM ID
-        campaigns = models.list_campaigns()
-        for campaign in campaigns:
-            if campaign.get('id') == local_campaign_id:
-                # Check if this campaign name has the Projects-CRM format
-                name = campaign.get('name', '')
-                if ' (' in name and name.count('(') == 1:
-                    # Extract the code part, e.g., "Campaign Name (PLN-25-006-A)" -> "PLN-25-006-A"
-                    code_part = name.split(' (')[-1].rstrip(')')
-                    if code_part.startswith('PLN-'):
-                        # This looks like a Projects-CRM campaign
-                        # We need to find the actual campaign ID
-                        projects_crm_campaigns = get_campaigns()
-                        for crm_campaign in projects_crm_campaigns:
-                            if crm_campaign.get('code') == code_part:
-                                return f"crm_{crm_campaign['id']}"
-        
+
+        link = models.get_crm_link(local_id=local_campaign_id)
+        if not link:
+            return None
+        if link['crm_id'] is not None:
+            return f"crm_{link['crm_id']}"
+
+        for crm_campaign in get_campaigns():
+            if crm_campaign.get('code') == link['code']:
+                models.save_crm_link(local_campaign_id, crm_campaign['id'], link['code'])
+                return f"crm_{crm_campaign['id']}"
         return None
-        
+
     except Exception as e:
         logger.error(f"Error finding Projects-CRM campaign ID: {e}")
         return None
@@ -251,7 +705,7 @@ def delete_plan_from_projects_crm(campaign_id, plan_name):
     try:
         # Remove 'crm_' prefix to get actual campaign ID
         if str(campaign_id).startswith('crm_'):
-            actual_crm_campaign_id = int(campaign_id.replace('crm_', ''))
+            actual_crm_campaign_id = _crm_id(campaign_id)
         else:
             logger.warning(f"Trying to delete plan from non-CRM campaign: {campaign_id}")
             return None
@@ -260,10 +714,8 @@ def delete_plan_from_projects_crm(campaign_id, plan_name):
         import urllib.parse
         encoded_plan_name = urllib.parse.quote(plan_name, safe='')
         
-        url = f"{PROJECTS_CRM_API_URL}/campaigns/{actual_crm_campaign_id}/plans/by-name/{encoded_plan_name}"
-        headers = {'X-API-Key': PROJECTS_CRM_API_KEY}
-        
-        response = requests.delete(url, headers=headers, timeout=TIMEOUT)
+        response = client.request(
+            "DELETE", f"/campaigns/{actual_crm_campaign_id}/plans/by-name/{encoded_plan_name}")
         
         if response.status_code == 200:
             result = response.json()
@@ -0,0 +1,126 @@
+# app/refdata.py
+"""
+Process-wide snapshot of the pricing reference data: channel-group
+name -> id map plus the duration, seasonal and position index tables.
+
+The tables are tiny and change rarely, so they are loaded once and index
+lookups during wave-item creation and repricing cost no SQL. Writers in
+models.py call invalidate(), which bumps the generation counter once their
+transaction commits and makes the next lookup reload. Writes made by
+other worker processes are picked up through the 'refdata' row of
+data_revisions (bumped by triggers), which is checked at most once every
+RECHECK_SECONDS.
+"""
+import os
+import threading
+import time
+
+from .db import get_db
+
+RECHECK_SECONDS = float(os.environ.get("TV_PLANNER_REFDATA_RECHECK_SECONDS", 30))
+
+_lock = threading.Lock()
+_stats_lock = threading.Lock()  # not _lock: hits never wait for a reload
+_generation = 0
+_snapshot = None
+_stats = {"hits": 0, "misses": 0}
+
+
+class Snapshot:
+    __slots__ = ("generation", "revision", "checked_at",
+                 "group_ids", "duration", "seasonal", "position")
+
+    def __init__(self, generation, revision):
+        self.generation = generation
+        self.revision = revision
+        self.checked_at = time.monotonic()
+        self.group_ids = {}
+        self.duration = {}
+        self.seasonal = {}
+        self.position = {}
+
+
+def _revision(db) -> int:
+    row = db.execute("SELECT revision FROM data_revisions WHERE scope = 'refdata'").fetchone()
+    return row["revision"] if row else 0
+
+
+def _load(generation) -> Snapshot:
+    with get_db() as db:
+        snap = Snapshot(generation, _revision(db))
+        snap.group_ids = {r["name"]: r["id"] for r in db.execute("SELECT id, name FROM channel_groups")}
+        snap.duration = {
+            (r["channel_group_id"], r["duration_seconds"]): float(r["index_value"])
+            for r in db.execute("SELECT channel_group_id, duration_seconds, index_value FROM duration_indices")
+        }
+        snap.seasonal = {
+            (r["channel_group_id"], r["month"]): float(r["index_value"])
+            for r in db.execute("SELECT channel_group_id, month, index_value FROM seasonal_indices")
+        }
+        snap.position = {
+            (r["channel_group_id"], r["position_type"]): float(r["index_value"])
+            for r in db.execute("SELECT channel_group_id, position_type, index_value FROM position_indices")
+        }
+    return snap
+
+
+def _count(key):
+    with _stats_lock:
+        _stats[key] += 1
+
+
+def snapshot() -> Snapshot:
+    """Return the current snapshot, reloading it if it is stale"""
+    global _snapshot
+    snap = _snapshot
+    if snap is not None and snap.generation == _generation:
+        if time.monotonic() - snap.checked_at < RECHECK_SECONDS:
+            _count("hits")
+            return snap
+        with get_db() as db:
+            fresh = _revision(db) == snap.revision
+        if fresh:
+            snap.checked_at = time.monotonic()
+            _count("hits")
+            return snap
+
+    with _lock:
+        _count("misses")
+        _snapshot = _load(_generation)
+        return _snapshot
+
+
+def _bump_generation():
+    global _generation
+    with _lock:
+        _generation += 1
+
+
+def invalidate():
+    """Drop the snapshot after a reference-data write in this process
+
+    Deferred until the write commits: a reload before that would cache the
+    old rows under the new generation.
+    """
+    get_db().call_after_commit(_bump_generation)
+
+
+def stats() -> dict:
+    """Hit/miss counters for the snapshot"""
+    with _stats_lock:
+        return {**_stats, "generation": _generation}
+
+
+def channel_group_id(snap: Snapshot, channel_group):
+    if isinstance(channel_group, int):
+        return channel_group
+    return snap.group_ids.get(channel_group)
+
+
+def lookup(table: str, channel_group, key) -> float:
+    """Index value for a channel group (name or id); 1.0 when not defined"""
+    snap = snapshot()
+    group_id = channel_group_id(snap, channel_group)
+    if not group_id:
+        return 1.0  # Default if no channel group found
+    return getattr(snap, table).get((group_id, key), 1.0)
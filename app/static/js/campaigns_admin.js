@@ -28,6 +28,7 @@
     const W_TOTAL   = dataDiv.dataset.wTotalBase;     // /waves/0/total
     const W_RECALC  = dataDiv.dataset.wRecalcBase;    // /waves/0/recalculate-discounts
     const C_STATUS  = dataDiv.dataset.cStatusBase;   // /campaigns/0/status
+    const C_WORKSPACE = dataDiv.dataset.cWorkspaceBase; // /campaigns/0/workspace
     
     const TVC_LIST   = dataDiv.dataset.tvcListBase;   // /campaigns/0/tvcs
     const TVC_CREATE = dataDiv.dataset.tvcCreateBase; // /campaigns/0/tvcs
@@ -36,8 +37,9 @@
     const W_INDICES  = dataDiv.dataset.wIndicesBase;  // /waves/0/indices
     const C_EXPORT_EXCEL = dataDiv.dataset.cExportExcelBase; // /campaigns/0/export/client-excel
     const C_EXPORT_CSV = dataDiv.dataset.cExportCsvBase;     // /campaigns/0/export/agency-csv
-    const TRP_SAVE = dataDiv.dataset.trpSaveBase;            // /campaigns/0/trp-distribution
-    const TRP_LOAD = dataDiv.dataset.trpLoadBase;            // /campaigns/0/trp-distribution
+    const WAVE_TRP_LOAD = dataDiv.dataset.waveTrpLoadBase;   // /campaigns/0/wave-trp-distribution
+    const W_TRP = dataDiv.dataset.wTrpBase;                  // /waves/0/trp-distribution
+    const TRP_AUTO = dataDiv.dataset.trpAutoBase;            // /campaigns/0/trp-distribution/auto
 
     const $ = s => document.querySelector(s);
     const cTbody = $('#cTbody');
@@ -48,6 +50,7 @@
     const clearFilters = $('#clearFilters');
     const campaignsCount = $('#campaignsCount');
     const activeFiltersIndicator = $('#activeFiltersIndicator');
+    const loadMoreCampaigns = $('#loadMoreCampaigns');
 
     const wavePanel = $('#wavePanel');
     const wavesDiv  = $('#waves');
@@ -57,8 +60,12 @@
     const tvcAdd = $('#tvcAdd'), tvcList = $('#tvcList');
 
     let lists = [];     // pricing lists
-    let campaigns = []; // campaigns
-    let filteredCampaigns = []; // filtered campaigns for search
+    let campaigns = []; // campaigns loaded so far (pages of the filtered list)
+    let campaignsNextCursor = null; // cursor of the next page, null when all are loaded
+    let campaignsTotal = 0; // campaigns matching the filters
+    let campaignsFacets = { status: {}, agency: {} }; // counts per status / agency
+    let campaignsRequestId = 0;
+    const CAMPAIGNS_PAGE_SIZE = 50;
     let currentCampaign = null;
     let tvcs = [];      // TVCs for current campaign
     let channels = [];  // Store channel groups for lookup
@@ -212,7 +219,7 @@
     function renderCampaigns(){
       cTbody.innerHTML = '';
       
-      filteredCampaigns.forEach(c => {
+      campaigns.forEach(c => {
         const tr = document.createElement('tr');
         const statusColors = {
           'draft': 'bg-slate-100 text-slate-700',
@@ -294,77 +301,42 @@
     }
 
     function populateAgencyFilter() {
-      const agencies = [...new Set(campaigns.map(c => c.agency).filter(Boolean))];
+      // Agencies and their counts come from the server-side facets of the current filters
+      const selected = agencyFilter.value;
+      const agencies = Object.keys(campaignsFacets.agency || {});
+      if (selected && !agencies.includes(selected)) agencies.push(selected);
       agencyFilter.innerHTML = '<option value="">Visos agentūros</option>';
       agencies.sort().forEach(agency => {
         const option = document.createElement('option');
         option.value = agency;
-        option.textContent = agency;
+        option.textContent = `${agency} (${campaignsFacets.agency[agency] || 0})`;
         agencyFilter.appendChild(option);
       });
+      agencyFilter.value = selected;
     }
 
-    function matchesDateRange(campaign, dateRange) {
-      if (!dateRange) return true;
-      
-      const now = new Date();
-      const currentMonth = now.getMonth();
-      const currentYear = now.getFullYear();
-      
-      const startDate = campaign.start_date ? new Date(campaign.start_date) : null;
-      const endDate = campaign.end_date ? new Date(campaign.end_date) : null;
-      
-      switch (dateRange) {
-        case 'current_month':
-          return (startDate && startDate.getMonth() === currentMonth && startDate.getFullYear() === currentYear) ||
-                 (endDate && endDate.getMonth() === currentMonth && endDate.getFullYear() === currentYear) ||
-                 (startDate && endDate && startDate <= now && endDate >= now);
-        case 'current_year':
-          return (startDate && startDate.getFullYear() === currentYear) ||
-                 (endDate && endDate.getFullYear() === currentYear);
-        case 'past':
-          return endDate && endDate < now;
-        case 'future':
-          return startDate && startDate > now;
-        default:
-          return true;
-      }
+    function populateStatusCounts() {
+      Array.from(statusFilter.options).forEach(option => {
+        if (!option.value) return;
+        if (!option.dataset.label) option.dataset.label = option.textContent;
+        option.textContent = `${option.dataset.label} (${campaignsFacets.status[option.value] || 0})`;
+      });
     }
 
-    function filterCampaigns(searchTerm = '', statusFilter = '', agencyFilter = '', dateRangeFilter = '') {
-      filteredCampaigns = campaigns.filter(c => {
-        // Search filter
-        const matchesSearch = !searchTerm.trim() || 
-          (c.name && c.name.toLowerCase().includes(searchTerm.toLowerCase())) ||
-          (c.client && c.client.toLowerCase().includes(searchTerm.toLowerCase())) ||
-          (c.product && c.product.toLowerCase().includes(searchTerm.toLowerCase())) ||
-          (c.agency && c.agency.toLowerCase().includes(searchTerm.toLowerCase()));
-        
-        // Status filter
-        const matchesStatus = !statusFilter || c.status === statusFilter;
-        
-        // Agency filter
-        const matchesAgency = !agencyFilter || c.agency === agencyFilter;
-        
-        // Date range filter
-        const matchesDate = matchesDateRange(c, dateRangeFilter);
-        
-        return matchesSearch && matchesStatus && matchesAgency && matchesDate;
-      });
-      updateResultsIndicator();
-      renderCampaigns();
+    function campaignsQuery(cursor) {
+      const params = new URLSearchParams({ limit: CAMPAIGNS_PAGE_SIZE });
+      const searchTerm = campaignSearch.value.trim();
+      if (searchTerm) params.set('q', searchTerm);
+      if (statusFilter.value) params.set('status', statusFilter.value);
+      if (agencyFilter.value) params.set('agency', agencyFilter.value);
+      if (dateRangeFilter.value) params.set('date_range', dateRangeFilter.value);
+      if (cursor) params.set('cursor', cursor);
+      return `${C_LIST}?${params}`;
     }
 
     function updateResultsIndicator() {
-      const total = campaigns.length;
-      const showing = filteredCampaigns.length;
-      
-      if (total === showing) {
-        campaignsCount.textContent = `Rodomos visos kampanijos (${total})`;
-      } else {
-        campaignsCount.textContent = `Rodomos ${showing} iš ${total} kampanijų`;
-      }
-      
+      const showing = campaigns.length;
+
       // Show active filters indicator
       const hasActiveFilters = 
         campaignSearch.value.trim() ||
@@ -372,33 +344,49 @@
         agencyFilter.value ||
         dateRangeFilter.value;
       
+      if (!hasActiveFilters && showing === campaignsTotal) {
+        campaignsCount.textContent = `Rodomos visos kampanijos (${campaignsTotal})`;
+      } else {
+        campaignsCount.textContent = `Rodomos ${showing} iš ${campaignsTotal} kampanijų`;
+      }
+      
       if (hasActiveFilters) {
         activeFiltersIndicator.classList.remove('hidden');
       } else {
         activeFiltersIndicator.classList.add('hidden');
       }
+      loadMoreCampaigns.classList.toggle('hidden', !campaignsNextCursor);
     }
 
     function applyFilters() {
-      const searchTerm = campaignSearch.value;
-      const statusValue = statusFilter.value;
-      const agencyValue = agencyFilter.value;
-      const dateRangeValue = dateRangeFilter.value;
-      filterCampaigns(searchTerm, statusValue, agencyValue, dateRangeValue);
+      loadCampaigns();
     }
 
-    async function loadCampaigns(){
-      campaigns = await fetchJSON(C_LIST);
+    async function loadCampaigns(append = false){
+      // Filtering, sorting and paging run on the server; a page is CAMPAIGNS_PAGE_SIZE rows
+      const requestId = ++campaignsRequestId;
+      const page = await fetchJSON(campaignsQuery(append ? campaignsNextCursor : null));
+      if (requestId !== campaignsRequestId) return; // Superseded by a newer filter change
+      campaigns = append ? campaigns.concat(page.items) : page.items;
+      campaignsNextCursor = page.next_cursor;
+      campaignsTotal = page.total;
+      campaignsFacets = page.facets;
       populateAgencyFilter();
-      filteredCampaigns = [...campaigns];
+      populateStatusCounts();
+      updateResultsIndicator();
       renderCampaigns();
     }
 
     // Event listeners
-    campaignSearch.addEventListener('input', applyFilters);
+    let searchTimer = null;
+    campaignSearch.addEventListener('input', () => {
+      clearTimeout(searchTimer);
+      searchTimer = setTimeout(applyFilters, 250);
+    });
     statusFilter.addEventListener('change', applyFilters);
     agencyFilter.addEventListener('change', applyFilters);
     dateRangeFilter.addEventListener('change', applyFilters);
+    loadMoreCampaigns.addEventListener('click', () => loadCampaigns(true));
     
     clearFilters.addEventListener('click', () => {
       campaignSearch.value = '';
@@ -408,10 +396,31 @@
       applyFilters();
     });
 
+    // -------- Campaign workspace --------
+    // One request returns the campaign's waves with items, TVCs, discounts, TRP and
+    // reference data. The server answers 304 while the campaign is unchanged.
+    let currentWorkspace = null;
+    let currentWorkspaceCid = null;
+    let workspaceRequest = null;
+
+    function loadWorkspace(cid) {
+      // TVCs and waves are loaded together when a campaign opens; they share the request
+      if (workspaceRequest && workspaceRequest.cid === cid) return workspaceRequest.promise;
+      const promise = fetchJSON(urlReplace(C_WORKSPACE, cid)).then(workspace => {
+        currentWorkspace = workspace;
+        currentWorkspaceCid = cid;
+        return workspace;
+      }).finally(() => {
+        if (workspaceRequest && workspaceRequest.promise === promise) workspaceRequest = null;
+      });
+      workspaceRequest = { cid, promise };
+      return promise;
+    }
+
     // -------- TVC Management --------
     async function loadTVCs(campaignId) {
       try {
-        tvcs = await fetchJSON(urlReplace(TVC_LIST, campaignId));
+        tvcs = (await loadWorkspace(campaignId)).tvcs;
         renderTVCs();
       } catch (e) {
         console.error('Error loading TVCs:', e);
@@ -723,6 +732,14 @@
       html += '<div class="flex gap-2 items-center justify-center">';
       html += '<button id="autoDistributeTRP" class="px-3 py-1 text-xs rounded bg-emerald-600 text-white hover:bg-emerald-700 transition-colors">📊 Auto-paskirstyti TRP (visiems bangoms)</button>';
       html += '<button id="clearTRP" class="px-3 py-1 text-xs rounded bg-slate-400 text-white hover:bg-slate-500 transition-colors">🗑️ Išvalyti visus TRP</button>';
+      html += '<select id="trpProfile" class="px-2 py-1 text-xs border border-slate-300 rounded">';
+      html += '<option value="flat">Tolygiai</option>';
+      html += '<option value="weekday">Pagal savaitės dienas</option>';
+      html += '<option value="front_loaded">Daugiau pradžioje</option>';
+      html += '<option value="flighting">Savaitė per savaitę</option>';
+      html += '<option value="burst">Pradžios impulsas</option>';
+      html += '</select>';
+      html += '<label class="flex items-center gap-1 text-slate-600"><input type="checkbox" id="trpExcludeHolidays"> Be švenčių dienų</label>';
       html += '<span class="text-slate-600 ml-3">Kiekvienos bangos TRP bus paskirstyti per jos aktyvias dienas</span>';
       html += '</div>';
       html += '</td>';
@@ -777,200 +794,83 @@
         clearBtn.addEventListener('click', clearAllTRP);
       }
       
-      // Then load existing TRP data for each wave
+      // Then load existing TRP data for all waves in one request
       if (currentWaves && currentWaves.length > 0) {
-        currentWaves.forEach(wave => {
-          loadWaveTRPDistribution(wave.id);
-        });
+        loadCampaignWaveTRPDistribution();
       }
     }
 
     // -------- TRP Distribution functions --------
-    async function loadTRPDistribution() {
-      if (!currentCampaign) return;
-      
-      try {
-        const response = await fetchJSON(urlReplace(TRP_LOAD, currentCampaign.id));
-        
-        if (response.status === 'ok' && response.data) {
-          const trpData = response.data;
-          console.log('Loading TRP from database for campaign', currentCampaign.id, ':', trpData);
-          
-          // Fill in the input fields
-          Object.keys(trpData).forEach(date => {
-            const input = document.querySelector(`.trp-input[data-date="${date}"]`);
-            if (input) {
-              const roundedValue = trpData[date] > 0 ? Math.round(trpData[date] * 100) / 100 : 0;
-              input.value = roundedValue > 0 ? roundedValue.toString() : '';
-              console.log('Set input for', date, 'to', roundedValue, '(from', trpData[date], ')');
-            } else {
-              console.log('TRP Input not found for date:', date);
-            }
-          });
-        } else {
-          console.log('No TRP distribution data found for campaign', currentCampaign.id);
-        }
-      } catch (error) {
-        console.error('Error loading TRP distribution:', error);
-      }
-    }
-    
-    function updateTotalTRP() {
-      const trpInputs = document.querySelectorAll('.trp-input');
-      let total = 0;
-      
-      trpInputs.forEach(input => {
-        const value = parseFloat(input.value) || 0;
-        total += value;
-      });
-      
-      const totalSpan = document.querySelector('#totalTRP');
-      if (totalSpan) {
-        totalSpan.textContent = total.toFixed(2);
-      }
-    }
-    
-    async function saveTRPDistribution() {
-      if (!currentCampaign) return;
-      
-      try {
-        updateTotalTRP();
-        
-        const trpData = {};
-        const trpInputs = document.querySelectorAll('.trp-input');
-        console.log('Found TRP inputs:', trpInputs.length);
-        
-        trpInputs.forEach(input => {
-          const date = input.dataset.date;
-          const rawValue = input.value.trim();
-          const value = rawValue === '' ? 0 : parseFloat(rawValue) || 0;
-          console.log(`SAVE DEBUG: Processing input for ${date}: raw_value="${rawValue}", parsed=${value}, type="${input.type}"`);
-          trpData[date] = value; // Saugok visus, net ir 0
-        });
-        
-        // Save to database via API
-        try {
-          const response = await fetchJSON(urlReplace(TRP_SAVE, currentCampaign.id), {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ trp_data: trpData })
-          });
-          
-          if (response.status === 'ok') {
-            console.log('TRP Distribution saved to database for campaign', currentCampaign.id, ':', trpData);
-          } else {
-            console.error('Failed to save TRP distribution:', response.message);
-          }
-        } catch (apiError) {
-          console.error('Error saving TRP distribution to database:', apiError);
-        }
-      } catch (error) {
-        console.error('Error saving TRP distribution:', error);
-      }
-    }
-
-    // Auto-distribute TRP across each wave's active days
-    function autoDistributeTRP() {
+    // Auto-distribute TRP across each wave's active days (computed and saved on the server)
+    async function autoDistributeTRP() {
       if (!currentWaves || currentWaves.length === 0) {
         alert('Nėra bangų, kurioms galima paskirstyti TRP');
         return;
       }
 
-      let totalDistributed = 0;
-      let totalDays = 0;
+      const profileSelect = document.getElementById('trpProfile');
+      const holidaysCheckbox = document.getElementById('trpExcludeHolidays');
 
-      // Process each wave separately
-      currentWaves.forEach((wave, waveIndex) => {
-        if (!wave.start_date || !wave.end_date) return;
-
-        // Get TRP for this specific wave from the table
-        let waveTRP = 0;
-        const tableRows = document.querySelectorAll('#wavesTableBody tr');
-        tableRows.forEach(row => {
-          // Check if this row belongs to the current wave by matching dates
-          const startDateCell = row.querySelector('td:nth-child(1)');
-          const endDateCell = row.querySelector('td:nth-child(2)');
-          if (startDateCell && endDateCell && 
-              startDateCell.textContent === (wave.start_date || '-') && 
-              endDateCell.textContent === (wave.end_date || '-')) {
-            const trpInput = row.querySelector('.itm-trps');
-            if (trpInput && trpInput.value) {
-              waveTRP += parseFloat(trpInput.value) || 0;
-            }
-          }
+      try {
+        const response = await fetchJSON(urlReplace(TRP_AUTO, currentCampaign.id), {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify({
+            profile: profileSelect ? profileSelect.value : 'flat',
+            exclude_holidays: holidaysCheckbox ? holidaysCheckbox.checked : false
+          })
         });
 
-        if (waveTRP === 0) return; // Skip waves with no TRP
-
-        // Get active days for this wave
-        const startDate = new Date(wave.start_date);
-        const endDate = new Date(wave.end_date);
-        const activeDays = [];
-        
-        for (let d = new Date(startDate); d <= endDate; d.setDate(d.getDate() + 1)) {
-          activeDays.push(d.toISOString().split('T')[0]);
+        const totalDistributed = Object.values(response.totals || {}).reduce((sum, v) => sum + v, 0);
+        if (totalDistributed === 0) {
+          alert('Įveskite TRP reikšmes bangų eilutėse pirmiau auto-paskirstymo');
+          return;
         }
 
-        if (activeDays.length === 0) return;
-
-        // Calculate daily TRP for this wave
-        const dailyTRP = waveTRP / activeDays.length;
-        const roundedDaily = Math.round(dailyTRP * 100) / 100;
-
-        // Clear this wave's inputs first
-        const waveInputs = document.querySelectorAll(`.trp-input-wave[data-wave-id="${wave.id}"]`);
-        waveInputs.forEach(input => {
-          input.value = '';
-        });
-
-        // Fill this wave's active days with calculated daily TRP
-        activeDays.forEach(dateStr => {
-          const input = document.querySelector(`.trp-input-wave[data-wave-id="${wave.id}"][data-date="${dateStr}"]`);
-          if (input) {
-            input.value = roundedDaily.toString();
-          }
+        Object.entries(response.data).forEach(([waveId, trpData]) => {
+          document.querySelectorAll(`.trp-input-wave[data-wave-id="${waveId}"]`).forEach(input => {
+            input.value = '';
+          });
+          fillWaveTRPInputs(waveId, trpData);
         });
 
-        // Save this wave's TRP distribution
-        saveWaveTRPDistribution(wave.id);
+        alert(`TRP paskirstyti: ${totalDistributed.toFixed(2)} TRP per ${Object.keys(response.data).length} bangas`);
+      } catch (error) {
+        console.error('Error auto-distributing TRP:', error);
+        alert('Klaida paskirstant TRP: ' + error.message);
+      }
+    }
 
-        totalDistributed += waveTRP;
-        totalDays += activeDays.length;
+    // -------- Wave-specific TRP Distribution functions --------
+    function fillWaveTRPInputs(waveId, trpData) {
+      Object.keys(trpData).forEach(date => {
+        const input = document.querySelector(`.trp-input-wave[data-wave-id="${waveId}"][data-date="${date}"]`);
+        if (input && trpData[date] > 0) {
+          const roundedValue = Math.round(trpData[date] * 100) / 100;
+          input.value = roundedValue.toString();
+        }
       });
+    }
 
-      if (totalDistributed === 0) {
-        alert('Įveskite TRP reikšmes bangų eilutėse pirmiau auto-paskirstymo');
+    async function loadCampaignWaveTRPDistribution() {
+      if (!currentCampaign) return;
+      
+      // loadWaves has just loaded the workspace, which carries each wave's TRP
+      if (currentWorkspace && currentWorkspaceCid === currentCampaign.id) {
+        currentWorkspace.waves.forEach(wave => fillWaveTRPInputs(wave.id, wave.trp_distribution || {}));
         return;
       }
 
-      alert(`TRP paskirstyti: ${totalDistributed.toFixed(2)} TRP per ${currentWaves.length} bangas`);
-    }
-
-    // -------- Wave-specific TRP Distribution functions --------
-    async function loadWaveTRPDistribution(waveId) {
-      if (!currentCampaign || !waveId) return;
-      
       try {
-        // Use wave-specific endpoint if available, otherwise fall back to campaign TRP
-        const response = await fetchJSON(`/tv-planner/waves/${waveId}/trp-distribution`);
-        
+        const response = await fetchJSON(urlReplace(WAVE_TRP_LOAD, currentCampaign.id));
         if (response.status === 'ok' && response.data) {
-          const trpData = response.data;
-          
-          // Fill in the input fields for this wave
-          Object.keys(trpData).forEach(date => {
-            const input = document.querySelector(`.trp-input-wave[data-wave-id="${waveId}"][data-date="${date}"]`);
-            if (input && trpData[date] > 0) {
-              const roundedValue = Math.round(trpData[date] * 100) / 100;
-              input.value = roundedValue.toString();
-            }
-          });
+          Object.entries(response.data).forEach(([waveId, trpData]) => fillWaveTRPInputs(waveId, trpData));
         }
       } catch (error) {
-        console.log(`No TRP distribution found for wave ${waveId} (this is normal for new waves)`);
+        console.error('Error loading wave TRP distribution:', error);
       }
     }
-    
+
     async function saveWaveTRPDistribution(waveId) {
       if (!currentCampaign || !waveId) return;
       
@@ -986,23 +886,13 @@
         });
         
         // Save to database via wave-specific endpoint
-        try {
-          const response = await fetchJSON(`/tv-planner/waves/${waveId}/trp-distribution`, {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ trp_data: trpData })
-          });
-          
-          console.log(`TRP Distribution saved for wave ${waveId}:`, trpData);
-        } catch (apiError) {
-          // Fall back to campaign-level save if wave-specific endpoint doesn't exist
-          console.log('Wave-specific TRP endpoint not available, using campaign-level save');
-          const response = await fetchJSON(urlReplace(TRP_SAVE, currentCampaign.id), {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ trp_data: trpData, wave_id: waveId })
-          });
-        }
+        await fetchJSON(urlReplace(W_TRP, waveId), {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify({ trp_data: trpData })
+        });
+        
+        console.log(`TRP Distribution saved for wave ${waveId}:`, trpData);
       } catch (error) {
         console.error(`Error saving TRP distribution for wave ${waveId}:`, error);
       }
@@ -1036,21 +926,14 @@
     let currentWaves = []; // Store waves for calendar display
     
     async function loadWaves(cid){
-      const waves = await fetchJSON(urlReplace(W_LIST, cid));
+      const waves = (await loadWorkspace(cid)).waves;
       
-      // Load items for each wave to get channel group
+      // Items come with each wave; get channel group from first item
       for(const wave of waves) {
-        try {
-          const items = await fetchJSON(urlReplace(I_LIST, wave.id));
-          wave.items = items;
-          // Get channel group from first item
-          if (items && items.length > 0) {
-            wave.channel_group = items[0].channel_group || items[0].owner || `Banga ${waves.indexOf(wave) + 1}`;
-          } else {
-            wave.channel_group = `Banga ${waves.indexOf(wave) + 1}`;
-          }
-        } catch(e) {
-          wave.items = [];
+        const items = wave.items || [];
+        if (items.length > 0) {
+          wave.channel_group = items[0].channel_group || items[0].owner || `Banga ${waves.indexOf(wave) + 1}`;
+        } else {
           wave.channel_group = `Banga ${waves.indexOf(wave) + 1}`;
         }
       }
@@ -1076,7 +959,7 @@
           // Load all items for all waves and display in single table
           for(const w of waves){
             try {
-              const items = await fetchJSON(urlReplace(I_LIST, w.id));
+              const items = w.items;
               const waveIndex = waves.indexOf(w) + 1;
               
               if (items && items.length > 0) {
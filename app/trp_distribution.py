@@ -0,0 +1,160 @@
+# app/trp_distribution.py
+"""
+Server-side daily TRP auto-distribution.
+
+Every wave's TRP (the sum of its items) is spread over the wave's days
+according to a weighting profile. Optionally Lithuanian public holidays
+get no TRP. Values are rounded to 0.01 TRP with the largest-remainder
+method, so each wave's days always add up to its total exactly.
+"""
+from datetime import date, timedelta
+
+# Relative weight Monday..Sunday for the "weekday" profile
+DEFAULT_WEEKDAY_WEIGHTS = (1.0, 1.0, 1.0, 1.1, 1.2, 0.9, 0.8)
+
+PROFILES = {
+    "flat": "Tolygiai",
+    "weekday": "Pagal savaitės dienas",
+    "front_loaded": "Daugiau pradžioje",
+    "flighting": "Savaitė per savaitę",
+    "burst": "Pradžios impulsas",
+}
+
+# Share of TRP the first / last day gets relative to each other in "front_loaded"
+FRONT_LOAD_RATIO = 2.0
+# "burst": the first BURST_DAYS days weigh BURST_WEIGHT times a normal day
+BURST_DAYS = 3
+BURST_WEIGHT = 3.0
+
+
+def easter_sunday(year: int) -> date:
+    """Gregorian Easter Sunday (anonymous Gregorian algorithm)"""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _first_sunday(year: int, month: int) -> date:
+    first = date(year, month, 1)
+    return first + timedelta(days=(6 - first.weekday()) % 7)
+
+
+def lithuanian_holidays(year: int) -> set[date]:
+    """Public holidays (non-working days) in Lithuania"""
+    fixed = [(1, 1), (2, 16), (3, 11), (5, 1), (6, 24), (7, 6), (8, 15),
+             (11, 1), (11, 2), (12, 24), (12, 25), (12, 26)]
+    easter = easter_sunday(year)
+    return {date(year, m, d) for m, d in fixed} | {
+        easter,
+        easter + timedelta(days=1),
+        _first_sunday(year, 5),   # Motinos diena
+        _first_sunday(year, 6),   # Tėvo diena
+    }
+
+
+def _weekday_weights(value) -> list[float]:
+    """Validated Monday..Sunday weights, defaults when not given"""
+    if not value:
+        return list(DEFAULT_WEEKDAY_WEIGHTS)
+    if not isinstance(value, (list, tuple)) or len(value) != 7:
+        raise ValueError("weekday_weights must have 7 values (Monday..Sunday)")
+    try:
+        weights = [float(w) for w in value]
+    except (TypeError, ValueError):
+        raise ValueError("weekday_weights must be numbers") from None
+    if any(w < 0 for w in weights):
+        raise ValueError("weekday_weights must not be negative")
+    return weights
+
+
+def _whole_days(value, name: str, default: int = 7) -> int:
+    if value is None or value == "":
+        return default
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a whole number of days") from None
+
+
+def _weights(days: list[date], profile: str, options: dict) -> list[float]:
+    n = len(days)
+    if profile == "flat":
+        return [1.0] * n
+    if profile == "weekday":
+        weights = _weekday_weights(options.get("weekday_weights"))
+        return [weights[d.weekday()] for d in days]
+    if profile == "front_loaded":
+        if n == 1:
+            return [1.0]
+        step = (FRONT_LOAD_RATIO - 1.0) / (n - 1)
+        return [FRONT_LOAD_RATIO - step * i for i in range(n)]
+    if profile == "flighting":
+        on = _whole_days(options.get("flight_on_days"), "flight_on_days")
+        off = _whole_days(options.get("flight_off_days"), "flight_off_days")
+        if on <= 0 or off < 0:
+            raise ValueError("flight_on_days must be positive and flight_off_days not negative")
+        return [1.0 if i % (on + off) < on else 0.0 for i in range(n)]
+    if profile == "burst":
+        return [BURST_WEIGHT if i < BURST_DAYS else 1.0 for i in range(n)]
+    raise ValueError(f"Unknown distribution profile: {profile}")
+
+
+def round_exact(values: list[float], total: float, step: float = 0.01) -> list[float]:
+    """Round to ``step`` keeping the sum equal to ``total`` (largest remainder)"""
+    units = round(total / step)
+    raw = [v / step for v in values]
+    floors = [int(r) for r in raw]
+    short = units - sum(floors)
+    by_remainder = sorted(range(len(raw)), key=lambda i: raw[i] - floors[i], reverse=True)
+    for i in by_remainder[:max(short, 0)]:
+        floors[i] += 1
+    return [f * step for f in floors]
+
+
+def distribute_wave(start_date: str, end_date: str, total_trp: float,
+                    profile: str = "flat", exclude_holidays: bool = False, **options) -> dict:
+    """Daily TRP {date: trp} for one wave"""
+    start = date.fromisoformat(start_date)
+    end = date.fromisoformat(end_date)
+    if end < start or total_trp <= 0:
+        return {}
+    days = [start + timedelta(days=n) for n in range((end - start).days + 1)]
+    weights = _weights(days, profile, options)
+
+    if exclude_holidays:
+        holidays = set()
+        for year in range(start.year, end.year + 1):
+            holidays |= lithuanian_holidays(year)
+        weights = [0.0 if d in holidays else w for d, w in zip(days, weights)]
+
+    weight_sum = sum(weights)
+    if weight_sum <= 0:
+        # Nothing left to put TRP on (e.g. a one-day wave on a holiday)
+        weights, weight_sum = [1.0] * len(days), float(len(days))
+
+    shares = [total_trp * w / weight_sum for w in weights]
+    rounded = round_exact(shares, total_trp)
+    return {d.isoformat(): round(v, 2) for d, v, w in zip(days, rounded, weights) if w > 0 and v > 0}
+
+
+def distribute_campaign(waves: list[dict], profile: str = "flat",
+                        exclude_holidays: bool = False, **options) -> dict:
+    """{wave_id: {date: trp}} for waves carrying id, start_date, end_date and total_trp"""
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown distribution profile: {profile}")
+    result = {}
+    for wave in waves:
+        if not wave.get("start_date") or not wave.get("end_date"):
+            continue
+        result[wave["id"]] = distribute_wave(
+            wave["start_date"], wave["end_date"], wave["total_trp"] or 0,
+            profile, exclude_holidays, **options)
+    return result
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Projects-CRM client against a local stand-in CRM.
+
+Starts a throw-away HTTP server that answers /api/campaigns like the real
+CRM (with --latency seconds of delay and --campaigns entries). Then it
+measures:
+
+  bare      requests.get per call, as the service used to do
+  client    ProjectsCRMClient: pooled session, TTL cache, stale-while-revalidate
+  down      the client with the CRM unreachable (circuit breaker)
+
+    python benchmarks/bench_crm_client.py [--calls 50] [--latency 0.05] [--campaigns 500]
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from app.projects_crm_service import CircuitBreaker, ProjectsCRMClient  # noqa: E402
+
+
+def stand_in_crm(latency, n_campaigns):
+    """Local CRM stand-in; returns (server, base_url, request counter)"""
+    campaigns = json.dumps([{
+        "id": i, "name": f"Kampanija {i}", "code": f"PLN-25-{i:03d}-A",
+        "start_date": "2025-01-01", "end_date": "2025-12-31",
+        "client_brand_name": "Klientas", "project_name": "Projektas", "project_code": f"PRJ-{i}",
+    } for i in range(1, n_campaigns + 1)]).encode()
+    hits = {"count": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            hits["count"] += 1
+            time.sleep(latency)
+            body = campaigns if self.path.endswith("/campaigns") else b"[]"
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/api", hits
+
+
+def timed(calls, fn):
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.05, help="CRM response delay, seconds")
+    parser.add_argument("--campaigns", type=int, default=500)
+    args = parser.parse_args()
+
+    server, url, hits = stand_in_crm(args.latency, args.campaigns)
+    print(f"{args.calls} campaign list calls, CRM latency {args.latency * 1000:.0f} ms, "
+          f"{args.campaigns} campaigns\n")
+    print(f"{'mode':8} {'ms/call':>9} {'CRM requests':>13}")
+
+    hits["count"] = 0
+    ms = timed(args.calls, lambda: requests.get(f"{url}/campaigns", timeout=10).json())
+    print(f"{'bare':8} {ms:9.2f} {hits['count']:13}")
+
+    hits["count"] = 0
+    client = ProjectsCRMClient(base_url=url, cache_ttl=60)
+    ms = timed(args.calls, client.campaigns)
+    print(f"{'client':8} {ms:9.2f} {hits['count']:13}")
+
+    # Expire the cache: callers keep getting the stale list while one refresh runs
+    hits["count"] = 0
+    client.cache_ttl = 0
+    ms = timed(args.calls, client.campaigns)
+    time.sleep(args.latency * 2)
+    print(f"{'stale':8} {ms:9.2f} {hits['count']:13}")
+
+    server.shutdown()
+    server.server_close()
+    down = ProjectsCRMClient(base_url=url, breaker=CircuitBreaker(failures=3, cooldown=60))
+    ms = timed(args.calls, lambda: _swallow(down.campaigns))
+    print(f"{'down':8} {ms:9.2f} {'-':>13}   breaker {down.breaker.state}, "
+          f"{down.breaker.rejected} calls rejected without a request")
+
+    print("\n" + json.dumps(client.metrics(), indent=2))
+
+
+def _swallow(fn):
+    try:
+        fn()
+    except Exception:
+        pass
+
+
+if __name__ == "__main__":
+    main()
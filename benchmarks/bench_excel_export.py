@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Wall time and peak RSS of the Excel exporters on a long campaign.
+
+Builds a throw-away database holding one campaign that runs for a whole
+year with 50 waves (10 items each by default, all in one channel group),
+then renders the client plan and the channel-group report, each in a fresh
+subprocess so ru_maxrss is the peak of that export alone.
+
+Point --tree at another checkout (e.g. `git worktree add /tmp/before HEAD~1`)
+to measure the same exports with that revision's code.
+
+    python benchmarks/bench_excel_export.py [--waves 50] [--items 10] [--tree PATH]
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+from datetime import date, timedelta
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from app.db import connect  # noqa: E402
+from app.migrations import run_migrations  # noqa: E402
+
+TARGET_GROUPS = ["A25-55", "A18-49", "W25-55", "Visi nuo 4 m."]
+
+EXPORTS = {
+    "client_excel": "models.generate_client_excel_report({campaign_id})",
+    "channel_group_excel": "models.export_channel_group_excel({group_id})",
+}
+
+CHILD = """
+import json, resource, sys, time
+sys.path.insert(0, {tree!r})
+import openpyxl
+from app import models
+base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+output = {call}
+elapsed = time.perf_counter() - start
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{"seconds": elapsed, "peak_kb": peak, "delta_kb": peak - base,
+                  "bytes": len(output.getvalue())}}))
+"""
+
+
+def populate(db, n_waves, items_per_wave):
+    rnd = random.Random(42)
+    group_id, owner = db.execute("SELECT id, name FROM channel_groups ORDER BY id LIMIT 1").fetchone()
+
+    db.execute("INSERT INTO campaigns(id, name, start_date, end_date) VALUES (1, 'Bench', '2025-01-01', '2025-12-31')")
+    db.execute("INSERT INTO tvcs(id, campaign_id, name, duration) VALUES (1, 1, 'TVC', 20)")
+    year_start = date(2025, 1, 1)
+    step = 365 // n_waves
+    waves = []
+    for wid in range(1, n_waves + 1):
+        start = year_start + timedelta(days=(wid - 1) * step)
+        end = min(start + timedelta(days=rnd.randint(7, 28)), date(2025, 12, 31))
+        waves.append((wid, f"Banga {wid}", start.isoformat(), end.isoformat()))
+    db.executemany("INSERT INTO waves(id, campaign_id, name, start_date, end_date) VALUES (?, 1, ?, ?, ?)", waves)
+    db.executemany(
+        "INSERT INTO discounts(campaign_id, wave_id, discount_type, discount_percentage) VALUES (1, ?, ?, 5)",
+        ((wid, kind) for wid in range(1, n_waves + 1) for kind in ("client", "agency")),
+    )
+    db.executemany("""
+        INSERT INTO wave_items(wave_id, owner, target_group, primary_label,
+            price_per_sec_eur, trps, tvc_id, gross_cpp_eur, clip_duration)
+        VALUES (?, ?, ?, 'TV3', 10.0, ?, 1, 10.0, 20)
+    """, (
+        (wid, owner, rnd.choice(TARGET_GROUPS), rnd.uniform(10, 200))
+        for wid in range(1, n_waves + 1) for _ in range(items_per_wave)
+    ))
+    db.commit()
+    return {"campaign_id": 1, "group_id": group_id}
+
+
+def run_export(tree, db_path, call):
+    env = dict(os.environ, TV_PLANNER_DB_PATH=db_path)
+    proc = subprocess.run([sys.executable, "-c", CHILD.format(tree=tree, call=call)],
+                          env=env, capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--waves", type=int, default=50)
+    parser.add_argument("--items", type=int, default=10, help="items per wave")
+    parser.add_argument("--tree", default=ROOT, help="checkout whose exporters are measured")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        run_migrations(path)
+        db = connect(path)
+        params = populate(db, args.waves, args.items)
+        db.close()
+
+        print(f"1 campaign, 365 days, {args.waves} waves x {args.items} items; code from {os.path.abspath(args.tree)}\n")
+        print(f"{'export':22} {'seconds':>8} {'peak RSS MB':>12} {'export MB':>10} {'file KB':>8}")
+        for name, call in EXPORTS.items():
+            result = run_export(os.path.abspath(args.tree), path, call.format(**params))
+            print(f"{name:22} {result['seconds']:8.2f} {result['peak_kb'] / 1024:12.1f} "
+                  f"{result['delta_kb'] / 1024:10.1f} {result['bytes'] / 1024:8.0f}")
+
+
+if __name__ == "__main__":
+    main()
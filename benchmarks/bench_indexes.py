@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Query plans and timings for the planner's hot lookups, with and without
+the secondary indexes from migration 10 (add_lookup_indexes).
+
+Builds a throw-away database with the full schema, fills it with
+synthetic campaigns/waves/items (1M wave_items by default), then runs every
+access path against the indexed schema and again after dropping the
+indexes.
+
+    python benchmarks/bench_indexes.py [--items 1000000] [--repeat 20]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.db import connect  # noqa: E402
+from app.migrations import LOOKUP_INDEXES, run_migrations  # noqa: E402
+
+ITEMS_PER_WAVE = 25
+WAVES_PER_CAMPAIGN = 4
+OWNERS = ["AMB Baltics", "MG grupė"]
+TARGET_GROUPS = ["A25-55", "A18-49", "W25-55", "Visi nuo 4 m."]
+
+QUERIES = {
+    "list_wave_items": (
+        "SELECT * FROM wave_items WHERE wave_id=? ORDER BY id",
+        lambda p: (p["wave_id"],),
+    ),
+    "list_waves": (
+        "SELECT * FROM waves WHERE campaign_id=? ORDER BY id",
+        lambda p: (p["campaign_id"],),
+    ),
+    "list_campaign_tvcs": (
+        "SELECT * FROM tvcs WHERE campaign_id = ? ORDER BY name",
+        lambda p: (p["campaign_id"],),
+    ),
+    "get_discounts_for_wave": (
+        "SELECT * FROM discounts WHERE wave_id = ? ORDER BY discount_type",
+        lambda p: (p["wave_id"],),
+    ),
+    "wave_discount_totals": (
+        "SELECT discount_type, discount_percentage FROM discounts WHERE wave_id = ?",
+        lambda p: (p["wave_id"],),
+    ),
+    "get_discounts_for_campaign": (
+        """SELECT d.*, w.name as wave_name FROM discounts d
+           LEFT JOIN waves w ON d.wave_id = w.id
+           WHERE d.campaign_id = ? OR d.wave_id IN (SELECT id FROM waves WHERE campaign_id = ?)
+           ORDER BY d.discount_type, d.wave_id""",
+        lambda p: (p["campaign_id"], p["campaign_id"]),
+    ),
+    "get_pricing_item": (
+        """SELECT * FROM pricing_list_items
+           WHERE pricing_list_id=? AND owner=? AND target_group=?""",
+        lambda p: (1, "AMB Baltics", "A25-55"),
+    ),
+    "campaign_report_items": (
+        """SELECT wi.*, t.name as tvc_name, t.duration as tvc_duration
+           FROM wave_items wi
+           JOIN waves w ON w.id = wi.wave_id
+           LEFT JOIN tvcs t ON wi.tvc_id = t.id
+           WHERE w.campaign_id = ?""",
+        lambda p: (p["campaign_id"],),
+    ),
+    "channel_group_export_count": (
+        """SELECT COUNT(*) FROM wave_items wi
+           JOIN waves w ON wi.wave_id = w.id
+           JOIN campaigns c ON w.campaign_id = c.id
+           JOIN channel_groups cg ON cg.id = ?
+           WHERE wi.owner = cg.name""",
+        lambda p: (p["channel_group_id"],),
+    ),
+}
+
+
+def populate(db, n_items):
+    n_waves = max(1, n_items // ITEMS_PER_WAVE)
+    n_campaigns = max(1, n_waves // WAVES_PER_CAMPAIGN)
+    rnd = random.Random(42)
+
+    db.executemany("INSERT INTO pricing_lists(id, name) VALUES (?, ?)",
+                   ((pl, f"Bench {pl}") for pl in range(1, 51)))
+    db.executemany("""
+        INSERT INTO pricing_list_items (pricing_list_id, owner, target_group,
+            primary_label, price_per_sec_eur)
+        VALUES (?, ?, ?, 'TV3', ?)
+    """, [(pl, owner, tg, 10.0) for pl in range(1, 51) for owner in OWNERS for tg in TARGET_GROUPS])
+    db.executemany(
+        "INSERT INTO campaigns(id, name, start_date, end_date) VALUES (?, ?, '2025-01-01', '2025-12-31')",
+        ((cid, f"Campaign {cid}") for cid in range(1, n_campaigns + 1)),
+    )
+    db.executemany(
+        "INSERT INTO tvcs(campaign_id, name, duration) VALUES (?, ?, 20)",
+        ((cid, f"TVC {cid}") for cid in range(1, n_campaigns + 1)),
+    )
+    db.executemany(
+        "INSERT INTO waves(id, campaign_id, name, start_date, end_date) VALUES (?, ?, ?, '2025-03-01', '2025-03-31')",
+        ((wid, (wid - 1) // WAVES_PER_CAMPAIGN + 1, f"Banga {wid}") for wid in range(1, n_waves + 1)),
+    )
+    db.executemany(
+        "INSERT INTO discounts(campaign_id, wave_id, discount_type, discount_percentage) VALUES (?, ?, ?, 5)",
+        (((wid - 1) // WAVES_PER_CAMPAIGN + 1, wid, kind)
+         for wid in range(1, n_waves + 1) for kind in ("client", "agency")),
+    )
+    db.executemany("""
+        INSERT INTO wave_items(wave_id, owner, target_group, primary_label,
+            price_per_sec_eur, trps, tvc_id, gross_cpp_eur, clip_duration)
+        VALUES (?, ?, ?, 'TV3', 10.0, ?, ?, 10.0, 20)
+    """, (
+        (i // ITEMS_PER_WAVE + 1, rnd.choice(OWNERS), rnd.choice(TARGET_GROUPS),
+         rnd.uniform(10, 200), (i // ITEMS_PER_WAVE) // WAVES_PER_CAMPAIGN + 1)
+        for i in range(n_items)
+    ))
+    db.commit()
+    return n_campaigns, n_waves
+
+
+def run_queries(db, params, repeat):
+    results = {}
+    for name, (sql, args) in QUERIES.items():
+        plan = [row[3] for row in db.execute(f"EXPLAIN QUERY PLAN {sql}", args(params[0]))]
+        start = time.perf_counter()
+        for i in range(repeat):
+            db.execute(sql, args(params[i % len(params)])).fetchall()
+        elapsed_ms = (time.perf_counter() - start) * 1000 / repeat
+        results[name] = (plan, elapsed_ms)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--items", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        run_migrations(path)
+        db = connect(path)
+
+        start = time.perf_counter()
+        n_campaigns, n_waves = populate(db, args.items)
+        print(f"Populated {args.items} wave_items, {n_waves} waves, {n_campaigns} campaigns "
+              f"in {time.perf_counter() - start:.1f}s\n")
+        db.execute("ANALYZE")
+
+        rnd = random.Random(7)
+        groups = [row["id"] for row in db.execute("SELECT id FROM channel_groups")]
+        params = [{
+            "campaign_id": rnd.randint(1, n_campaigns),
+            "wave_id": rnd.randint(1, n_waves),
+            "channel_group_id": rnd.choice(groups),
+        } for _ in range(args.repeat)]
+
+        indexed = run_queries(db, params, args.repeat)
+        for name in LOOKUP_INDEXES:
+            db.execute(f"DROP INDEX {name}")
+        db.execute("ANALYZE")
+        unindexed = run_queries(db, params, args.repeat)
+        db.close()
+
+    print(f"{'query':32} {'no index ms':>12} {'indexed ms':>12} {'speed-up':>9}")
+    for name in QUERIES:
+        before, after = unindexed[name][1], indexed[name][1]
+        print(f"{name:32} {before:12.3f} {after:12.3f} {before / after if after else 0:8.0f}x")
+
+    print("\nQuery plans (no index -> indexed):")
+    for name in QUERIES:
+        print(f"\n{name}")
+        for line in unindexed[name][0]:
+            print(f"  - {line}")
+        for line in indexed[name][0]:
+            print(f"  + {line}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+"""
+Test setup: the app runs against a throw-away database built by the
+migrations, with the background CRM outbox worker switched off.
+"""
+import os
+import tempfile
+
+# Read by app.db / app.export_jobs at import time
+_TMP = tempfile.mkdtemp(prefix="tv-planner-tests-")
+os.environ["TV_PLANNER_DB_PATH"] = os.path.join(_TMP, "tv-calc.db")
+os.environ["TV_PLANNER_EXPORT_JOBS_DIR"] = os.path.join(_TMP, "export_jobs")
+os.environ["TV_PLANNER_CRM_OUTBOX_WORKER"] = "0"
+
+import pytest
+
+from app import create_app
+
+
+@pytest.fixture(scope="session")
+def app():
+    return create_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
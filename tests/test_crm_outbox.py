@@ -0,0 +1,63 @@
+"""Collapsing of queued Projects-CRM plan writes."""
+from app import crm_outbox, models
+from app.db import get_db
+
+
+def _row(row_id, op, plan_name, wave_id, campaign_id=1):
+    return {"id": row_id, "campaign_id": campaign_id, "wave_id": wave_id, "op": op,
+            "plan_name": plan_name, "payload": None}
+
+
+def _ids(rows):
+    return [row["id"] for row in rows]
+
+
+def test_waves_sharing_a_name_each_create_a_plan():
+    rows = [_row(1, "create_plan", "Banga 1", wave_id=10),
+            _row(2, "create_plan", "Banga 1", wave_id=11)]
+    to_send, redundant = crm_outbox.collapse(rows)
+    assert _ids(to_send) == [1, 2]
+    assert redundant == []
+
+
+def test_create_then_delete_of_one_wave_cancels_only_that_wave():
+    rows = [_row(1, "create_plan", "Banga 1", wave_id=10),
+            _row(2, "create_plan", "Banga 1", wave_id=11),
+            _row(3, "delete_plan", "Banga 1", wave_id=11)]
+    to_send, redundant = crm_outbox.collapse(rows)
+    assert _ids(to_send) == [1]
+    assert sorted(_ids(redundant)) == [2, 3]
+
+
+def test_repeated_write_for_one_wave_is_sent_once():
+    rows = [_row(1, "delete_plan", "Banga 1", wave_id=10),
+            _row(2, "delete_plan", "Banga 1", wave_id=10)]
+    to_send, redundant = crm_outbox.collapse(rows)
+    assert _ids(to_send) == [1]
+    assert _ids(redundant) == [2]
+
+
+def test_rows_without_wave_are_not_collapsed():
+    rows = [_row(1, "create_plan", "Banga 1", wave_id=None),
+            _row(2, "create_plan", "Banga 1", wave_id=None)]
+    assert _ids(crm_outbox.collapse(rows)[0]) == [1, 2]
+
+
+def test_duplicate_wave_names_queue_one_create_each(app, client):
+    with app.app_context():
+        cid = models.create_campaign("Outbox test", "2026-01-01", "2026-03-31")
+        with get_db():
+            models.save_crm_link(cid, 990001, "PLN-OUTBOX-1")
+    for _ in range(2):
+        response = client.post(f"/tv-planner/campaigns/{cid}/waves",
+                               json={"name": "Banga 1", "start_date": "2026-01-01", "end_date": "2026-01-31"})
+        assert response.status_code == 201
+
+    with app.app_context():
+        with get_db() as db:
+            rows = [dict(r) for r in db.execute(
+                "SELECT * FROM crm_outbox WHERE campaign_id = ? ORDER BY id", (cid,))]
+    assert [r["op"] for r in rows] == ["create_plan", "create_plan"]
+    assert len({r["wave_id"] for r in rows}) == 2
+    to_send, redundant = crm_outbox.collapse(rows)
+    assert len(to_send) == 2 and redundant == []
@@ -0,0 +1,67 @@
+"""Wave totals and item repricing apply the same discounts."""
+import pytest
+
+from app import models
+from app.db import get_db
+
+# (price_per_sec_eur, trps) per item; gross is price × TRP so the item sums
+# and the wave totals share one base
+WAVE_ITEMS = [[(18.4, 120.0), (7.25, 35.5)], [(11.0, 60.0)], []]
+
+
+def _campaign_with_waves(app):
+    with app.app_context():
+        cid = models.create_campaign("Discount test", "2026-01-01", "2026-03-31")
+        wave_ids = [models.create_wave(cid, f"W{n}", "2026-01-01", "2026-01-31")
+                    for n in range(len(WAVE_ITEMS))]
+        with get_db() as db:
+            for wid, items in zip(wave_ids, WAVE_ITEMS):
+                db.executemany("""
+                    INSERT INTO wave_items(wave_id, owner, target_group, primary_label, share_primary,
+                                           prime_share_primary, price_per_sec_eur, trps, gross_price_eur)
+                    VALUES (?, 'TV3', 'A25-55', 'TV3', 100, 60, ?, ?, ?)
+                """, [(wid, price, trps, price * trps) for price, trps in items])
+    return cid, wave_ids
+
+
+def _item_sums(wave_id):
+    with get_db() as db:
+        return db.execute("""
+            SELECT COALESCE(SUM(gross_price_eur), 0) AS gross, COALESCE(SUM(net_price_eur), 0) AS net,
+                   COALESCE(SUM(net_net_price_eur), 0) AS net_net,
+                   MAX(client_discount) AS client, MAX(agency_discount) AS agency
+            FROM wave_items WHERE wave_id = ?
+        """, (wave_id,)).fetchone()
+
+
+def total_without_ids(total):
+    return {k: v for k, v in total.items() if k not in ("wave_id", "name")}
+
+
+def test_campaign_discount_reaches_items_and_totals(app, client):
+    cid, (w1, w2, w3) = _campaign_with_waves(app)
+    with app.app_context():
+        models.create_discount(campaign_id=cid, discount_type="client", discount_percentage=10)
+        models.create_discount(campaign_id=cid, discount_type="agency", discount_percentage=5)
+        # The wave's own discount wins over the campaign's
+        models.create_discount(campaign_id=cid, wave_id=w2, discount_type="client", discount_percentage=20)
+
+    response = client.post(f"/tv-planner/campaigns/{cid}/recalculate-discounts")
+    assert response.status_code == 200
+    totals = {t["wave_id"]: t for t in response.get_json()["waves"]}
+    assert set(totals) == {w1, w2, w3}
+
+    expected = {w1: (10, 5), w2: (20, 5), w3: (10, 5)}
+    with app.app_context():
+        for wid, (client_pct, agency_pct) in expected.items():
+            total, items = totals[wid], _item_sums(wid)
+            assert (total["client_discount_percent"], total["agency_discount_percent"]) == (client_pct, agency_pct)
+            assert total["base_cost"] == pytest.approx(items["gross"])
+            assert total["client_cost"] == pytest.approx(items["net"])
+            assert total["agency_cost"] == pytest.approx(items["net_net"])
+            if items["client"] is not None:
+                assert (items["client"], items["agency"]) == (client_pct, agency_pct)
+
+            # GET /waves/<wid>/total applies the same rule
+            single = client.get(f"/tv-planner/waves/{wid}/total").get_json()
+            assert single == pytest.approx(total_without_ids(total))
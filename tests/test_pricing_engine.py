@@ -0,0 +1,230 @@
+"""
+Equivalence of the pricing engine with the per-row formulas it replaced.
+
+Each ``old_*`` function is the formula the caller computed inline before
+app/pricing_engine.py existed; the engine must give the same figures for
+every caller.
+"""
+import sqlite3
+
+import pytest
+
+from app import pricing_engine
+
+ITEMS = [
+    {"trps": 120.0, "gross_cpp_eur": 18.4, "clip_duration": 20, "tvc_duration": 15,
+     "duration_index": 1.25, "seasonal_index": 0.9, "trp_purchase_index": 0.95,
+     "advance_purchase_index": 0.95, "web_index": 1.05, "advance_payment_index": 0.98,
+     "loyalty_discount_index": 0.97, "position_index": 1.2,
+     "client_discount": 12.5, "agency_discount": 5.0, "affinity1": 88.2, "price_per_sec_eur": 17.9},
+    {"trps": 35.5, "gross_cpp_eur": 7.25, "clip_duration": 30, "tvc_duration": 30,
+     "duration_index": 1.0, "seasonal_index": 1.15, "trp_purchase_index": 1.0,
+     "advance_purchase_index": 0.9, "web_index": 1.0, "advance_payment_index": 1.0,
+     "loyalty_discount_index": 0.95, "position_index": 1.0,
+     "client_discount": 0.0, "agency_discount": 0.0, "affinity1": 0.0, "price_per_sec_eur": 7.25},
+    {"trps": 0.0, "gross_cpp_eur": 11.0, "clip_duration": 10, "tvc_duration": 10,
+     "duration_index": 1.4, "seasonal_index": 0.8, "trp_purchase_index": 0.95,
+     "advance_purchase_index": 0.95, "web_index": 1.1, "advance_payment_index": 1.02,
+     "loyalty_discount_index": 1.0, "position_index": 1.3,
+     "client_discount": 40.0, "agency_discount": 10.0, "affinity1": 105.3, "price_per_sec_eur": 10.5},
+]
+
+
+def old_item_create(excel_data, gross_cpp_eur, duration_index, seasonal_index):
+    affinity1 = excel_data.get("affinity1")
+    if affinity1 and affinity1 != 0:
+        grp_planned = excel_data["trps"] * 100 / affinity1
+    else:
+        grp_planned = 0
+    gross_price_eur = (excel_data["trps"] * gross_cpp_eur * excel_data["clip_duration"] *
+                       duration_index * seasonal_index *
+                       excel_data["trp_purchase_index"] * excel_data["advance_purchase_index"] *
+                       excel_data["position_index"])
+    net_price_eur = gross_price_eur * (1 - excel_data["client_discount"] / 100)
+    net_net_price_eur = net_price_eur * (1 - excel_data["agency_discount"] / 100)
+    return gross_price_eur, net_price_eur, net_net_price_eur, grp_planned
+
+
+def old_item_update(item, data):
+    trps = data.get("trps", item["trps"] or 0)
+    gross_cpp = item["gross_cpp_eur"] or 0
+    duration_index = data.get("duration_index", item["duration_index"] or 1.0)
+    seasonal_index = data.get("seasonal_index", item["seasonal_index"] or 1.0)
+    trp_purchase_index = data.get("trp_purchase_index", item["trp_purchase_index"] or 0.95)
+    advance_purchase_index = data.get("advance_purchase_index", item["advance_purchase_index"] or 0.95)
+    web_index = data.get("web_index", item["web_index"] or 1.0)
+    advance_payment_index = data.get("advance_payment_index", item["advance_payment_index"] or 1.0)
+    loyalty_discount_index = data.get("loyalty_discount_index", item["loyalty_discount_index"] or 1.0)
+    position_index = data.get("position_index", item["position_index"] or 1.0)
+    clip_duration = data.get("clip_duration", item["clip_duration"] or 10)
+    gross_price = (trps * gross_cpp * clip_duration * duration_index * seasonal_index *
+                   trp_purchase_index * advance_purchase_index * web_index *
+                   advance_payment_index * loyalty_discount_index * position_index)
+    client_discount = data.get("client_discount", item["client_discount"] or 0)
+    agency_discount = data.get("agency_discount", item["agency_discount"] or 0)
+    net_price = gross_price * (1 - client_discount / 100)
+    net_net_price = net_price * (1 - agency_discount / 100)
+    updated_affinity1 = data.get("affinity1", item["affinity1"])
+    grp_planned = trps * 100 / updated_affinity1 if updated_affinity1 and updated_affinity1 != 0 else 0
+    return gross_price, net_price, net_net_price, grp_planned
+
+
+def old_client_report(item):
+    affinity1 = item.get('affinity1', 0)
+    grp_planned = (item['trps'] * 100 / affinity1) if affinity1 > 0 else 0
+    gross_cpp = item.get('gross_cpp_eur', item.get('price_per_sec_no_discount', item['price_per_sec_eur']))
+    clip_duration = item.get('tvc_duration', item.get('clip_duration', 0))
+    gross_price = item['trps'] * gross_cpp * clip_duration
+    client_discount = item.get('client_discount', 0)
+    net_price = gross_price * (1 - client_discount / 100)
+    agency_discount = item.get('agency_discount', 0)
+    net_net_price = net_price * (1 - agency_discount / 100)
+    return gross_price, net_price, net_net_price, grp_planned
+
+
+def old_pavyzdys(item):
+    trps = item.get('trps', 0)
+    affinity1 = item.get('affinity1', 88.2)
+    grp_planned = (trps * 100 / affinity1) if affinity1 > 0 else trps
+    gross_cpp = item.get('gross_cpp_eur', item.get('price_per_sec_no_discount', 18.4))
+    duration_idx = item.get('duration_index', 1.0)
+    seasonal_idx = item.get('seasonal_index', 1.0)
+    trp_purchase_idx = item.get('trp_purchase_index', 0.95)
+    advance_idx = item.get('advance_purchase_index', 0.95)
+    position_idx = item.get('position_index', 1.0)
+    gross_price = trps * gross_cpp * duration_idx * seasonal_idx * trp_purchase_idx * advance_idx * position_idx
+    client_discount = item.get('client_discount', 0)
+    net_price = gross_price * (1 - client_discount / 100)
+    agency_discount = item.get('agency_discount', 0)
+    net_net_price = net_price * (1 - agency_discount / 100)
+    return gross_price, net_price, net_net_price, grp_planned
+
+
+def old_channel_group(item):
+    clip_duration = item['clip_duration'] or 30
+    trps = item['trps'] or 0
+    gross_cpp = item['gross_cpp_eur'] or 0
+    duration_index = item['duration_index'] or 1.0
+    seasonal_index = item['seasonal_index'] or 1.0
+    trp_purchase_index = item['trp_purchase_index'] or 1.0
+    advance_purchase_index = item['advance_purchase_index'] or 1.0
+    web_index = item['web_index'] or 1.0
+    advance_payment_index = item['advance_payment_index'] or 1.0
+    loyalty_discount_index = item['loyalty_discount_index'] or 1.0
+    gross_price = (clip_duration * trps * gross_cpp * duration_index * seasonal_index *
+                   trp_purchase_index * advance_purchase_index * web_index *
+                   advance_payment_index * loyalty_discount_index)
+    client_discount = item['client_discount'] or 0
+    agency_discount = item['agency_discount'] or 0
+    net_price = gross_price * (1 - client_discount / 100)
+    net_net_price = net_price * (1 - agency_discount / 100)
+    grp_planned = (item['trps'] * 100 / item['affinity1']) if item['affinity1'] and item['affinity1'] > 0 else 0
+    return gross_price, net_price, net_net_price, grp_planned
+
+
+def engine_rows(rows, **kwargs):
+    priced = pricing_engine.price_rows(rows, **kwargs)
+    return list(zip(priced["gross"], priced["net"], priced["net_net"], priced["grp"]))
+
+
+def assert_same(new, old):
+    assert len(new) == len(old)
+    for n, o in zip(new, old):
+        assert n == pytest.approx(o, rel=1e-12, abs=1e-9)
+
+
+def test_item_create_matches_old_formula():
+    # The create payload has no web / advance payment / loyalty indices
+    rows = [{k: v for k, v in item.items()
+             if k not in ("web_index", "advance_payment_index", "loyalty_discount_index")}
+            for item in ITEMS]
+    old = [old_item_create(r, r["gross_cpp_eur"], r["duration_index"], r["seasonal_index"]) for r in rows]
+    assert_same(engine_rows(rows), old)
+
+
+@pytest.mark.parametrize("changes", [
+    {"trps": 80.0},
+    {"client_discount": 20.0, "agency_discount": 3.0},
+    {"position_index": 1.1, "web_index": 1.2, "clip_duration": 25},
+    {"affinity1": 50.0},
+])
+def test_item_update_matches_old_formula(changes):
+    merged = [{**item, **changes} for item in ITEMS]
+    old = [old_item_update(item, changes) for item in ITEMS]
+    assert_same(engine_rows(merged), old)
+
+
+def test_item_update_defaults_for_empty_stored_values():
+    item = {**ITEMS[0], "duration_index": None, "trp_purchase_index": None,
+            "clip_duration": None, "web_index": None, "client_discount": None}
+    assert_same(engine_rows([item]), [old_item_update(item, {})])
+
+
+ZERO_INDICES = {"duration_index": 0.0, "seasonal_index": 0.0, "trp_purchase_index": 0.0,
+                "advance_purchase_index": 0.0, "position_index": 0.0, "clip_duration": 0}
+
+
+@pytest.mark.parametrize("field", sorted(ZERO_INDICES))
+def test_item_create_prices_zero_index_as_zero(field):
+    row = {**ITEMS[0], field: ZERO_INDICES[field]}
+    old = old_item_create(row, row["gross_cpp_eur"], row["duration_index"], row["seasonal_index"])
+    assert_same(engine_rows([row]), [old])
+    assert old[0] == 0
+
+
+@pytest.mark.parametrize("field", sorted(ZERO_INDICES) + ["web_index", "advance_payment_index",
+                                                         "loyalty_discount_index"])
+def test_item_update_prices_zero_index_as_zero(field):
+    changes = {field: 0.0}
+    old = old_item_update(ITEMS[0], changes)
+    assert_same(engine_rows([{**ITEMS[0], **changes}]), [old])
+    assert old[0] == 0
+
+
+def test_client_report_matches_old_formula():
+    old = [old_client_report(item) for item in ITEMS]
+    new = engine_rows(ITEMS, formula="client_report", overrides=pricing_engine.REPORT_OVERRIDES)
+    assert_same(new, old)
+
+
+def test_pavyzdys_matches_old_formula():
+    # pavyzdys never read affinity1 == 0 as "no GRP": it shows the TRP instead
+    rows = [item for item in ITEMS if item["affinity1"] > 0]
+    old = [old_pavyzdys(item) for item in rows]
+    new = engine_rows(rows, formula="pavyzdys", overrides=pricing_engine.REPORT_OVERRIDES)
+    assert_same(new, old)
+
+
+def _sqlite_rows(items):
+    fields = list(items[0])
+    db = sqlite3.connect(":memory:")
+    db.row_factory = sqlite3.Row
+    db.execute(f"CREATE TABLE wave_items (id INTEGER PRIMARY KEY, {', '.join(fields)})")
+    db.executemany(f"INSERT INTO wave_items ({', '.join(fields)}) VALUES ({', '.join('?' * len(fields))})",
+                   [[item[f] for f in fields] for item in items])
+    return db.execute("SELECT * FROM wave_items ORDER BY id").fetchall()
+
+
+def test_channel_group_matches_old_formula():
+    items = ITEMS + [{**ITEMS[0], "clip_duration": None, "trp_purchase_index": None,
+                      "advance_purchase_index": 0, "affinity1": None}]
+    rows = _sqlite_rows(items)
+    old = [old_channel_group(row) for row in rows]
+    assert_same(engine_rows(rows, formula="channel_group"), old)
+
+
+def test_channel_group_totals_are_row_sums():
+    rows = _sqlite_rows(ITEMS)
+    priced = pricing_engine.price_rows(rows, formula="channel_group")
+    old = [old_channel_group(row) for row in rows]
+    for key, column in zip(("gross", "net", "net_net", "grp"), zip(*old)):
+        assert sum(priced[key]) == pytest.approx(sum(column))
+
+
+def test_apply_discounts_matches_wave_discount_step():
+    gross = [item["trps"] * item["gross_cpp_eur"] for item in ITEMS] + [None]
+    net, net_net = pricing_engine.apply_discounts(gross, 15.0, 4.0)
+    for g, n, nn in zip(gross, net, net_net):
+        old_net = (g or 0) * (1 - 15.0 / 100)
+        assert n == pytest.approx(old_net)
+        assert nn == pytest.approx(old_net * (1 - 4.0 / 100))